@@ -12,6 +12,7 @@ import base64
 import uuid
 from .models import User
 from .serializers import UserSerializer
+from inventory.analytics import month_window, user_order_analytics
 
 class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all()
@@ -81,51 +82,24 @@ class UserViewSet(viewsets.ModelViewSet):
                 'error': 'Not authenticated'
             }, status=status.HTTP_401_UNAUTHORIZED)
 
-        from inventory.models import Order
-        from django.db.models import Sum, Count, Q
-
-        user = request.user
-        user_orders = Order.objects.filter(user=user)
-
-        # Calculate total orders and revenue
-        total_orders = user_orders.count()
-        total_revenue = user_orders.aggregate(
-            total=Sum('product__price') * Sum('quantity')
-        )['total'] or 0
-
-        # Calculate orders by status
-        orders_by_status = user_orders.values('status').annotate(count=Count('id'))
-
-        # Calculate favorite categories
-        from django.db.models import F
-        categories = user_orders.values('product__category').annotate(
-            count=Count('id'),
-            revenue=Sum(F('product__price') * F('quantity'))
-        ).order_by('-count')[:5]
-
-        # Calculate monthly order history for the current year
-        from datetime import datetime, timezone
-        import calendar
-        current_year = datetime.now().year
-        monthly_data = []
-
-        for month in range(1, 13):
-            month_orders = user_orders.filter(
-                date__year=current_year,
-                date__month=month
-            ).count()
-            monthly_data.append({
-                'month': calendar.month_abbr[month],
-                'orders': month_orders
-            })
+        # Window of the monthly history: ?months=N (rolling) or ?year=YYYY
+        try:
+            year = request.query_params.get('year')
+            months = request.query_params.get('months')
+            year = int(year) if year else None
+            months = int(months) if months else None
+        except ValueError:
+            return Response({
+                'error': 'year and months must be whole numbers'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            first_month, length = month_window(year=year, months=months)
+        except ValueError as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
 
-        return Response({
-            'total_orders': total_orders,
-            'total_revenue': total_revenue,
-            'orders_by_status': list(orders_by_status),
-            'favorite_categories': list(categories),
-            'monthly_orders': monthly_data
-        })
+        return Response(user_order_analytics(request.user.id, first_month, length))
 
 @csrf_exempt
 @api_view(['POST'])
@@ -0,0 +1,112 @@
+"""
+Persisted forecasts.
+
+Every product's fitted model state is kept in ``ProductForecast``, so a
+read projects a few stored numbers forward instead of refitting from the
+sales history. Order changes that alter a product's units sold flag only
+that product ``dirty`` (see ``forecasting.signals``), and ``refresh`` refits
+just the dirty and never-fitted products, a batch at a time, so refresh cost
+follows sales activity rather than catalog size.
+
+A batch is claimed by clearing its dirty flags before the sales history is
+read. Orders saved while it is being fitted flag their product again and are
+picked up by the next refresh instead of being lost.
+"""
+from datetime import date
+from typing import Callable, Iterable, List, Optional, Sequence
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from inventory.models import Product
+from .engine import AUTO, demand_matrix, forecast, project, stack_state
+from .models import ProductForecast
+
+def mark_dirty(product_ids: Optional[Iterable[int]] = None):
+    """Flag forecasts for refitting; None flags every product"""
+    if product_ids is None:
+        ProductForecast.objects.filter(dirty=False).update(dirty=True)
+        return
+    ProductForecast.objects.bulk_create(
+        [ProductForecast(product_id=product_id, dirty=True) for product_id in sorted(set(product_ids))],
+        update_conflicts=True,
+        unique_fields=['product'],
+        update_fields=['dirty'],
+    )
+
+def stale_products(everything: bool = False):
+    """Ids of products that are dirty or were never fitted, in id order"""
+    products = Product.objects.order_by('id')
+    if not everything:
+        products = products.filter(Q(forecast__isnull=True) | Q(forecast__dirty=True) | Q(forecast__as_of__isnull=True))
+    return products.values_list('id', flat=True)
+
+def refit(product_ids: Sequence[int], today: Optional[date] = None) -> List[ProductForecast]:
+    """Fit and store forecasts for ``product_ids``; returns the stored rows"""
+    today = today or timezone.localdate()
+    if not product_ids:
+        return []
+    ProductForecast.objects.filter(pk__in=product_ids, dirty=True).update(dirty=False)
+    demand = demand_matrix(product_ids, today, settings.FORECAST_HISTORY_DAYS)
+    fitted = forecast(product_ids, demand, 1, AUTO, settings.FORECAST_SEASON_LENGTH)
+    now = timezone.now()
+    rows = [
+        ProductForecast(
+            product_id=product_id, method=str(fitted.methods[row]), state=fitted.row_state(row),
+            as_of=today, fitted_at=now, dirty=False,
+        )
+        for row, product_id in enumerate(product_ids)
+    ]
+    # dirty is left alone on existing rows: a flag set since the claim above must survive
+    ProductForecast.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=['product'],
+        update_fields=['method', 'state', 'as_of', 'fitted_at'],
+    )
+    return rows
+
+def refresh(batch_size: Optional[int] = None, everything: bool = False,
+            on_batch: Optional[Callable[[int], None]] = None) -> int:
+    """
+    Refit dirty and never-fitted products (every product with
+    ``everything``), ``batch_size`` per transaction; returns the number refit
+    """
+    batch_size = batch_size or settings.FORECAST_REFRESH_BATCH_SIZE
+    today = timezone.localdate()
+    # The ids are read up front, so products flagged during the run wait for the next one
+    ids = list(stale_products(everything))
+    refitted = 0
+    for start in range(0, len(ids), batch_size):
+        batch = ids[start:start + batch_size]
+        with transaction.atomic():
+            refit(batch, today)
+        refitted += len(batch)
+        if on_batch is not None:
+            on_batch(len(batch))
+    return refitted
+
+def cached_forecasts(product_ids: Sequence[int], horizon: int, today: Optional[date] = None):
+    """
+    Stored forecasts of ``product_ids`` for the ``horizon`` days from
+    ``today``, fitting the products that have none yet. Returns the rows (in
+    ``product_ids`` order) and the daily values, products x horizon.
+    """
+    today = today or timezone.localdate()
+    stored = ProductForecast.objects.filter(product_id__in=product_ids, as_of__isnull=False).in_bulk()
+    missing = [product_id for product_id in product_ids if product_id not in stored]
+    if missing:
+        with transaction.atomic():
+            stored.update((row.product_id, row) for row in refit(missing, today))
+    rows = [stored[product_id] for product_id in product_ids]
+
+    values = np.zeros((len(rows), horizon))
+    # Rows fitted on the same day share an offset, so each group is projected at once
+    ages = np.array([(today - row.as_of).days for row in rows], dtype=np.int64)
+    for age in np.unique(ages):
+        group = np.flatnonzero(ages == age)
+        methods = [rows[index].method for index in group]
+        state = stack_state(methods, [rows[index].state for index in group])
+        values[group] = project(np.array(methods), state, horizon, max(int(age), 0))
+    return rows, values
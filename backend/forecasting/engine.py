@@ -0,0 +1,207 @@
+"""
+Vectorized demand forecasting.
+
+Demand is held as a products x days matrix of units sold (rows are
+products, columns consecutive days, oldest first). Each model runs one
+loop over the days and does its per-day update for every product at once
+with NumPy, so a fit costs O(days) array operations however large the
+catalog is. Nothing here touches the database except ``demand_matrix``.
+"""
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Dict, Sequence
+import numpy as np
+from inventory.models import ProductSalesDay
+
+MOVING_AVERAGE = 'moving_average'
+HOLT_WINTERS = 'holt_winters'
+CROSTON = 'croston'
+AUTO = 'auto'
+METHODS = (MOVING_AVERAGE, HOLT_WINTERS, CROSTON)
+
+# Average days between sales above which demand counts as intermittent
+# (Syntetos-Boylan cut-off) and Croston is preferred in auto mode
+INTERMITTENT_ADI = 1.32
+
+# Larger product sets read the whole date range instead of an IN (...) list
+MAX_ID_FILTER = 5_000
+
+@dataclass
+class Forecast:
+    """Daily forecasts (products x horizon) plus the fitted state of each model"""
+    product_ids: np.ndarray
+    methods: np.ndarray
+    values: np.ndarray
+    state: Dict[str, np.ndarray] = field(default_factory=dict)
+
+    def totals(self) -> np.ndarray:
+        return self.values.sum(axis=1)
+
+    def row_state(self, row: int) -> Dict[str, object]:
+        """State of one product's model, keyed without the method prefix, as plain floats and lists"""
+        prefix = f'{self.methods[row]}.'
+        return {key[len(prefix):]: value[row].tolist() for key, value in self.state.items() if key.startswith(prefix)}
+
+def demand_matrix(product_ids: Sequence[int], end: date, days: int) -> np.ndarray:
+    """
+    Units sold per product (rows, in ``product_ids`` order) and day (columns)
+    over the ``days`` days before ``end``, read from the daily sales rollup
+    """
+    ids = np.asarray(product_ids, dtype=np.int64)
+    matrix = np.zeros((len(ids), days), dtype=np.float32)
+    if not len(ids):
+        return matrix
+    start = end - timedelta(days=days)
+    rows = ProductSalesDay.objects.filter(day__gte=start, day__lt=end, units__gt=0)
+    if len(ids) <= MAX_ID_FILTER:
+        rows = rows.filter(product_id__in=ids.tolist())
+    first_day = start.toordinal()
+    data = np.fromiter(
+        (
+            value
+            for product_id, day, units in rows.values_list('product_id', 'day', 'units').iterator(chunk_size=10_000)
+            for value in (product_id, day.toordinal() - first_day, units)
+        ),
+        dtype=np.int64,
+    ).reshape(-1, 3)
+    if not len(data):
+        return matrix
+
+    # Map product ids to rows; rollup rows of products not asked for are dropped
+    order = np.argsort(ids)
+    positions = np.minimum(np.searchsorted(ids, data[:, 0], sorter=order), len(ids) - 1)
+    row_index = order[positions]
+    known = ids[row_index] == data[:, 0]
+    np.add.at(matrix, (row_index[known], data[known, 1]), data[known, 2])
+    return matrix
+
+def moving_average(demand: np.ndarray, window: int = 28) -> Dict[str, np.ndarray]:
+    """Mean of the last ``window`` days, held flat over the horizon"""
+    level = demand[:, -window:].mean(axis=1) if demand.shape[1] else np.zeros(len(demand))
+    return {'level': np.asarray(level, dtype=np.float64)}
+
+def holt_winters(demand: np.ndarray, season_length: int = 7, alpha: float = 0.2,
+                 beta: float = 0.05, gamma: float = 0.1, phi: float = 0.95) -> Dict[str, np.ndarray]:
+    """
+    Additive Holt-Winters with a damped trend. Needs two full seasons of
+    history; the first two seasons initialise level, trend and seasonality.
+    """
+    products, days = demand.shape
+    m = season_length
+    if days < 2 * m:
+        raise ValueError(f'Holt-Winters needs at least {2 * m} days of history')
+
+    # Day-major copies, so each step reads and writes contiguous memory
+    by_day = np.ascontiguousarray(demand.T, dtype=np.float64)
+    first, second = by_day[:m].mean(axis=0), by_day[m:2 * m].mean(axis=0)
+    level = first.copy()
+    trend = (second - first) / m
+    season = by_day[:m] - first
+    for t in range(days):
+        index = t % m
+        observed = by_day[t]
+        previous_level = level
+        level = alpha * (observed - season[index]) + (1 - alpha) * (level + phi * trend)
+        trend = beta * (level - previous_level) + (1 - beta) * phi * trend
+        season[index] = gamma * (observed - level) + (1 - gamma) * season[index]
+
+    # Products as rows again, rotated so column 0 is the season of the first forecast day
+    season = np.roll(season.T, -(days % m), axis=1)
+    return {'level': level, 'trend': trend, 'season': season, 'phi': np.full(products, phi)}
+
+def croston(demand: np.ndarray, alpha: float = 0.1) -> Dict[str, np.ndarray]:
+    """
+    Croston's method for intermittent demand: smooths the size of non-zero
+    demands and the interval between them separately; the forecast is
+    their ratio
+    """
+    products, days = demand.shape
+    by_day = np.ascontiguousarray(demand.T, dtype=np.float64)
+    counts = (by_day > 0).sum(axis=0)
+    has_sales = counts > 0
+    size = np.where(has_sales, by_day.sum(axis=0) / np.maximum(counts, 1), 0.0)
+    interval = np.where(has_sales, days / np.maximum(counts, 1), 1.0)
+    since = np.zeros(products)
+    for t in range(days):
+        since += 1
+        # Only the products that sold that day are updated
+        sold = np.flatnonzero(by_day[t])
+        size[sold] += alpha * (by_day[t, sold] - size[sold])
+        interval[sold] += alpha * (since[sold] - interval[sold])
+        since[sold] = 0
+    return {'size': size, 'interval': interval, 'since': since}
+
+def project(methods: np.ndarray, state: Dict[str, np.ndarray], horizon: int, offset: int = 0) -> np.ndarray:
+    """
+    Daily forecasts (products x horizon) from fitted state alone, starting
+    ``offset`` days after the last day of history. ``state`` uses the
+    ``'{method}.{key}'`` layout of ``Forecast.state``.
+    """
+    methods = np.asarray(methods)
+    values = np.zeros((len(methods), horizon))
+    rows = methods == MOVING_AVERAGE
+    if rows.any():
+        values[rows] = state[f'{MOVING_AVERAGE}.level'][rows, None]
+    rows = methods == CROSTON
+    if rows.any():
+        values[rows] = (state[f'{CROSTON}.size'][rows] / state[f'{CROSTON}.interval'][rows])[:, None]
+    rows = methods == HOLT_WINTERS
+    if rows.any():
+        level, trend, season, phi = (
+            state[f'{HOLT_WINTERS}.{key}'][rows] for key in ('level', 'trend', 'season', 'phi')
+        )
+        steps = np.arange(1, offset + horizon + 1)
+        damping = np.cumsum(phi[:, None] ** steps[None, :], axis=1)[:, offset:]
+        values[rows] = (
+            level[:, None] + trend[:, None] * damping + season[:, (steps[offset:] - 1) % season.shape[1]]
+        )
+    return np.maximum(values, 0)
+
+def stack_state(methods: Sequence[str], states: Sequence[Dict[str, object]]) -> Dict[str, np.ndarray]:
+    """Inverse of ``Forecast.row_state``: per-product state back into full-length arrays"""
+    stacked: Dict[str, np.ndarray] = {}
+    for row, (method, values) in enumerate(zip(methods, states)):
+        for key, value in values.items():
+            value = np.asarray(value, dtype=np.float64)
+            full = stacked.setdefault(f'{method}.{key}', np.full((len(methods),) + value.shape, np.nan))
+            full[row] = value
+    return stacked
+
+def average_days_between_sales(demand: np.ndarray) -> np.ndarray:
+    counts = (demand > 0).sum(axis=1)
+    return np.where(counts > 0, demand.shape[1] / np.maximum(counts, 1), np.inf)
+
+def forecast(product_ids: Sequence[int], demand: np.ndarray, horizon: int, method: str = AUTO,
+             season_length: int = 7) -> Forecast:
+    """
+    Fit ``method`` to every row of ``demand``. ``auto`` picks Croston for
+    intermittent demand, Holt-Winters when there are two seasons of history
+    and a moving average otherwise, still fitting each model once for the
+    whole matrix. Holt-Winters falls back to a moving average on shorter
+    histories.
+    """
+    ids = np.asarray(product_ids, dtype=np.int64)
+    seasonal = demand.shape[1] >= 2 * season_length
+    if method == AUTO:
+        intermittent = average_days_between_sales(demand) > INTERMITTENT_ADI
+        methods = np.where(intermittent, CROSTON, HOLT_WINTERS if seasonal else MOVING_AVERAGE)
+    elif method in METHODS:
+        methods = np.full(len(ids), MOVING_AVERAGE if method == HOLT_WINTERS and not seasonal else method)
+    else:
+        raise ValueError(f"Unknown forecasting method '{method}'")
+
+    # State arrays cover every product; rows fitted by another model hold NaN
+    state: Dict[str, np.ndarray] = {}
+    for name, fit in (
+        (CROSTON, croston),
+        (HOLT_WINTERS, lambda d: holt_winters(d, season_length)),
+        (MOVING_AVERAGE, moving_average),
+    ):
+        rows = methods == name
+        if not rows.any():
+            continue
+        fitted = fit(demand if rows.all() else demand[rows])
+        for key, value in fitted.items():
+            full = state.setdefault(f'{name}.{key}', np.full((len(ids),) + value.shape[1:], np.nan))
+            full[rows] = value
+    return Forecast(ids, methods, project(methods, state, horizon), state)
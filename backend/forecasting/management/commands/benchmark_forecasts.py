@@ -0,0 +1,69 @@
+import time
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from inventory.models import Product
+from forecasting.engine import AUTO, METHODS, demand_matrix, forecast
+
+class Command(BaseCommand):
+    help = 'Time catalog-wide forecast fits on synthetic demand, or on the real catalog with --from-db'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100_000, help='Synthetic products (default: 100000)')
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.FORECAST_HISTORY_DAYS,
+            help=f'Days of history (default: {settings.FORECAST_HISTORY_DAYS})',
+        )
+        parser.add_argument(
+            '--horizon',
+            type=int,
+            default=settings.FORECAST_HORIZON_DAYS,
+            help=f'Days forecast (default: {settings.FORECAST_HORIZON_DAYS})',
+        )
+        parser.add_argument('--repeat', type=int, default=3, help='Fits per method; the best is reported (default: 3)')
+        parser.add_argument('--seed', type=int, default=42, help='Seed of the synthetic demand (default: 42)')
+        parser.add_argument(
+            '--from-db',
+            action='store_true',
+            help='Fit every product in the database from the sales rollup instead of synthetic demand',
+        )
+
+    def handle(self, *args, **options):
+        days, horizon = options['days'], options['horizon']
+        started = time.perf_counter()
+        if options['from_db']:
+            ids = list(Product.objects.order_by('id').values_list('id', flat=True))
+            demand = demand_matrix(ids, timezone.localdate(), days)
+            source = 'database'
+        else:
+            ids = np.arange(1, options['products'] + 1)
+            demand = self._synthetic(len(ids), days, options['seed'])
+            source = 'synthetic'
+        self.stdout.write(
+            f'Demand matrix: {len(ids):,} products x {days} days ({source}, '
+            f'{demand.nbytes / 2**20:.0f} MB) built in {time.perf_counter() - started:.2f}s'
+        )
+
+        for method in METHODS + (AUTO,):
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                fitted = forecast(ids, demand, horizon, method, settings.FORECAST_SEASON_LENGTH)
+                timings.append(time.perf_counter() - started)
+            best = min(timings)
+            style = self.style.SUCCESS if best < 1 else self.style.WARNING
+            mix = ', '.join(f'{name} {count:,}' for name, count in zip(*np.unique(fitted.methods, return_counts=True)))
+            self.stdout.write(style(
+                f'  {method:<15} {best:.3f}s ({len(ids) / best:,.0f} products/s)'
+                + (f' [{mix}]' if method == AUTO else '')
+            ))
+
+    def _synthetic(self, products, days, seed):
+        """Poisson demand with a weekly pattern; most products sell rarely, a few a lot"""
+        rng = np.random.default_rng(seed)
+        rates = rng.gamma(0.4, 2.5, size=(products, 1))
+        weekly = 1 + 0.3 * np.sin(np.arange(days) * 2 * np.pi / 7)
+        return rng.poisson(rates * weekly).astype(np.float32)
@@ -0,0 +1,34 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from forecasting.cache import refresh
+
+class Command(BaseCommand):
+    help = 'Refit the stored forecasts of products whose sales changed, or of every product with --all'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.FORECAST_REFRESH_BATCH_SIZE,
+            help=f'Products refit per transaction (default: {settings.FORECAST_REFRESH_BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Refit every product, e.g. nightly, so quiet products move their history window on',
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        done = 0
+
+        def progress(count):
+            nonlocal done
+            done += count
+            self.stdout.write(f'  {done:,} products refit')
+
+        refitted = refresh(options['batch_size'], options['all'], progress)
+        self.stdout.write(self.style.SUCCESS(
+            f'Refit {refitted:,} forecasts in {time.perf_counter() - started:.2f}s'
+        ))
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-17 04:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('inventory', '0010_backfill_product_sales_day'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductForecast',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='forecast', serialize=False, to='inventory.product')),
+                ('method', models.CharField(blank=True, max_length=20)),
+                ('state', models.JSONField(default=dict)),
+                ('as_of', models.DateField(blank=True, null=True)),
+                ('fitted_at', models.DateTimeField(blank=True, null=True)),
+                ('dirty', models.BooleanField(default=True)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('dirty', True)), fields=['product'], name='forecast_dirty_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import models
+from django.db.models import Q
+from inventory.models import Product
+
+class ProductForecast(models.Model):
+    """
+    Fitted demand model of one product, so forecasts are read, not fitted,
+    per request. ``as_of`` is the first forecast day (history ends the day
+    before); any horizon is projected from ``state``. Products whose sales
+    change are flagged ``dirty`` until ``refresh_forecasts`` refits them.
+    Maintained by ``forecasting.cache``.
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='forecast')
+    method = models.CharField(max_length=20, blank=True)
+    state = models.JSONField(default=dict)
+    as_of = models.DateField(null=True, blank=True)
+    fitted_at = models.DateTimeField(null=True, blank=True)
+    dirty = models.BooleanField(default=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['product'], condition=Q(dirty=True), name='forecast_dirty_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.method or 'not fitted'} as of {self.as_of}"
@@ -0,0 +1,9 @@
+from django.dispatch import receiver
+from inventory.models import ProductSalesDay
+from inventory.rollups import units_changed
+from .cache import mark_dirty
+
+@receiver(units_changed, sender=ProductSalesDay)
+def mark_forecasts_dirty(sender, product_ids, **kwargs):
+    """Orders changed the units sold of these products; refit only them"""
+    mark_dirty(product_ids)
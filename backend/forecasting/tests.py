@@ -0,0 +1,156 @@
+from datetime import timedelta
+import numpy as np
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from inventory.models import Order, Product, Supplier
+from inventory.rollups import rebuild_all_rollups
+from .cache import cached_forecasts, refresh
+from .engine import (
+    AUTO, CROSTON, HOLT_WINTERS, MOVING_AVERAGE, croston, forecast, holt_winters, moving_average, project,
+    stack_state,
+)
+from .models import ProductForecast
+
+User = get_user_model()
+
+# Rows: steady, intermittent, weekly pattern, no sales
+DEMAND = np.array([
+    [4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4, 4],
+    [0, 4, 0, 0, 4, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+    [1, 5, 1, 5, 1, 5, 1, 5, 1, 5, 1, 5, 1, 5, 1],
+    [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+], dtype=np.float32)
+
+class EngineTests(SimpleTestCase):
+    def test_moving_average(self):
+        state = moving_average(DEMAND[:, -4:], window=2)
+        np.testing.assert_allclose(state['level'], [4, 0, 3, 0])
+
+    def test_croston(self):
+        state = croston(DEMAND[1:2, :6], alpha=0.5)
+        # Two sales of 4, two and three days apart from the start and each other
+        np.testing.assert_allclose(state['size'], [4])
+        np.testing.assert_allclose(state['interval'], [2.75])
+        np.testing.assert_allclose(state['since'], [1])
+        np.testing.assert_allclose(project(np.array([CROSTON]), {f'{CROSTON}.{k}': v for k, v in state.items()}, 2),
+                                   [[4 / 2.75, 4 / 2.75]])
+
+    def test_croston_without_sales(self):
+        state = croston(DEMAND[3:], alpha=0.5)
+        np.testing.assert_allclose(state['size'], [0])
+        np.testing.assert_allclose(state['interval'], [1])
+
+    def test_holt_winters_repeats_a_clean_season(self):
+        state = holt_winters(DEMAND[2:3], season_length=2)
+        np.testing.assert_allclose(state['level'], [3])
+        np.testing.assert_allclose(state['trend'], [0], atol=1e-12)
+        # History ends on a 1, so the season is rotated to start with the 5
+        np.testing.assert_allclose(state['season'], [[2, -2]])
+        values = project(np.array([HOLT_WINTERS]), {f'{HOLT_WINTERS}.{k}': v for k, v in state.items()}, 3)
+        np.testing.assert_allclose(values, [[5, 1, 5]])
+
+    def test_holt_winters_needs_two_seasons(self):
+        with self.assertRaises(ValueError):
+            holt_winters(DEMAND[:, :13], season_length=7)
+
+    def test_auto_picks_a_method_per_row(self):
+        fitted = forecast([1, 2, 3, 4], DEMAND, 7, AUTO, season_length=7)
+        self.assertEqual(fitted.methods.tolist(), [HOLT_WINTERS, CROSTON, HOLT_WINTERS, CROSTON])
+        np.testing.assert_allclose(fitted.values[0], np.full(7, 4), rtol=1e-6)
+        np.testing.assert_allclose(fitted.values[3], np.zeros(7))
+
+        short = forecast([1, 2, 3, 4], DEMAND[:, :10], 7, AUTO, season_length=7)
+        self.assertEqual(short.methods.tolist(), [MOVING_AVERAGE, CROSTON, MOVING_AVERAGE, CROSTON])
+
+    def test_holt_winters_falls_back_on_short_history(self):
+        fitted = forecast([1], DEMAND[:1, :10], 3, HOLT_WINTERS, season_length=7)
+        self.assertEqual(fitted.methods.tolist(), [MOVING_AVERAGE])
+        with self.assertRaises(ValueError):
+            forecast([1], DEMAND[:1], 3, 'prophet')
+
+    def test_damped_trend_projection_and_offset(self):
+        state = {
+            f'{HOLT_WINTERS}.level': np.array([10.0]),
+            f'{HOLT_WINTERS}.trend': np.array([1.0]),
+            f'{HOLT_WINTERS}.season': np.zeros((1, 3)),
+            f'{HOLT_WINTERS}.phi': np.array([0.5]),
+        }
+        methods = np.array([HOLT_WINTERS])
+        np.testing.assert_allclose(project(methods, state, 3), [[10.5, 10.75, 10.875]])
+        np.testing.assert_allclose(project(methods, state, 2, offset=1), [[10.75, 10.875]])
+
+    def test_offset_continues_the_projection(self):
+        fitted = forecast([1, 2, 3, 4], DEMAND, 1, AUTO, season_length=2)
+        full = project(fitted.methods, fitted.state, 9)
+        for offset in (1, 2, 5):
+            np.testing.assert_allclose(project(fitted.methods, fitted.state, 9 - offset, offset), full[:, offset:])
+
+    def test_row_state_round_trip(self):
+        fitted = forecast([1, 2, 3, 4], DEMAND, 5, AUTO, season_length=7)
+        methods = fitted.methods.tolist()
+        state = stack_state(methods, [fitted.row_state(row) for row in range(4)])
+        np.testing.assert_allclose(project(np.array(methods), state, 5), fitted.values)
+
+class ForecastCacheTests(TestCase):
+    def setUp(self):
+        supplier = Supplier.objects.create(name='Acme', contact='acme@example.com', phone='555-0100')
+        self.user = User.objects.create_user(username='buyer', password='secret')
+        self.product = Product.objects.create(
+            name='Widget', supplier=supplier, category='Electronics', quantity=100, price='2.50', min_stock=5
+        )
+        self.other = Product.objects.create(
+            name='Gadget', supplier=supplier, category='Electronics', quantity=100, price='4.00', min_stock=5
+        )
+        refresh()
+
+    def is_dirty(self, product):
+        return ProductForecast.objects.get(pk=product.pk).dirty
+
+    def test_refresh_fits_every_product(self):
+        self.assertEqual(ProductForecast.objects.filter(dirty=False, as_of__isnull=False).count(), 2)
+        self.assertEqual(refresh(), 0)
+
+    def test_orders_flag_only_their_product(self):
+        order = Order.objects.create(product=self.product, user=self.user, quantity=3)
+        self.assertTrue(self.is_dirty(self.product))
+        self.assertFalse(self.is_dirty(self.other))
+
+        self.assertEqual(refresh(), 1)
+        self.assertFalse(self.is_dirty(self.product))
+
+        order.quantity = 4
+        order.save()
+        self.assertTrue(self.is_dirty(self.product))
+        refresh()
+
+        order.delete()
+        self.assertTrue(self.is_dirty(self.product))
+        self.assertFalse(self.is_dirty(self.other))
+
+    def test_changes_that_keep_units_leave_forecasts_clean(self):
+        order = Order.objects.create(product=self.product, user=self.user, quantity=3, status='Cancelled')
+        self.assertFalse(self.is_dirty(self.product))
+        refresh()
+        order = Order.objects.create(product=self.product, user=self.user, quantity=3)
+        refresh()
+        order.status = 'Shipped'
+        order.save()
+        self.assertFalse(self.is_dirty(self.product))
+
+    def test_rebuild_flags_every_product(self):
+        rebuild_all_rollups()
+        self.assertTrue(self.is_dirty(self.product))
+        self.assertTrue(self.is_dirty(self.other))
+
+    def test_aged_rows_are_projected_from_their_fit_day(self):
+        today = timezone.localdate()
+        state = {'level': 10.0, 'trend': 1.0, 'season': [0.0, 0.0, 0.0], 'phi': 0.5}
+        ProductForecast.objects.filter(pk=self.product.pk).update(
+            method=HOLT_WINTERS, state=state, as_of=today - timedelta(days=2)
+        )
+        rows, values = cached_forecasts([self.product.pk, self.other.pk], 2, today)
+        self.assertEqual([row.pk for row in rows], [self.product.pk, self.other.pk])
+        # Two days past the fit: steps 3 and 4 of the damped trend
+        np.testing.assert_allclose(values[0], [10.875, 10.9375])
+        np.testing.assert_allclose(values[1], [0, 0])
@@ -0,0 +1,95 @@
+from django.conf import settings
+from django.utils import timezone
+from rest_framework import viewsets, status
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from inventory.models import Product
+from .cache import cached_forecasts
+from .engine import AUTO, METHODS, demand_matrix, forecast
+
+class ForecastPagination(PageNumberPagination):
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+class ForecastViewSet(viewsets.GenericViewSet):
+    """
+    Daily demand forecasts per product. ``auto`` forecasts are projected
+    from the stored model state of each product (fitting only products that
+    have none yet); other methods are fitted on request from the daily sales
+    rollup, one page of products at a time, as one matrix.
+    """
+    queryset = Product.objects.order_by('id').only('id', 'name', 'category')
+    permission_classes = [AllowAny]  # Temporarily allow all
+    pagination_class = ForecastPagination
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        category = self.request.query_params.get('category')
+        if category:
+            queryset = queryset.filter(category=category)
+        products = self.request.query_params.get('product')
+        if products:
+            queryset = queryset.filter(pk__in=[int(pk) for pk in products.split(',') if pk.strip()])
+        return queryset
+
+    def list(self, request):
+        method = request.query_params.get('method', AUTO)
+        if method != AUTO and method not in METHODS:
+            return Response(
+                {'detail': f"'method' must be one of: {', '.join((AUTO,) + METHODS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            horizon = int(request.query_params.get('horizon', settings.FORECAST_HORIZON_DAYS))
+            page = self.paginate_queryset(self.get_queryset())
+        except ValueError:
+            return Response({'detail': "'horizon' and 'product' must be whole numbers"}, status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= horizon <= settings.FORECAST_MAX_HORIZON_DAYS:
+            return Response(
+                {'detail': f"'horizon' must be between 1 and {settings.FORECAST_MAX_HORIZON_DAYS}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        today = timezone.localdate()
+        ids = [product.pk for product in page]
+        if method == AUTO:
+            stored, values = cached_forecasts(ids, horizon, today)
+            methods = [row.method for row in stored]
+            freshness = [
+                {
+                    'as_of': row.as_of.isoformat(),
+                    'fitted_at': row.fitted_at.isoformat(),
+                    'age_days': (today - row.as_of).days,
+                    # Orders changed its sales since the fit; refresh_forecasts will refit it
+                    'dirty': row.dirty,
+                }
+                for row in stored
+            ]
+        else:
+            demand = demand_matrix(ids, today, settings.FORECAST_HISTORY_DAYS)
+            fitted = forecast(ids, demand, horizon, method, settings.FORECAST_SEASON_LENGTH)
+            methods, values = fitted.methods, fitted.values
+            live = {'as_of': today.isoformat(), 'fitted_at': timezone.now().isoformat(), 'age_days': 0, 'dirty': False}
+            freshness = [live] * len(ids)
+        results = [
+            {
+                'product_id': product.pk,
+                'name': product.name,
+                'category': product.category,
+                'method': str(methods[row]),
+                'total': round(float(values[row].sum()), 2),
+                'daily': [round(float(value), 2) for value in values[row]],
+                'freshness': freshness[row],
+            }
+            for row, product in enumerate(page)
+        ]
+
+        response = self.get_paginated_response(results)
+        response.data.update({
+            'start': today.isoformat(),
+            'horizon': horizon,
+            'history_days': settings.FORECAST_HISTORY_DAYS,
+            'method': method,
+        })
+        return response
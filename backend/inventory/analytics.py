@@ -0,0 +1,110 @@
+"""
+Per-user order analytics for the profile page.
+
+Totals, the status breakdown and category breakdown come from one
+conditional aggregate, and the monthly history from one ``TruncMonth``
+grouped query over the requested window. Both use the ``(user_id, date)``
+index on orders.
+"""
+import calendar
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from .models import Order, Product
+
+CANCELLED = 'Cancelled'
+STATUSES = [value for value, _ in Order.STATUS_CHOICES]
+CATEGORIES = [value for value, _ in Product.CATEGORY_CHOICES]
+
+# Longest rolling window accepted by ?months=
+MAX_WINDOW_MONTHS = 120
+
+def _add_months(day: date, months: int) -> date:
+    month = day.year * 12 + day.month - 1 + months
+    return date(month // 12, month % 12 + 1, 1)
+
+def month_window(year: Optional[int] = None, months: Optional[int] = None) -> Tuple[date, int]:
+    """
+    First month and length of the history window: the calendar ``year``,
+    the last ``months`` months up to and including this one, or (by
+    default) the current calendar year
+    """
+    today = timezone.localdate()
+    if months is not None:
+        if not 1 <= months <= MAX_WINDOW_MONTHS:
+            raise ValueError(f"'months' must be between 1 and {MAX_WINDOW_MONTHS}")
+        return _add_months(today.replace(day=1), 1 - months), months
+    return date(year or today.year, 1, 1), 12
+
+def _money(value) -> Decimal:
+    return Decimal(value or 0).quantize(Decimal('0.01'))
+
+def _aware(day: date) -> datetime:
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+def user_order_analytics(user_id: int, first_month: date, months: int) -> Dict[str, Any]:
+    orders = Order.objects.filter(user_id=user_id)
+    earning = ~Q(status=CANCELLED)
+
+    aggregates = {
+        'total_orders': Count('id'),
+        'total_units': Sum('quantity', filter=earning),
+        'total_revenue': Sum('line_total', filter=earning),
+    }
+    for index, value in enumerate(STATUSES):
+        aggregates[f'status_{index}'] = Count('id', filter=Q(status=value))
+    for index, value in enumerate(CATEGORIES):
+        in_category = Q(product__category=value)
+        aggregates[f'category_count_{index}'] = Count('id', filter=in_category)
+        aggregates[f'category_revenue_{index}'] = Sum('line_total', filter=in_category & earning)
+    totals = orders.aggregate(**aggregates)
+
+    end_month = _add_months(first_month, months)
+    history = {
+        row['month'].date() if isinstance(row['month'], datetime) else row['month']: row
+        for row in orders.filter(date__gte=_aware(first_month), date__lt=_aware(end_month))
+        .annotate(month=TruncMonth('date'))
+        .values('month')
+        .annotate(orders=Count('id'), units=Sum('quantity', filter=earning), spent=Sum('line_total', filter=earning))
+        .order_by()
+    }
+
+    monthly: List[Dict[str, Any]] = []
+    for offset in range(months):
+        month = _add_months(first_month, offset)
+        row = history.get(month, {})
+        monthly.append({
+            'month': calendar.month_abbr[month.month],
+            'period': month.strftime('%Y-%m'),
+            'orders': row.get('orders', 0),
+            'units': row.get('units') or 0,
+            'spent': _money(row.get('spent')),
+        })
+
+    categories = [
+        {
+            'product__category': value,
+            'count': totals[f'category_count_{index}'],
+            'revenue': _money(totals[f'category_revenue_{index}']),
+        }
+        for index, value in enumerate(CATEGORIES)
+        if totals[f'category_count_{index}']
+    ]
+    categories.sort(key=lambda category: -category['count'])
+
+    return {
+        'total_orders': totals['total_orders'],
+        'total_units': totals['total_units'] or 0,
+        'total_revenue': _money(totals['total_revenue']),
+        'orders_by_status': [
+            {'status': value, 'count': totals[f'status_{index}']}
+            for index, value in enumerate(STATUSES)
+            if totals[f'status_{index}']
+        ],
+        'favorite_categories': categories[:5],
+        'monthly_orders': monthly,
+        'window': {'start': first_month.isoformat(), 'end': end_month.isoformat(), 'months': months},
+    }
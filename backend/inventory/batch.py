@@ -0,0 +1,197 @@
+"""
+Batch writes for the inventory API.
+
+``POST /api/<resource>/batch/`` takes a list of objects. Items with an
+``id`` partially update that object and the others are created. Every item
+is validated first, and if any fails nothing is written. Otherwise all rows
+are written in one transaction with ``bulk_create``/``bulk_update``. Per-row
+signals do not fire; one summary notification is queued for the whole batch.
+"""
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import serializers, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from notifications.dispatch import enqueue
+
+Create = Tuple[int, Dict[str, Any]]
+Update = Tuple[int, Any, Dict[str, Any]]
+
+class BatchItemErrors(Exception):
+    """Raised by ``perform_batch`` to reject the batch with errors for specific items"""
+
+    def __init__(self, errors: Dict[int, Any]):
+        self.errors = errors
+        super().__init__(f"{len(errors)} batch items failed")
+
+class PrefetchedLookup:
+    """
+    Stands in for a related field's queryset so validating a batch resolves
+    each foreign key from one ``in_bulk`` query instead of one query per item
+    """
+
+    def __init__(self, queryset, values):
+        self.model = queryset.model
+        keys = set()
+        for value in values:
+            try:
+                keys.add(self.model._meta.pk.to_python(value))
+            except ValidationError:
+                pass
+        self.objects = queryset.in_bulk(keys)
+
+    def get(self, pk):
+        try:
+            key = self.model._meta.pk.to_python(pk)
+        except ValidationError:
+            raise ValueError(pk)
+        try:
+            return self.objects[key]
+        except KeyError:
+            raise self.model.DoesNotExist
+
+def related_lookups(serializer_class, items: List[Dict]) -> Dict[str, PrefetchedLookup]:
+    lookups = {}
+    for name, field in serializer_class().fields.items():
+        if isinstance(field, serializers.PrimaryKeyRelatedField) and not field.read_only:
+            values = [item[name] for item in items if item.get(name) is not None and not isinstance(item[name], (bool, list, dict))]
+            lookups[name] = PrefetchedLookup(field.get_queryset(), values)
+    return lookups
+
+def use_lookups(serializer, lookups: Dict[str, PrefetchedLookup]):
+    for name, lookup in lookups.items():
+        serializer.fields[name].queryset = lookup
+
+class BatchWriteMixin:
+    """Adds ``POST <list route>/batch/`` to a ModelViewSet"""
+
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return Response({'detail': 'Expected a non-empty list of objects.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > settings.INVENTORY_BATCH_MAX_SIZE:
+            return Response(
+                {'detail': f'At most {settings.INVENTORY_BATCH_MAX_SIZE} objects per batch.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        creates, updates, errors = self._validate_batch(items)
+        if not errors:
+            try:
+                with transaction.atomic():
+                    created, updated = self.perform_batch(creates, updates)
+                    summary = self.batch_summary(created, updated)
+                    if summary is not None:
+                        enqueue('inventory_batch', summary)
+            except BatchItemErrors as e:
+                errors = e.errors
+            except IntegrityError as e:
+                # Items that only conflict with each other, e.g. two new products with the same name
+                return Response({'detail': f'The batch conflicts with itself: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+        if errors:
+            results = [
+                {'index': index, 'status': 'error', 'errors': errors[index]} if index in errors
+                else {'index': index, 'status': 'valid'}
+                for index in range(len(items))
+            ]
+            return Response({'created': 0, 'updated': 0, 'results': results}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = [None] * len(items)
+        for (index, _), instance in zip(creates, created):
+            results[index] = {'index': index, 'status': 'created', 'data': self.get_serializer(instance).data}
+        for (index, _, _), instance in zip(updates, updated):
+            results[index] = {'index': index, 'status': 'updated', 'data': self.get_serializer(instance).data}
+        return Response(
+            {'created': len(created), 'updated': len(updated), 'results': results},
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
+
+    def _validate_batch(self, items: List[Any]) -> Tuple[List[Create], List[Update], Dict[int, Any]]:
+        errors: Dict[int, Any] = {}
+        create_items: List[Tuple[int, Dict]] = []
+        update_items: List[Tuple[int, Any, Dict]] = []
+        pk_field = self.queryset.model._meta.pk
+        seen_ids = set()
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                errors[index] = {'non_field_errors': ['Expected an object.']}
+                continue
+            if item.get('id') is None:
+                create_items.append((index, item))
+                continue
+            try:
+                pk = pk_field.to_python(item['id'])
+            except ValidationError:
+                errors[index] = {'id': ['Not found.']}
+                continue
+            if pk in seen_ids:
+                errors[index] = {'id': ['Appears more than once in this batch.']}
+            else:
+                seen_ids.add(pk)
+                update_items.append((index, pk, item))
+
+        lookups = related_lookups(self.get_serializer_class(), [item for _, item in create_items] + [item for _, _, item in update_items])
+
+        creates: List[Create] = []
+        if create_items:
+            serializer = self.get_serializer(data=[item for _, item in create_items], many=True)
+            use_lookups(serializer.child, lookups)
+            if serializer.is_valid():
+                creates = [(index, data) for (index, _), data in zip(create_items, serializer.validated_data)]
+            else:
+                # Newer DRF versions report list errors as {position: errors}
+                list_errors = serializer.errors
+                if not isinstance(list_errors, dict):
+                    list_errors = dict(enumerate(list_errors))
+                for position, (index, _) in enumerate(create_items):
+                    if list_errors.get(position):
+                        errors[index] = list_errors[position]
+
+        updates: List[Update] = []
+        if update_items:
+            instances = self.queryset.in_bulk([pk for _, pk, _ in update_items])
+            for index, pk, item in update_items:
+                instance = instances.get(pk)
+                if instance is None:
+                    errors[index] = {'id': ['Not found.']}
+                    continue
+                serializer = self.get_serializer(instance, data=item, partial=True)
+                use_lookups(serializer, lookups)
+                if serializer.is_valid():
+                    updates.append((index, instance, serializer.validated_data))
+                else:
+                    errors[index] = serializer.errors
+        return creates, updates, errors
+
+    def perform_batch(self, creates: List[Create], updates: List[Update]):
+        """Write the validated items; returns the created and updated instances"""
+        model = self.queryset.model
+        created = model.objects.bulk_create([model(**data) for _, data in creates])
+
+        updated = [instance for _, instance, _ in updates]
+        # Each row is written with only the fields its own item set, so values
+        # loaded at validation time (e.g. stock moved since) are not written back
+        by_fields: Dict[Tuple[str, ...], List[Any]] = defaultdict(list)
+        now = timezone.now()
+        for _, instance, data in updates:
+            for field, value in data.items():
+                setattr(instance, field, value)
+            instance.updated_at = now
+            by_fields[tuple(sorted({*data, 'updated_at'}))].append(instance)
+        for fields, instances in sorted(by_fields.items()):
+            model.objects.bulk_update(instances, fields)
+        return created, updated
+
+    def batch_summary(self, created: List[Any], updated: List[Any]) -> Optional[Dict[str, Any]]:
+        """Payload of the ``inventory_batch`` notification event, or None for no notification"""
+        return {
+            'resource': self.basename,
+            'created': len(created),
+            'updated': len(updated),
+            'names': [str(getattr(instance, 'name', instance)) for instance in created[:5]],
+        }
@@ -0,0 +1,111 @@
+"""
+Streaming exports for the inventory API.
+
+``GET /api/<resource>/export/?format=csv|ndjson`` streams every row matching
+the list filters. Rows are read with ``values_list().iterator()`` (a
+server-side cursor on PostgreSQL) and written out in blocks, so neither
+model instances nor serializers are built. Memory use stays flat however
+many rows are exported. Under ASGI the body is an async iterator that pulls
+each block through ``sync_to_async``; Django would otherwise read a sync
+iterator into a list before sending anything.
+"""
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import AsyncIterator, Iterator, List, Tuple
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+from rest_framework import renderers
+from rest_framework.decorators import action
+
+# Rows written per chunk of the response body
+ROWS_PER_BLOCK = 500
+
+class CSVRenderer(renderers.BaseRenderer):
+    """
+    Lets ``?format=csv`` through content negotiation. Exports stream their
+    own body, so this renderer only ever renders error responses.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, cls=DjangoJSONEncoder).encode()
+
+class NDJSONRenderer(CSVRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+
+def _plain(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+def csv_lines(headers: List[str], rows: Iterator[tuple]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(headers)
+    count = 0
+    for row in rows:
+        writer.writerow([_plain(value) for value in row])
+        count += 1
+        if count % ROWS_PER_BLOCK == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+def ndjson_lines(headers: List[str], rows: Iterator[tuple]) -> Iterator[str]:
+    block = []
+    for row in rows:
+        block.append(json.dumps(dict(zip(headers, map(_plain, row)))))
+        if len(block) == ROWS_PER_BLOCK:
+            yield '\n'.join(block) + '\n'
+            block = []
+    if block:
+        yield '\n'.join(block) + '\n'
+
+async def async_blocks(blocks: Iterator[str]) -> AsyncIterator[str]:
+    """One block per await, read on the thread that owns the database connection"""
+    next_block = sync_to_async(next)
+    while True:
+        block = await next_block(blocks, None)
+        if block is None:
+            return
+        yield block
+
+def stream_export(queryset, columns: List[Tuple[str, object]], fmt: str, filename: str,
+                  asynchronous: bool = False) -> StreamingHttpResponse:
+    headers = [header for header, _ in columns]
+    rows = queryset.values_list(*[lookup for _, lookup in columns]).order_by('pk').iterator(
+        chunk_size=settings.INVENTORY_EXPORT_CHUNK_SIZE
+    )
+    if fmt == NDJSONRenderer.format:
+        body, content_type = ndjson_lines(headers, rows), NDJSONRenderer.media_type
+    else:
+        body, content_type = csv_lines(headers, rows), CSVRenderer.media_type
+    if asynchronous:
+        body = async_blocks(body)
+    response = StreamingHttpResponse(body, content_type=f'{content_type}; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{fmt}"'
+    return response
+
+class ExportMixin:
+    """Adds ``GET <list route>/export/`` to a viewset; set ``export_columns``"""
+    export_columns: List[Tuple[str, object]] = []
+
+    @action(detail=False, methods=['get'], renderer_classes=[CSVRenderer, NDJSONRenderer])
+    def export(self, request):
+        fmt = request.accepted_renderer.format
+        return stream_export(
+            self.filter_queryset(self.get_queryset()), self.export_columns, fmt, self.basename + 's',
+            asynchronous=isinstance(request._request, ASGIRequest),
+        )
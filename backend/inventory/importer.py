@@ -0,0 +1,275 @@
+"""
+Streaming product import.
+
+CSV and NDJSON price lists are parsed row by row, so memory use depends on
+``chunk_size`` rather than on the size of the file. Suppliers are resolved
+by name, with one lookup per distinct supplier. Every chunk is upserted in
+its own transaction with ``bulk_create(update_conflicts=True)`` on the
+``(supplier, name)`` natural key, so a long import that fails part-way keeps
+the chunks it already wrote. No per-row signals fire: each chunk adjusts the
+inventory summary once, and a single notification is queued at the end.
+"""
+import csv
+import json
+import time
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from django.db import transaction
+from notifications.dispatch import enqueue
+from .models import Product, Supplier
+from .summary import ProductState, SummaryDeltas, state_of
+
+CSV = 'csv'
+NDJSON = 'ndjson'
+FORMATS = (CSV, NDJSON)
+
+CONTENT_TYPES = {
+    'text/csv': CSV,
+    'application/csv': CSV,
+    'application/x-ndjson': NDJSON,
+    'application/ndjson': NDJSON,
+    'application/jsonl': NDJSON,
+}
+
+REQUIRED_COLUMNS = ('name', 'supplier', 'category', 'quantity', 'price')
+OPTIONAL_COLUMNS = ('min_stock', 'description')
+# Given to new products whose min_stock cell is missing or blank
+DEFAULT_MIN_STOCK = 10
+CATEGORIES = {value for value, _ in Product.CATEGORY_CHOICES}
+
+# Rejected rows listed individually in a report; the rest are only counted
+MAX_REPORTED_ERRORS = 100
+
+@dataclass
+class ImportReport:
+    inserted: int = 0
+    updated: int = 0
+    rejected: int = 0
+    duplicates: int = 0
+    suppliers_created: int = 0
+    rows: int = 0
+    chunks: int = 0
+    elapsed: float = 0.0
+    errors: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def reject(self, line: int, errors: Dict[str, str]):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'errors': errors})
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'rows': self.rows,
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'rejected': self.rejected,
+            'duplicates': self.duplicates,
+            'suppliers_created': self.suppliers_created,
+            'chunks': self.chunks,
+            'elapsed': round(self.elapsed, 3),
+            'rows_per_second': round(self.rows_per_second),
+            'errors': self.errors,
+        }
+
+def detect_format(content_type: Optional[str] = None, filename: Optional[str] = None) -> Optional[str]:
+    if filename:
+        extension = filename.rsplit('.', 1)[-1].lower()
+        if extension == CSV:
+            return CSV
+        if extension in ('ndjson', 'jsonl'):
+            return NDJSON
+    if content_type:
+        return CONTENT_TYPES.get(content_type.split(';')[0].strip().lower())
+    return None
+
+def _text_lines(lines: Iterable) -> Iterator[str]:
+    for line in lines:
+        yield line.decode('utf-8-sig') if isinstance(line, bytes) else line
+
+def iter_rows(lines: Iterable, fmt: str) -> Iterator[Tuple[int, Any]]:
+    """Yield ``(line_number, row)`` pairs; malformed NDJSON lines yield None"""
+    if fmt == CSV:
+        reader = csv.DictReader(_text_lines(lines))
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == NDJSON:
+        for line_number, line in enumerate(_text_lines(lines), start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except ValueError:
+                yield line_number, None
+    else:
+        raise ValueError(f"Unknown import format '{fmt}'")
+
+class SupplierLookup:
+    """Resolves supplier names to ids, querying each distinct name once"""
+
+    def __init__(self, create_missing: bool = False):
+        self.create_missing = create_missing
+        self.ids: Dict[str, Optional[int]] = {}
+        self.created = 0
+
+    def resolve(self, name: str, row: Dict[str, Any]) -> Optional[int]:
+        if name not in self.ids:
+            supplier_id = Supplier.objects.filter(name=name).order_by('id').values_list('id', flat=True).first()
+            if supplier_id is None and self.create_missing:
+                supplier_id = Supplier.objects.create(
+                    name=name,
+                    contact=str(row.get('supplier_contact') or ''),
+                    phone=str(row.get('supplier_phone') or ''),
+                ).pk
+                self.created += 1
+            self.ids[name] = supplier_id
+        return self.ids[name]
+
+def _text(value) -> str:
+    return '' if value is None else str(value).strip()
+
+def _whole_number(value, errors, column):
+    try:
+        number = int(_text(value))
+    except ValueError:
+        errors[column] = 'Must be a whole number'
+        return None
+    if number < 0:
+        errors[column] = 'Must not be negative'
+        return None
+    return number
+
+def parse_row(row: Any, suppliers: SupplierLookup) -> Tuple[Optional[Product], Dict[str, str]]:
+    """Validate one row and build an unsaved Product from it"""
+    if not isinstance(row, dict):
+        return None, {'row': 'Not a valid object'}
+    errors: Dict[str, str] = {}
+    for column in REQUIRED_COLUMNS:
+        if not _text(row.get(column)):
+            errors[column] = 'This field is required'
+    if errors:
+        return None, errors
+
+    name = _text(row['name'])
+    if len(name) > 100:
+        errors['name'] = 'At most 100 characters'
+    category = _text(row['category'])
+    if category not in CATEGORIES:
+        errors['category'] = f"Must be one of: {', '.join(sorted(CATEGORIES))}"
+    quantity = _whole_number(row['quantity'], errors, 'quantity')
+    min_stock = _whole_number(row['min_stock'], errors, 'min_stock') if _text(row.get('min_stock')) else DEFAULT_MIN_STOCK
+    try:
+        price = Decimal(_text(row['price'])).quantize(Decimal('0.01'))
+        if price < 0 or price >= Decimal('1e8'):
+            errors['price'] = 'Must be between 0 and 99999999.99'
+    except InvalidOperation:
+        errors['price'] = 'Must be a number'
+    supplier_id = suppliers.resolve(_text(row['supplier']), row)
+    if supplier_id is None:
+        errors['supplier'] = f"Unknown supplier '{_text(row['supplier'])}'"
+    if errors:
+        return None, errors
+
+    return Product(
+        name=name,
+        category=category,
+        quantity=quantity,
+        price=price,
+        supplier_id=supplier_id,
+        min_stock=min_stock,
+        description=_text(row.get('description')) or None,
+    ), errors
+
+class ProductImporter:
+    def __init__(self, chunk_size: int = 1000, create_suppliers: bool = False, notify: bool = True):
+        self.chunk_size = chunk_size
+        self.suppliers = SupplierLookup(create_missing=create_suppliers)
+        self.notify = notify
+        self.report = ImportReport()
+        self._names: List[str] = []
+        self._low_stock: List[Dict[str, Any]] = []
+        self._low_stock_total = 0
+
+    def run(self, lines: Iterable, fmt: str) -> ImportReport:
+        started = time.monotonic()
+        chunk: Dict[Tuple[int, str], Product] = {}
+        blanks: Dict[Tuple[int, str], Set[str]] = {}
+        columns = set()
+        for line, row in iter_rows(lines, fmt):
+            self.report.rows += 1
+            product, errors = parse_row(row, self.suppliers)
+            if errors:
+                self.report.reject(line, errors)
+                continue
+            key = (product.supplier_id, product.name)
+            if key in chunk:
+                # A later row for the same product replaces the earlier one; the
+                # product itself is counted once, when the chunk is written
+                self.report.duplicates += 1
+            chunk[key] = product
+            blanks[key] = {column for column in OPTIONAL_COLUMNS if not _text(row.get(column))}
+            columns.update(column for column in OPTIONAL_COLUMNS if column in row)
+            if len(chunk) >= self.chunk_size:
+                self._write(chunk, blanks, columns)
+                chunk, blanks = {}, {}
+        if chunk:
+            self._write(chunk, blanks, columns)
+        self.report.elapsed = time.monotonic() - started
+        self.report.suppliers_created = self.suppliers.created
+
+        if self.notify and (self.report.inserted or self.report.updated):
+            enqueue('inventory_batch', {
+                'resource': 'product',
+                'created': self.report.inserted,
+                'updated': self.report.updated,
+                'names': self._names,
+                'low_stock': self._low_stock,
+                'low_stock_total': self._low_stock_total,
+            })
+        return self.report
+
+    def _write(self, chunk: Dict[Tuple[int, str], Product], blanks: Dict[Tuple[int, str], Set[str]], columns):
+        with transaction.atomic():
+            candidates = Product.objects.filter(
+                supplier_id__in={supplier_id for supplier_id, _ in chunk},
+                name__in={name for _, name in chunk},
+            ).values_list('supplier_id', 'name', 'category', 'quantity', 'price', 'min_stock', 'description')
+            existing = {}
+            for supplier_id, name, *old, description in candidates:
+                key = (supplier_id, name)
+                if key not in chunk:
+                    continue
+                existing[key] = ProductState(*old)
+                # Optional cells left blank (or columns the file lacks) keep what is stored
+                stored = {'min_stock': existing[key].min_stock, 'description': description}
+                for column in blanks[key]:
+                    setattr(chunk[key], column, stored[column])
+            Product.objects.bulk_create(
+                chunk.values(),
+                update_conflicts=True,
+                unique_fields=['supplier', 'name'],
+                update_fields=['category', 'quantity', 'price', *sorted(columns), 'updated_at'],
+            )
+            deltas = SummaryDeltas()
+            for key, product in chunk.items():
+                deltas.changed(existing.get(key), state_of(product))
+            deltas.apply()
+        self.report.chunks += 1
+        self.report.updated += len(existing)
+        self.report.inserted += len(chunk) - len(existing)
+
+        for key, product in chunk.items():
+            if key not in existing and len(self._names) < 5:
+                self._names.append(product.name)
+            old_quantity = existing[key].quantity if key in existing else None
+            if product.quantity < product.min_stock and (old_quantity is None or old_quantity >= product.min_stock):
+                self._low_stock_total += 1
+                if len(self._low_stock) < 5:
+                    self._low_stock.append({
+                        'product_id': product.pk, 'name': product.name,
+                        'quantity': product.quantity, 'min_stock': product.min_stock,
+                    })
@@ -0,0 +1,113 @@
+import threading
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection, transaction
+from inventory.models import Order, Product, Supplier
+from inventory.stock import InsufficientStock
+from notifications.dispatch import paused
+
+User = get_user_model()
+
+class Command(BaseCommand):
+    help = 'Place many orders for one product in parallel and check stock for oversell and lost updates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=500, help='Orders to submit (default: 500)')
+        parser.add_argument('--workers', type=int, default=16, help='Parallel workers (default: 16)')
+        parser.add_argument('--stock', type=int, default=200, help='Starting stock of the hot product (default: 200)')
+        parser.add_argument('--quantity', type=int, default=1, help='Units per order (default: 1)')
+        parser.add_argument(
+            '--naive',
+            action='store_true',
+            help='Use a read-modify-write decrement instead of the conditional UPDATE, for comparison',
+        )
+        parser.add_argument('--keep', action='store_true', help='Keep the benchmark product and orders')
+
+    def handle(self, *args, **options):
+        # The benchmark's orders must not notify anyone
+        with paused():
+            supplier = Supplier.objects.create(name='Stock Benchmark', contact='benchmark@example.com', phone='0')
+            product = Product.objects.create(
+                name='Stock Benchmark Product', category='Electronics',
+                quantity=options['stock'], price=1, supplier=supplier
+            )
+            user = User.objects.create(username=f'stock-benchmark-{product.pk}')
+            try:
+                self._run(product, user, options)
+            finally:
+                if not options['keep']:
+                    product.delete()
+                    supplier.delete()
+                    user.delete()
+
+    def _run(self, product, user, options):
+        place = self._place_naive if options['naive'] else self._place
+        quantity = options['quantity']
+        remaining = iter(range(options['orders']))
+        results = {'accepted': 0, 'rejected': 0, 'errors': 0}
+        lock = threading.Lock()
+        barrier = threading.Barrier(options['workers'])
+
+        def worker():
+            barrier.wait()
+            try:
+                while True:
+                    with lock:
+                        if next(remaining, None) is None:
+                            return
+                    try:
+                        outcome = 'accepted' if place(product.pk, user.pk, quantity) else 'rejected'
+                    except DatabaseError:
+                        outcome = 'errors'
+                    with lock:
+                        results[outcome] += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(options['workers'])]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+        final = Product.objects.values_list('quantity', flat=True).get(pk=product.pk)
+        orders = Order.objects.filter(product=product).count()
+        reserved = orders * quantity
+        self.stdout.write(
+            f"{'Naive' if options['naive'] else 'Atomic'} reservation: {options['orders']} orders on "
+            f"{options['workers']} workers in {elapsed:.2f}s ({options['orders'] / elapsed if elapsed else 0:.0f} orders/s)"
+        )
+        self.stdout.write(
+            f"  accepted {results['accepted']}, rejected {results['rejected']}, errors {results['errors']}; "
+            f"stock {options['stock']} -> {final}, {orders} orders holding {reserved} units"
+        )
+
+        oversold = reserved > options['stock']
+        lost = final != options['stock'] - reserved
+        if oversold:
+            self.stdout.write(self.style.ERROR(f"  Oversold by {reserved - options['stock']} units"))
+        if lost:
+            self.stdout.write(self.style.ERROR(f"  Lost updates: stock is off by {final - (options['stock'] - reserved)} units"))
+        if not oversold and not lost:
+            self.stdout.write(self.style.SUCCESS('  No oversell and no lost updates'))
+
+    def _place(self, product_id, user_id, quantity):
+        try:
+            Order.objects.create(product_id=product_id, user_id=user_id, quantity=quantity)
+        except InsufficientStock:
+            return False
+        return True
+
+    def _place_naive(self, product_id, user_id, quantity):
+        with transaction.atomic():
+            product = Product.objects.get(pk=product_id)
+            if product.quantity < quantity:
+                return False
+            product.quantity -= quantity
+            product.save(update_fields=['quantity'])
+            # bulk_create skips the reservation signal, which would decrement a second time
+            Order.objects.bulk_create([Order(product_id=product_id, user_id=user_id, quantity=quantity, unit_price=product.price)])
+        return True
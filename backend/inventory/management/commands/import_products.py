@@ -0,0 +1,64 @@
+import sys
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from inventory.importer import FORMATS, ProductImporter, detect_format
+
+class Command(BaseCommand):
+    help = 'Upsert products from a CSV or NDJSON price list, streaming it in chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Price list to import, or '-' for standard input")
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            help='File format (default: taken from the file extension)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=settings.INVENTORY_IMPORT_CHUNK_SIZE,
+            help=f'Rows upserted per transaction (default: {settings.INVENTORY_IMPORT_CHUNK_SIZE})',
+        )
+        parser.add_argument(
+            '--create-suppliers',
+            action='store_true',
+            help="Create suppliers that do not exist yet instead of rejecting their rows",
+        )
+        parser.add_argument(
+            '--no-notify',
+            action='store_true',
+            help='Do not send the import summary notification',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or (None if path == '-' else detect_format(filename=path))
+        if fmt is None:
+            raise CommandError(f"Cannot tell the format of '{path}'; pass --format")
+
+        importer = ProductImporter(
+            chunk_size=options['chunk_size'],
+            create_suppliers=options['create_suppliers'],
+            notify=not options['no_notify'],
+        )
+        try:
+            if path == '-':
+                report = importer.run(sys.stdin, fmt)
+            else:
+                with open(path, encoding='utf-8-sig', newline='') as lines:
+                    report = importer.run(lines, fmt)
+        except OSError as e:
+            raise CommandError(str(e))
+
+        for error in report.errors:
+            details = '; '.join(f"{column}: {message}" for column, message in error['errors'].items())
+            self.stdout.write(self.style.WARNING(f"  line {error['line']}: {details}"))
+        if report.rejected > len(report.errors):
+            self.stdout.write(self.style.WARNING(f"  ... and {report.rejected - len(report.errors)} more rejected rows"))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report.rows} rows in {report.elapsed:.2f}s ({report.rows_per_second:.0f} rows/s): "
+            f"{report.inserted} inserted, {report.updated} updated, {report.rejected} rejected"
+            + (f", {report.duplicates} duplicate rows" if report.duplicates else "")
+            + (f", {report.suppliers_created} suppliers created" if report.suppliers_created else "")
+        ))
@@ -1,6 +1,10 @@
-from django.core.management.base import BaseCommand
+import math
+import time
+from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth import get_user_model
 from inventory.models import Supplier, Product, Order
+from inventory.stock import InsufficientStock
+from inventory.synthetic import SCALE_BASE, SyntheticDataGenerator
 from decimal import Decimal
 from datetime import datetime, timezone
 
@@ -9,7 +13,34 @@ User = get_user_model()
 class Command(BaseCommand):
     help = 'Populate database with sample data'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale',
+            type=float,
+            help='Generate synthetic load-test data instead of the demo rows; 1.0 is '
+                 + ', '.join(f'{count:,} {table}' for table, count in SCALE_BASE.items()),
+        )
+        for table in SCALE_BASE:
+            parser.add_argument(f'--{table}', type=int, help=f'Override the number of {table} generated by --scale')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed; the same seed gives the same data (default: 42)')
+        parser.add_argument('--years', type=float, default=2, help='Years of order history to spread rows over (default: 2)')
+        parser.add_argument('--batch-size', type=int, default=10_000, help='Rows written per batch (default: 10000)')
+        parser.add_argument(
+            '--copy',
+            action='store_true',
+            help='Load rows with COPY on PostgreSQL instead of bulk INSERTs',
+        )
+        parser.add_argument(
+            '--signals',
+            action='store_true',
+            help='Save rows one by one so model signals fire (slow; for small scales only)',
+        )
+
     def handle(self, *args, **options):
+        if options['scale'] is not None:
+            self._generate(options)
+            return
+
         self.stdout.write('Creating sample data...')
 
         # Create users
@@ -93,4 +124,50 @@ class Command(BaseCommand):
             if created:
                 self.stdout.write(f'Created order: {order}')
 
-        self.stdout.write(self.style.SUCCESS('Successfully populated database with sample data!'))
\ No newline at end of file
+        self.stdout.write(self.style.SUCCESS('Successfully populated database with sample data!'))
+
+    def _generate(self, options):
+        counts = {
+            table: options[table] if options[table] is not None else math.ceil(base * options['scale'])
+            for table, base in SCALE_BASE.items()
+        }
+        if counts['products'] and not counts['suppliers']:
+            raise CommandError('Products need at least one supplier')
+        if (counts['orders'] or counts['notifications']) and not counts['users']:
+            raise CommandError('Orders and notifications need at least one user')
+        if counts['orders'] and not counts['products']:
+            raise CommandError('Orders need at least one product')
+
+        generator = SyntheticDataGenerator(
+            seed=options['seed'],
+            years=options['years'],
+            batch_size=options['batch_size'],
+            use_copy=options['copy'],
+            send_signals=options['signals'],
+            on_progress=lambda table, written: self.stdout.write(f'  {table}: {written:,}', ending='\r'),
+        )
+        self.stdout.write(
+            f"Generating synthetic data (seed {options['seed']}): "
+            + ', '.join(f'{count:,} {table}' for table, count in counts.items())
+        )
+
+        def step(table, create):
+            started = time.monotonic()
+            result = create()
+            elapsed = time.monotonic() - started
+            rows = len(result) if isinstance(result, list) else result
+            self.stdout.write(f'  {table}: {rows:,} rows in {elapsed:.1f}s ({rows / elapsed if elapsed else 0:,.0f} rows/s)')
+            return result
+
+        try:
+            user_ids = step('users', lambda: generator.users(counts['users']))
+        except ValueError as e:
+            raise CommandError(str(e))
+        supplier_ids = step('suppliers', lambda: generator.suppliers(counts['suppliers']))
+        product_ids = step('products', lambda: generator.products(counts['products'], supplier_ids))
+        try:
+            step('orders', lambda: generator.orders(counts['orders'], product_ids, user_ids))
+        except InsufficientStock as e:
+            raise CommandError(f'Could not place a synthetic order: {e}')
+        step('notifications', lambda: generator.notifications(counts['notifications'], user_ids))
+        self.stdout.write(self.style.SUCCESS('Successfully generated synthetic data!'))
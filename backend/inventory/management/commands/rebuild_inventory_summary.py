@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from inventory.models import InventorySummary
+from inventory.summary import SUMMARY_FIELDS, compute_summary, rebuild_summary
+
+class Command(BaseCommand):
+    help = 'Recompute the inventory summary from the products table and report any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drift without writing fixes',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+
+        expected = compute_summary()
+        current = InventorySummary.objects.in_bulk()
+        drifted = [
+            row for row in expected
+            if row.category not in current or any(
+                getattr(row, field) != getattr(current[row.category], field) for field in SUMMARY_FIELDS
+            )
+        ]
+        for row in drifted:
+            before = current.get(row.category)
+            changes = ', '.join(
+                f'{field} {getattr(before, field)} -> {getattr(row, field)}'
+                for field in SUMMARY_FIELDS
+                if before is not None and getattr(row, field) != getattr(before, field)
+            )
+            self.stdout.write(f'{row.category}: {changes or "missing"}')
+
+        if not dry_run:
+            rebuild_summary()
+
+        verb = 'would repair' if dry_run else 'repaired'
+        self.stdout.write(
+            self.style.SUCCESS(f'Checked {len(expected)} summary rows, {verb} {len(drifted)}')
+        )
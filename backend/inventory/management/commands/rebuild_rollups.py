@@ -0,0 +1,45 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from inventory.rollups import order_date_range, rebuild_all_rollups, rebuild_rollups
+
+class Command(BaseCommand):
+    help = 'Recompute the daily product sales rollup from the orders table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--start',
+            help='First day to rebuild, YYYY-MM-DD (default: the first order)',
+        )
+        parser.add_argument(
+            '--end',
+            help='Last day to rebuild, YYYY-MM-DD (default: the last order)',
+        )
+        parser.add_argument(
+            '--chunk-days',
+            type=int,
+            default=31,
+            help='Days recomputed per transaction (default: 31)',
+        )
+
+    def handle(self, *args, **options):
+        def progress(start, end, rows):
+            self.stdout.write(f'  {start} .. {end - timedelta(days=1)}: {rows:,} rows')
+
+        if not options['start'] and not options['end']:
+            written = rebuild_all_rollups(options['chunk_days'], progress)
+        else:
+            bounds = order_date_range()
+            if bounds is None:
+                self.stdout.write(self.style.WARNING('There are no orders to roll up'))
+                return
+            try:
+                start = parse_date(options['start']) if options['start'] else bounds[0]
+                end = parse_date(options['end']) if options['end'] else bounds[1]
+            except ValueError as e:
+                raise CommandError(str(e))
+            if start is None or end is None:
+                raise CommandError('Dates must look like YYYY-MM-DD')
+            written = rebuild_rollups(start, end + timedelta(days=1), options['chunk_days'], progress)
+
+        self.stdout.write(self.style.SUCCESS(f'Wrote {written:,} daily sales rows'))
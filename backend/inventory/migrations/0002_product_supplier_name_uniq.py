@@ -0,0 +1,37 @@
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def rename_duplicates(apps, schema_editor):
+    """
+    Suffix the id onto all but the first product sharing a supplier and name,
+    printing each rename so operators can review them
+    """
+    Product = apps.get_model('inventory', 'Product')
+    duplicated = (
+        Product.objects.values('supplier_id', 'name')
+        .annotate(count=Count('id')).filter(count__gt=1).order_by()
+    )
+    for key in duplicated.iterator():
+        for product in Product.objects.filter(**key).order_by('id')[1:]:
+            suffix = f" ({product.pk})"
+            old_name = product.name
+            product.name = product.name[:100 - len(suffix)] + suffix
+            product.save(update_fields=['name'])
+            print(f"\n  Renamed duplicate product #{product.pk} of supplier #{product.supplier_id}: "
+                  f"{old_name!r} -> {product.name!r}", end='')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(rename_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='product',
+            constraint=models.UniqueConstraint(fields=('supplier', 'name'), name='product_supplier_name_uniq'),
+        ),
+    ]
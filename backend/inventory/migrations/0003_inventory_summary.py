@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-17 04:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0002_product_supplier_name_uniq'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventorySummary',
+            fields=[
+                ('category', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('product_count', models.IntegerField(default=0)),
+                ('units', models.BigIntegerField(default=0)),
+                ('stock_value', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('low_stock_count', models.IntegerField(default=0)),
+                ('below_min_stock_count', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
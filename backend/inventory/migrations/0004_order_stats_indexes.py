@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-17 04:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0003_inventory_summary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['date'], include=('status', 'quantity', 'product'), name='order_date_stats_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['product', 'date'], name='order_product_date_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_order_user_date_index'),
+    ]
+
+    operations = [
+        # Nullable until 0007 has copied the current product prices in
+        migrations.AddField(
+            model_name='order',
+            name='unit_price',
+            field=models.DecimalField(decimal_places=2, max_digits=10, null=True),
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations
+from django.db.models import Max, OuterRef, Subquery
+
+BATCH_SIZE = 10_000
+
+
+def copy_product_prices(apps, schema_editor):
+    """
+    Snapshot each order's current product price, one id range at a time.
+    The migration is not atomic, so every batch commits on its own and row
+    locks are held briefly; rerunning it resumes where it stopped.
+    """
+    Order = apps.get_model('inventory', 'Order')
+    Product = apps.get_model('inventory', 'Product')
+    price = Subquery(Product.objects.filter(pk=OuterRef('product_id')).values('price')[:1])
+    last_id = Order.objects.aggregate(last=Max('id'))['last'] or 0
+    for start in range(0, last_id + 1, BATCH_SIZE):
+        Order.objects.filter(
+            id__gte=start, id__lt=start + BATCH_SIZE, unit_price__isnull=True
+        ).update(unit_price=price)
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('inventory', '0006_order_unit_price'),
+    ]
+
+    operations = [
+        migrations.RunPython(copy_product_prices, migrations.RunPython.noop),
+    ]
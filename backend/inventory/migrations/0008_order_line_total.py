@@ -0,0 +1,30 @@
+import django.db.models.expressions
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0007_backfill_order_unit_price'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='order',
+            name='unit_price',
+            field=models.DecimalField(decimal_places=2, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='line_total',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(models.F('quantity'), '*', models.F('unit_price')), output_field=models.DecimalField(decimal_places=2, max_digits=14)),
+        ),
+        migrations.RemoveIndex(
+            model_name='order',
+            name='order_date_stats_idx',
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['date'], include=('status', 'quantity', 'line_total', 'product'), name='order_date_stats_idx'),
+        ),
+    ]
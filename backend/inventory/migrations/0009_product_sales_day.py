@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-17 04:35
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0008_order_line_total'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSalesDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('units', models.IntegerField(default=0)),
+                ('order_count', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('pending_count', models.IntegerField(default=0)),
+                ('processing_count', models.IntegerField(default=0)),
+                ('shipped_count', models.IntegerField(default=0)),
+                ('delivered_count', models.IntegerField(default=0)),
+                ('cancelled_count', models.IntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sales_days', to='inventory.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='product_sales_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'day'), name='product_sales_day_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,67 @@
+from datetime import datetime, time, timedelta
+from django.db import migrations, transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+CHUNK_DAYS = 31
+STATUSES = ['Pending', 'Processing', 'Shipped', 'Delivered', 'Cancelled']
+
+
+def backfill(apps, schema_editor):
+    """
+    Roll up existing orders a month at a time. The migration is not atomic,
+    so each chunk commits on its own; `manage.py rebuild_rollups` does the
+    same with the current code.
+    """
+    Order = apps.get_model('inventory', 'Order')
+    ProductSalesDay = apps.get_model('inventory', 'ProductSalesDay')
+    bounds = Order.objects.aggregate(first=Min('date'), last=Max('date'))
+    if bounds['first'] is None:
+        return
+
+    earning = ~Q(status='Cancelled')
+    aggregates = {
+        'units': Sum('quantity', filter=earning),
+        'order_count': Count('id'),
+        'revenue': Sum('line_total', filter=earning),
+    }
+    for status in STATUSES:
+        aggregates[f'{status.lower()}_count'] = Count('id', filter=Q(status=status))
+
+    day = timezone.localdate(bounds['first'])
+    last = timezone.localdate(bounds['last'])
+    while day <= last:
+        end = day + timedelta(days=CHUNK_DAYS)
+        rows = (
+            Order.objects.filter(
+                date__gte=timezone.make_aware(datetime.combine(day, time.min)),
+                date__lt=timezone.make_aware(datetime.combine(end, time.min)),
+            )
+            .annotate(day=TruncDate('date'))
+            .values('product_id', 'day')
+            .annotate(**aggregates)
+            .order_by()
+        )
+        with transaction.atomic():
+            ProductSalesDay.objects.bulk_create(
+                [ProductSalesDay(**{**row, 'units': row['units'] or 0, 'revenue': row['revenue'] or 0}) for row in rows],
+                batch_size=1000,
+            )
+        day = end
+
+
+def clear(apps, schema_editor):
+    apps.get_model('inventory', 'ProductSalesDay').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('inventory', '0009_product_sales_day'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, clear),
+    ]
@@ -1,8 +1,53 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
 
+# Products with fewer units than this count as low stock in stats and alerts
+LOW_STOCK_THRESHOLD = 50
+
+class TrackedFieldsMixin:
+    """
+    Remembers the values of ``tracked_fields`` as loaded from the database,
+    so signal handlers can compare against them without re-fetching the row.
+    The snapshot is taken again after every save.
+    """
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot()
+        return instance
+
+    def _snapshot(self):
+        loaded = self.get_deferred_fields()
+        self._loaded_values = {
+            field: getattr(self, field) for field in self.tracked_fields if field not in loaded
+        }
+
+    def is_tracked(self, field):
+        """Whether the loaded value of ``field`` is known"""
+        return field in getattr(self, '_loaded_values', {})
+
+    def previous(self, field):
+        """Value of ``field`` when loaded or last saved; None for new instances"""
+        return getattr(self, '_loaded_values', {}).get(field)
+
+    def has_changed(self, field):
+        if not self.is_tracked(field):
+            return self._state.adding
+        return self._loaded_values[field] != getattr(self, field)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._snapshot()
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._snapshot()
+
 class Supplier(models.Model):
     name = models.CharField(max_length=100)
     contact = models.EmailField()
@@ -13,12 +58,13 @@ class Supplier(models.Model):
     def __str__(self):
         return self.name
 
-class Product(models.Model):
+class Product(TrackedFieldsMixin, models.Model):
     CATEGORY_CHOICES = [
         ('Electronics', 'Electronics'),
         ('Furniture', 'Furniture'),
         ('Office Supplies', 'Office Supplies'),
     ]
+    tracked_fields = ('quantity', 'category', 'price', 'min_stock')
 
     name = models.CharField(max_length=100)
     category = models.CharField(max_length=50, choices=CATEGORY_CHOICES)
@@ -30,18 +76,29 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        constraints = [
+            # Natural key used by the product import to upsert rows
+            models.UniqueConstraint(fields=['supplier', 'name'], name='product_supplier_name_uniq'),
+        ]
+
     def __str__(self):
         return f"{self.name} - {self.quantity} in stock"
 
+    def save(self, *args, **kwargs):
+        # The inventory summary is updated in post_save; keep it in the same transaction
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     @property
     def stock_level(self):
         if self.quantity < 20:
             return 'Critical'
-        elif self.quantity < 50:
+        elif self.quantity < LOW_STOCK_THRESHOLD:
             return 'Low'
         return 'Good'
 
-class Order(models.Model):
+class Order(TrackedFieldsMixin, models.Model):
     STATUS_CHOICES = [
         ('Pending', 'Pending'),
         ('Processing', 'Processing'),
@@ -49,17 +106,97 @@ class Order(models.Model):
         ('Delivered', 'Delivered'),
         ('Cancelled', 'Cancelled'),
     ]
+    tracked_fields = ('status', 'quantity', 'product_id', 'unit_price', 'date')
 
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='orders')
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='orders')
     quantity = models.PositiveIntegerField()
+    # Product price when the order was placed, so later price edits leave revenue alone
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+    line_total = models.GeneratedField(
+        expression=F('quantity') * F('unit_price'),
+        output_field=models.DecimalField(max_digits=14, decimal_places=2),
+        db_persist=True,
+    )
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pending')
     date = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Date-range order stats; on PostgreSQL the included columns
+            # let the aggregate run from the index alone
+            models.Index(fields=['date'], include=['status', 'quantity', 'line_total', 'product'], name='order_date_stats_idx'),
+            models.Index(fields=['product', 'date'], name='order_product_date_idx'),
+            # Per-user history on the profile page
+            models.Index(fields=['user', 'date'], name='order_user_date_idx'),
+        ]
+
     def __str__(self):
         return f"Order #{self.id} - {self.product.name} x{self.quantity}"
 
+    def save(self, *args, **kwargs):
+        if self.unit_price is None or (self.has_changed('product_id') and not self.has_changed('unit_price')):
+            # to_python: the product may still hold the price as it was assigned
+            self.unit_price = self._meta.get_field('unit_price').to_python(self.product.price)
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'unit_price'}
+        # Stock is reserved in pre_save; it must commit or roll back with the order
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     @property
     def total_price(self):
-        return self.quantity * self.product.price
+        # Same as line_total, which the database only recomputes on write and
+        # Django does not reload after save()
+        return self.quantity * self.unit_price
+
+class InventorySummary(models.Model):
+    """
+    Running product totals per category, plus one overall row keyed
+    ``TOTAL``, so inventory stats are a handful of primary-key reads.
+    Maintained by ``inventory.summary``; ``rebuild_inventory_summary``
+    recomputes it from the products table.
+    """
+    TOTAL = '*'
+
+    category = models.CharField(max_length=50, primary_key=True)
+    product_count = models.IntegerField(default=0)
+    units = models.BigIntegerField(default=0)
+    stock_value = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+    low_stock_count = models.IntegerField(default=0)
+    below_min_stock_count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.category}: {self.product_count} products, {self.units} units"
+
+class ProductSalesDay(models.Model):
+    """
+    Orders of one product placed on one day (in TIME_ZONE), so time series
+    read days x products rows instead of every order. ``units`` and
+    ``revenue`` leave cancelled orders out; the status counts include them.
+    Maintained by ``inventory.rollups``; ``rebuild_rollups`` recomputes it.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='sales_days')
+    day = models.DateField()
+    units = models.IntegerField(default=0)
+    order_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    pending_count = models.IntegerField(default=0)
+    processing_count = models.IntegerField(default=0)
+    shipped_count = models.IntegerField(default=0)
+    delivered_count = models.IntegerField(default=0)
+    cancelled_count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'day'], name='product_sales_day_uniq'),
+        ]
+        indexes = [
+            # Catalog-wide series for a date range
+            models.Index(fields=['day'], name='product_sales_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} on {self.day}: {self.units} units"
@@ -0,0 +1,160 @@
+"""
+Order statistics for dashboards.
+
+Counts, units and revenue for every order status come from a single
+conditional aggregate over the (optionally filtered) orders. Results are
+cached for INVENTORY_ORDER_STATS_CACHE_TIMEOUT seconds per filter set. On
+a miss only one worker recomputes while concurrent requests briefly wait
+for its result, so a burst of dashboard loads costs one scan, not one each.
+"""
+import hashlib
+import time
+from datetime import datetime, time as clock, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Optional
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from .models import Order, Product
+
+CANCELLED = 'Cancelled'
+STATUSES = [value for value, _ in Order.STATUS_CHOICES]
+CATEGORIES = [value for value, _ in Product.CATEGORY_CHOICES]
+
+# How long, and how often, a request waits for another worker's computation
+LOCK_TIMEOUT = 30
+WAIT_STEPS = 20
+WAIT_INTERVAL = 0.05
+
+class StatsFilters:
+    """Validated ``?start=&end=&product=&category=`` filters"""
+
+    def __init__(self, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                 product_id: Optional[int] = None, category: Optional[str] = None):
+        self.start = start
+        self.end = end
+        self.product_id = product_id
+        self.category = category
+
+    @classmethod
+    def from_params(cls, params) -> 'StatsFilters':
+        """Raises ValueError with a readable message for malformed filters"""
+        product = params.get('product')
+        category = params.get('category')
+        if product:
+            try:
+                product = int(product)
+            except ValueError:
+                raise ValueError(f"'product' must be a product id, not '{product}'")
+        if category and category not in CATEGORIES:
+            raise ValueError(f"'category' must be one of: {', '.join(CATEGORIES)}")
+        return cls(
+            start=_parse_bound(params.get('start'), 'start'),
+            end=_parse_bound(params.get('end'), 'end'),
+            product_id=product or None,
+            category=category or None,
+        )
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'start': self.start.isoformat() if self.start else None,
+            'end': self.end.isoformat() if self.end else None,
+            'product': self.product_id,
+            'category': self.category,
+        }
+
+    def apply(self, queryset):
+        if self.start:
+            queryset = queryset.filter(date__gte=self.start)
+        if self.end:
+            queryset = queryset.filter(date__lt=self.end)
+        if self.product_id:
+            queryset = queryset.filter(product_id=self.product_id)
+        if self.category:
+            queryset = queryset.filter(product__category=self.category)
+        return queryset
+
+    def cache_key(self) -> str:
+        digest = hashlib.md5(repr(sorted(self.as_dict().items())).encode()).hexdigest()
+        return f'inventory:order_stats:{digest}'
+
+def _parse_bound(value: Optional[str], name: str) -> Optional[datetime]:
+    """
+    ISO dates or datetimes. A plain date as ``end`` includes that whole day,
+    so bounds are returned as ``[start, end)`` instants.
+    """
+    if not value:
+        return None
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"'{name}' must be an ISO date or datetime, not '{value}'")
+        if name == 'end':
+            day += timedelta(days=1)
+        moment = datetime.combine(day, clock.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+def compute_order_stats(filters: StatsFilters) -> Dict[str, Any]:
+    aggregates = {}
+    for index, value in enumerate(STATUSES):
+        matches = Q(status=value)
+        aggregates[f'count_{index}'] = Count('id', filter=matches)
+        aggregates[f'units_{index}'] = Sum('quantity', filter=matches)
+        aggregates[f'revenue_{index}'] = Sum('line_total', filter=matches)
+    row = filters.apply(Order.objects.all()).aggregate(**aggregates)
+
+    by_status = {
+        value: {
+            'count': row[f'count_{index}'],
+            'units': row[f'units_{index}'] or 0,
+            'revenue': Decimal(row[f'revenue_{index}'] or 0).quantize(Decimal('0.01')),
+        }
+        for index, value in enumerate(STATUSES)
+    }
+    active = [stats for value, stats in by_status.items() if value != CANCELLED]
+    return {
+        'total_orders': sum(stats['count'] for stats in by_status.values()),
+        'pending_orders': by_status['Pending']['count'],
+        'delivered_orders': by_status['Delivered']['count'],
+        # Cancelled orders are counted but earn nothing
+        'total_units': sum(stats['units'] for stats in active),
+        'total_revenue': str(sum((stats['revenue'] for stats in active), Decimal('0.00'))),
+        'by_status': {
+            value: {**stats, 'revenue': str(stats['revenue'])} for value, stats in by_status.items()
+        },
+        'filters': filters.as_dict(),
+        'computed_at': timezone.now().isoformat(),
+    }
+
+def order_stats(filters: StatsFilters) -> Dict[str, Any]:
+    """``compute_order_stats``, cached and computed by one worker at a time per filter set"""
+    timeout = settings.INVENTORY_ORDER_STATS_CACHE_TIMEOUT
+    if timeout <= 0:
+        return compute_order_stats(filters)
+
+    key = filters.cache_key()
+    stats = cache.get(key)
+    if stats is not None:
+        return stats
+
+    lock = f'{key}:lock'
+    locked = cache.add(lock, 1, LOCK_TIMEOUT)
+    if not locked:
+        for _ in range(WAIT_STEPS):
+            time.sleep(WAIT_INTERVAL)
+            stats = cache.get(key)
+            if stats is not None:
+                return stats
+        # The other worker is slow or died; do not keep the caller waiting longer
+    try:
+        stats = compute_order_stats(filters)
+        cache.set(key, stats, timeout)
+    finally:
+        if locked:
+            cache.delete(lock)
+    return stats
@@ -0,0 +1,209 @@
+"""
+Maintenance of the daily ProductSalesDay rollup.
+
+Each order contributes to the row of its product and the day it was
+placed. Saves, deletes and order batches record the old and new
+contribution of every order they touch. The net change is then written as
+one ``INSERT ... ON CONFLICT DO UPDATE`` that adds to the existing rows,
+inside the transaction that wrote the orders. ``rebuild_rollups``
+recomputes whole date ranges from the orders table, one chunk of days per
+transaction. Both send ``units_changed`` so that models fitted on the
+rollup can tell which products to refit.
+"""
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from django.db import connection, transaction
+from django.db.models import Count, F, Min, Max, Q, Sum
+from django.db.models.functions import TruncDate, TruncMonth, TruncWeek
+from django.dispatch import Signal
+from django.utils import timezone
+from .models import Order, ProductSalesDay
+
+CANCELLED = 'Cancelled'
+STATUS_FIELDS = {value: f'{value.lower()}_count' for value, _ in Order.STATUS_CHOICES}
+ROLLUP_FIELDS = ['units', 'order_count', 'revenue', *STATUS_FIELDS.values()]
+
+# Rows per upsert statement; keeps the parameter count within SQLite's limit
+UPSERT_BATCH_SIZE = 50
+
+# Sent with the ids of products whose units sold changed, or product_ids=None
+# after a rebuild, which may have changed any product
+units_changed = Signal()
+
+class OrderState(NamedTuple):
+    product_id: int
+    day: date
+    quantity: int
+    status: str
+    line_total: Decimal
+
+def state_of(order: Order) -> OrderState:
+    return OrderState(
+        order.product_id, timezone.localdate(order.date), order.quantity, order.status, order.total_price
+    )
+
+def previous_state(order: Order) -> Optional[OrderState]:
+    """State as loaded from the database, or None when it is not known"""
+    if not all(order.is_tracked(field) for field in Order.tracked_fields):
+        return None
+    quantity, unit_price = order.previous('quantity'), order.previous('unit_price')
+    return OrderState(
+        order.previous('product_id'), timezone.localdate(order.previous('date')),
+        quantity, order.previous('status'), quantity * unit_price,
+    )
+
+def stored_state(order: Order) -> Optional[OrderState]:
+    """State of the stored row, for instances that were not loaded from it"""
+    stored = Order.objects.filter(pk=order.pk).values_list(
+        'product_id', 'date', 'quantity', 'status', 'line_total'
+    ).first()
+    if stored is None:
+        return None
+    product_id, placed, quantity, status, line_total = stored
+    return OrderState(product_id, timezone.localdate(placed), quantity, status, line_total)
+
+class RollupDeltas:
+    """Accumulates order changes and applies them as upserts of the net change per row"""
+
+    def __init__(self):
+        self._deltas: Dict[Tuple[int, date], Dict[str, object]] = defaultdict(
+            lambda: dict.fromkeys(ROLLUP_FIELDS, 0)
+        )
+
+    def changed(self, old: Optional[OrderState], new: Optional[OrderState]):
+        """Record an order going from ``old`` to ``new``; None means it did not or no longer exists"""
+        if old == new:
+            return self
+        for state, sign in ((old, -1), (new, 1)):
+            if state is None:
+                continue
+            delta = self._deltas[state.product_id, state.day]
+            delta['order_count'] += sign
+            delta[STATUS_FIELDS[state.status]] += sign
+            if state.status != CANCELLED:
+                delta['units'] += sign * state.quantity
+                delta['revenue'] += sign * state.line_total
+        return self
+
+    def apply(self):
+        deltas, self._deltas = self._deltas, defaultdict(lambda: dict.fromkeys(ROLLUP_FIELDS, 0))
+        rows = [
+            (product_id, day, *(delta[field] for field in ROLLUP_FIELDS))
+            for (product_id, day), delta in sorted(deltas.items())
+            if any(delta.values())
+        ]
+        if not rows:
+            return
+        quote = connection.ops.quote_name
+        table = quote(ProductSalesDay._meta.db_table)
+        columns = ', '.join(quote(column) for column in ['product_id', 'day', *ROLLUP_FIELDS])
+        additions = ', '.join(f'{quote(field)} = {table}.{quote(field)} + excluded.{quote(field)}' for field in ROLLUP_FIELDS)
+        placeholders = '(' + ', '.join(['%s'] * (len(ROLLUP_FIELDS) + 2)) + ')'
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+                batch = rows[start:start + UPSERT_BATCH_SIZE]
+                cursor.execute(
+                    f"INSERT INTO {table} ({columns}) VALUES {', '.join([placeholders] * len(batch))} "
+                    f"ON CONFLICT (product_id, day) DO UPDATE SET {additions}",
+                    [value for row in batch for value in row]
+                )
+        product_ids = {product_id for (product_id, _), delta in deltas.items() if delta['units']}
+        if product_ids:
+            units_changed.send(sender=ProductSalesDay, product_ids=product_ids)
+
+def record(old: Optional[OrderState], new: Optional[OrderState]):
+    RollupDeltas().changed(old, new).apply()
+
+def _start_of(day: date) -> datetime:
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+def compute_rollups(start: date, end: date) -> List[ProductSalesDay]:
+    """Build (unsaved) rollup rows for the days in ``[start, end)`` in one GROUP BY"""
+    earning = ~Q(status=CANCELLED)
+    aggregates = {
+        'units': Sum('quantity', filter=earning),
+        'order_count': Count('id'),
+        'revenue': Sum('line_total', filter=earning),
+    }
+    for value, field in STATUS_FIELDS.items():
+        aggregates[field] = Count('id', filter=Q(status=value))
+    rows = (
+        Order.objects.filter(date__gte=_start_of(start), date__lt=_start_of(end))
+        .annotate(day=TruncDate('date'))
+        .values('product_id', 'day')
+        .annotate(**aggregates)
+        .order_by()
+    )
+    return [
+        ProductSalesDay(**{**row, 'units': row['units'] or 0, 'revenue': row['revenue'] or 0})
+        for row in rows
+    ]
+
+def order_date_range() -> Optional[Tuple[date, date]]:
+    """First and last day with orders, or None without orders"""
+    bounds = Order.objects.aggregate(first=Min('date'), last=Max('date'))
+    if bounds['first'] is None:
+        return None
+    return timezone.localdate(bounds['first']), timezone.localdate(bounds['last'])
+
+ChunkCallback = Optional[Callable[[date, date, int], None]]
+
+def rebuild_rollups(start: date, end: date, chunk_days: int = 31, on_chunk: ChunkCallback = None) -> int:
+    """
+    Recompute the rollup for the days in ``[start, end)``, ``chunk_days`` at
+    a time. Each chunk replaces its days in its own transaction; returns the
+    number of rows written.
+    """
+    written = 0
+    chunk_start = start
+    while chunk_start < end:
+        chunk_end = min(chunk_start + timedelta(days=chunk_days), end)
+        with transaction.atomic():
+            rows = compute_rollups(chunk_start, chunk_end)
+            ProductSalesDay.objects.filter(day__gte=chunk_start, day__lt=chunk_end).delete()
+            ProductSalesDay.objects.bulk_create(rows, batch_size=1000)
+        written += len(rows)
+        if on_chunk is not None:
+            on_chunk(chunk_start, chunk_end, len(rows))
+        chunk_start = chunk_end
+    units_changed.send(sender=ProductSalesDay, product_ids=None)
+    return written
+
+def rebuild_all_rollups(chunk_days: int = 31, on_chunk: ChunkCallback = None) -> int:
+    bounds = order_date_range()
+    if bounds is None:
+        ProductSalesDay.objects.all().delete()
+        units_changed.send(sender=ProductSalesDay, product_ids=None)
+        return 0
+    first, last = bounds
+    ProductSalesDay.objects.exclude(day__gte=first, day__lte=last).delete()
+    return rebuild_rollups(first, last + timedelta(days=1), chunk_days, on_chunk)
+
+INTERVALS = {
+    'day': None,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+def sales_series(start: Optional[date] = None, end: Optional[date] = None, product_id: Optional[int] = None,
+                 category: Optional[str] = None, interval: str = 'day') -> List[Dict[str, object]]:
+    """Units, orders, revenue and status counts per day, week or month of ``[start, end)``"""
+    # Rows whose orders were all deleted stay behind at zero until the next rebuild
+    rows = ProductSalesDay.objects.filter(order_count__gt=0)
+    if start:
+        rows = rows.filter(day__gte=start)
+    if end:
+        rows = rows.filter(day__lt=end)
+    if product_id:
+        rows = rows.filter(product_id=product_id)
+    if category:
+        rows = rows.filter(product__category=category)
+    truncate = INTERVALS[interval]
+    rows = rows.annotate(period=truncate('day') if truncate else F('day'))
+    series = rows.values('period').annotate(**{field: Sum(field) for field in ROLLUP_FIELDS}).order_by('period')
+    return [
+        {**row, 'period': row['period'].isoformat(), 'revenue': str(Decimal(row['revenue']).quantize(Decimal('0.01')))}
+        for row in series
+    ]
@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Supplier, Product, Order
+from .stock import InsufficientStock
 from accounts.serializers import UserSerializer
 
 class SupplierSerializer(serializers.ModelSerializer):
@@ -26,5 +27,17 @@ class OrderSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
         fields = ['id', 'product', 'product_name', 'user', 'user_name', 'quantity',
-                 'status', 'total_price', 'date', 'updated_at']
-        read_only_fields = ['id', 'date', 'updated_at', 'total_price']
\ No newline at end of file
+                 'status', 'unit_price', 'total_price', 'date', 'updated_at']
+        read_only_fields = ['id', 'date', 'updated_at', 'unit_price', 'total_price']
+
+    def create(self, validated_data):
+        try:
+            return super().create(validated_data)
+        except InsufficientStock as e:
+            raise serializers.ValidationError({'quantity': [str(e)]})
+
+    def update(self, instance, validated_data):
+        try:
+            return super().update(instance, validated_data)
+        except InsufficientStock as e:
+            raise serializers.ValidationError({'quantity': [str(e)]})
@@ -0,0 +1,90 @@
+from django.db.models import QuerySet
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from .models import Order, Product, Supplier
+from . import rollups, stock, summary
+
+def _deletes_product(origin):
+    """Whether a delete started from ``origin`` removes products as well"""
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return issubclass(model, (Product, Supplier))
+
+@receiver(pre_save, sender=Order)
+def reserve_order_stock(sender, instance, raw=False, **kwargs):
+    """Reserve, adjust or release stock for the order being saved"""
+    if not raw:
+        stock.sync_order(instance)
+
+@receiver(post_delete, sender=Order)
+def release_order_stock(sender, instance, origin=None, **kwargs):
+    """Give back the stock a deleted order was holding"""
+    # Stock of a product that is being deleted itself does not need restoring
+    if origin is None or not _deletes_product(origin):
+        stock.release_order(instance)
+
+@receiver(pre_save, sender=Order)
+def load_rollup_state(sender, instance, **kwargs):
+    # Orders saved without being loaded first; what they replace is read here
+    if instance.pk is not None and rollups.previous_state(instance) is None:
+        instance._rollup_state = rollups.stored_state(instance)
+
+@receiver(post_save, sender=Order)
+def update_sales_rollup(sender, instance, created, **kwargs):
+    """Apply the order's change to its product's daily sales"""
+    if created:
+        old = None
+    else:
+        old = rollups.previous_state(instance) or instance.__dict__.pop('_rollup_state', None)
+    rollups.record(old, rollups.state_of(instance))
+
+@receiver(pre_delete, sender=Order)
+def load_deleted_order_state(sender, instance, origin=None, **kwargs):
+    # As for products: only the instance delete() was called on may be stale
+    if origin is instance:
+        instance._rollup_state = rollups.stored_state(instance)
+    else:
+        instance._rollup_state = rollups.state_of(instance)
+
+@receiver(post_delete, sender=Order)
+def remove_from_sales_rollup(sender, instance, origin=None, **kwargs):
+    # The rollup rows of deleted products are removed with them
+    old = getattr(instance, '_rollup_state', None)
+    if old is not None and (origin is None or not _deletes_product(origin)):
+        rollups.record(old, None)
+
+@receiver(pre_save, sender=Product)
+def load_product_state(sender, instance, raw=False, **kwargs):
+    # Products saved without being loaded first; what they replace is read here
+    if not raw and instance.pk is not None and summary.previous_state(instance) is None:
+        instance._summary_state = summary.stored_states([instance.pk]).get(instance.pk)
+
+@receiver(post_save, sender=Product)
+def update_inventory_summary(sender, instance, created, update_fields=None, **kwargs):
+    """Apply the product's change to the inventory summary"""
+    stored = instance.__dict__.pop('_summary_state', None)
+    if created:
+        summary.record(None, summary.state_of(instance))
+        return
+    old = summary.previous_state(instance) or stored
+    if old is None:
+        # The row vanished before the save; an UPDATE of it wrote nothing
+        return
+    new = summary.state_of(instance)
+    if update_fields is not None:
+        new = old._replace(**{field: value for field, value in new._asdict().items() if field in update_fields})
+    summary.record(old, new)
+
+@receiver(pre_delete, sender=Product)
+def load_deleted_product_state(sender, instance, origin=None, **kwargs):
+    # Products collected by a cascade or queryset delete were just read;
+    # the instance delete() was called on may be stale
+    if origin is instance:
+        instance._summary_state = summary.stored_states([instance.pk]).get(instance.pk)
+    else:
+        instance._summary_state = summary.state_of(instance)
+
+@receiver(post_delete, sender=Product)
+def remove_from_inventory_summary(sender, instance, **kwargs):
+    old = getattr(instance, '_summary_state', None)
+    if old is not None:
+        summary.record(old, None)
@@ -0,0 +1,130 @@
+"""
+Atomic stock reservation for orders.
+
+An active (not cancelled) order holds ``quantity`` units of its product.
+Holds are taken with a single conditional UPDATE, so concurrent orders for
+the same product can never oversell or lose a decrement, and given back
+when the order is cancelled, shrunk, moved to another product or deleted.
+"""
+from typing import NamedTuple, Optional, Tuple
+from django.db import connection
+from django.dispatch import Signal
+from django.utils import timezone
+from .models import Order, Product
+from .summary import ProductState, record
+
+CANCELLED = 'Cancelled'
+
+# Sent after a reservation lowers a product's stock
+stock_reserved = Signal()
+
+Hold = Optional[Tuple[int, int]]
+
+class Reservation(NamedTuple):
+    product_id: int
+    name: str
+    old_quantity: int
+    new_quantity: int
+    min_stock: int
+
+class InsufficientStock(Exception):
+    def __init__(self, product_id: int, requested: int, available: Optional[int]):
+        self.product_id = product_id
+        self.requested = requested
+        self.available = available
+        if available is None:
+            message = f"Product #{product_id} does not exist"
+        else:
+            message = f"Only {available} units in stock, {requested} requested"
+        super().__init__(message)
+
+def reserve(product_id: int, quantity: int, notify: bool = True) -> Reservation:
+    """
+    Take ``quantity`` units from stock. ``notify=False`` skips the
+    ``stock_reserved`` signal for callers that report changes themselves.
+    """
+    table = connection.ops.quote_name(Product._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {table} SET quantity = quantity - %s, updated_at = %s "
+            f"WHERE id = %s AND quantity >= %s RETURNING quantity, name, min_stock, category, price",
+            [quantity, timezone.now(), product_id, quantity]
+        )
+        row = cursor.fetchone()
+    if row is None:
+        available = Product.objects.filter(pk=product_id).values_list('quantity', flat=True).first()
+        raise InsufficientStock(product_id, quantity, available)
+
+    remaining, name, min_stock, category, price = row
+    record(
+        ProductState(category, remaining + quantity, price, min_stock),
+        ProductState(category, remaining, price, min_stock),
+    )
+    reservation = Reservation(product_id, name, remaining + quantity, remaining, min_stock)
+    if notify:
+        stock_reserved.send(sender=Product, **reservation._asdict())
+    return reservation
+
+def release(product_id: int, quantity: int):
+    """Return ``quantity`` units to stock"""
+    table = connection.ops.quote_name(Product._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"UPDATE {table} SET quantity = quantity + %s, updated_at = %s "
+            f"WHERE id = %s RETURNING quantity, category, price, min_stock",
+            [quantity, timezone.now(), product_id]
+        )
+        row = cursor.fetchone()
+    if row is not None:
+        restored, category, price, min_stock = row
+        record(
+            ProductState(category, restored - quantity, price, min_stock),
+            ProductState(category, restored, price, min_stock),
+        )
+
+def held(product_id: Optional[int], quantity: int, status: str) -> Hold:
+    if product_id is None or status == CANCELLED:
+        return None
+    return product_id, quantity
+
+def previous_hold(order: Order) -> Hold:
+    """Stock the stored version of ``order`` holds"""
+    if order.pk is None:
+        return None
+    if not order._state.adding and all(order.is_tracked(field) for field in Order.tracked_fields):
+        return held(order.previous('product_id'), order.previous('quantity'), order.previous('status'))
+    # Instances built by hand rather than loaded from the database
+    stored = Order.objects.filter(pk=order.pk).values_list('product_id', 'quantity', 'status').first()
+    return held(*stored) if stored else None
+
+def adjust(old: Hold, new: Hold):
+    """
+    Move stock from hold ``old`` to hold ``new``, reserving before releasing.
+    Callers run this inside the transaction that writes the order.
+    """
+    if old == new:
+        return
+    if old is not None and new is not None and old[0] == new[0]:
+        delta = new[1] - old[1]
+        if delta > 0:
+            reserve(new[0], delta)
+        elif delta < 0:
+            release(new[0], -delta)
+        return
+    if new is not None:
+        reserve(*new)
+    if old is not None:
+        release(*old)
+
+def sync_order(order: Order):
+    """Bring stock in line with ``order`` before it is saved"""
+    adjust(previous_hold(order), held(order.product_id, order.quantity, order.status))
+
+def release_order(order: Order):
+    """Give back the stock held by a deleted order"""
+    if all(order.is_tracked(field) for field in Order.tracked_fields):
+        hold = held(order.previous('product_id'), order.previous('quantity'), order.previous('status'))
+    else:
+        hold = held(order.product_id, order.quantity, order.status)
+    if hold is not None:
+        release(*hold)
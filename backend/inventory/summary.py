@@ -0,0 +1,134 @@
+"""
+Maintenance of the denormalized InventorySummary rows.
+
+Every code path that creates, changes or deletes products records the old
+and new state of each product here, inside the same transaction as the
+write. Each changed category row, and the overall row, is then adjusted
+with one UPDATE. ``rebuild_summary`` recomputes everything from the
+products table, whether after bulk loads or to repair drift.
+"""
+from collections import defaultdict
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Dict, List, NamedTuple, Optional
+from django.db import transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.utils import timezone
+from .models import LOW_STOCK_THRESHOLD, InventorySummary, Product
+
+SUMMARY_FIELDS = ['product_count', 'units', 'stock_value', 'low_stock_count', 'below_min_stock_count']
+
+class ProductState(NamedTuple):
+    category: str
+    quantity: int
+    price: Decimal
+    min_stock: int
+
+def state_of(product: Product) -> ProductState:
+    return ProductState(product.category, product.quantity, product.price, product.min_stock)
+
+def previous_state(product: Product) -> Optional[ProductState]:
+    """State as loaded from the database, or None when it is not known"""
+    if not all(product.is_tracked(field) for field in ProductState._fields):
+        return None
+    return ProductState(*(product.previous(field) for field in ProductState._fields))
+
+def stored_states(product_ids, lock: bool = False) -> Dict[int, ProductState]:
+    """
+    States of the stored rows, in one query. ``lock`` holds the rows (in id
+    order) until the transaction ends, so nothing moves them in between.
+    """
+    rows = Product.objects.filter(pk__in=list(product_ids)).order_by('id')
+    if lock:
+        rows = rows.select_for_update()
+    return {pk: ProductState(*state) for pk, *state in rows.values_list('id', *ProductState._fields)}
+
+@dataclass
+class SummaryDelta:
+    product_count: int = 0
+    units: int = 0
+    stock_value: Decimal = Decimal('0')
+    low_stock_count: int = 0
+    below_min_stock_count: int = 0
+
+    def add(self, state: ProductState, sign: int):
+        self.product_count += sign
+        self.units += sign * state.quantity
+        # Raw cursors on some backends return prices as floats
+        self.stock_value += sign * state.quantity * Decimal(str(state.price))
+        self.low_stock_count += sign * (state.quantity < LOW_STOCK_THRESHOLD)
+        self.below_min_stock_count += sign * (state.quantity < state.min_stock)
+
+    def updates(self) -> Dict[str, object]:
+        return {name: F(name) + getattr(self, name) for name in SUMMARY_FIELDS if getattr(self, name)}
+
+class SummaryDeltas:
+    """Accumulates product changes and applies them with one UPDATE per changed row"""
+
+    def __init__(self):
+        self._deltas: Dict[str, SummaryDelta] = defaultdict(SummaryDelta)
+
+    def changed(self, old: Optional[ProductState], new: Optional[ProductState]):
+        """Record a product going from ``old`` to ``new``; None means it did not or no longer exists"""
+        for state, sign in ((old, -1), (new, 1)):
+            if state is not None:
+                self._deltas[state.category].add(state, sign)
+                self._deltas[InventorySummary.TOTAL].add(state, sign)
+        return self
+
+    def apply(self):
+        deltas, self._deltas = self._deltas, defaultdict(SummaryDelta)
+        now = timezone.now()
+        for category, delta in deltas.items():
+            updates = delta.updates()
+            if not updates:
+                continue
+            if not InventorySummary.objects.filter(category=category).update(**updates, updated_at=now):
+                # The row was never built; recomputing includes the change being recorded
+                rebuild_summary()
+                return
+
+def record(old: Optional[ProductState], new: Optional[ProductState]):
+    SummaryDeltas().changed(old, new).apply()
+
+def compute_summary() -> List[InventorySummary]:
+    """Build (unsaved) summary rows from the products table in one GROUP BY"""
+    value = ExpressionWrapper(F('quantity') * F('price'), output_field=DecimalField(max_digits=18, decimal_places=2))
+    rows = Product.objects.values('category').annotate(
+        product_count=Count('id'),
+        units=Sum('quantity'),
+        stock_value=Sum(value),
+        low_stock_count=Count('id', filter=Q(quantity__lt=LOW_STOCK_THRESHOLD)),
+        below_min_stock_count=Count('id', filter=Q(quantity__lt=F('min_stock'))),
+    ).order_by()
+
+    summaries = {InventorySummary.TOTAL: InventorySummary(category=InventorySummary.TOTAL)}
+    for category, _ in Product.CATEGORY_CHOICES:
+        summaries[category] = InventorySummary(category=category)
+    for row in rows:
+        summary = summaries.setdefault(row['category'], InventorySummary(category=row['category']))
+        total = summaries[InventorySummary.TOTAL]
+        for name in SUMMARY_FIELDS:
+            value = row[name] or 0
+            setattr(summary, name, value)
+            setattr(total, name, getattr(total, name) + value)
+    return list(summaries.values())
+
+def rebuild_summary() -> List[InventorySummary]:
+    summaries = compute_summary()
+    with transaction.atomic():
+        InventorySummary.objects.exclude(category__in=[summary.category for summary in summaries]).delete()
+        InventorySummary.objects.bulk_create(
+            summaries,
+            update_conflicts=True,
+            unique_fields=['category'],
+            update_fields=SUMMARY_FIELDS + ['updated_at'],
+        )
+    return summaries
+
+def load_summary() -> Dict[str, InventorySummary]:
+    """All summary rows by category, rebuilding them if they were never built"""
+    summaries = InventorySummary.objects.in_bulk()
+    if InventorySummary.TOTAL not in summaries:
+        summaries = {summary.category: summary for summary in rebuild_summary()}
+    return summaries
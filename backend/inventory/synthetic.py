@@ -0,0 +1,336 @@
+"""
+Deterministic synthetic data for load testing.
+
+Everything is derived from one seed, so two runs with the same arguments
+produce the same rows. Rows are written in batches with ``bulk_create``, or
+with PostgreSQL ``COPY`` when requested, and signals are bypassed unless
+``send_signals`` is set. Distributions are skewed the way real inventories
+are: a few suppliers carry most products, a few products and customers
+account for most orders, and order volume grows over time with weekday and
+end-of-year peaks.
+"""
+import bisect
+import math
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate, islice
+from typing import Callable, Iterable, Iterator, List, Optional
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.utils import timezone
+from notifications.counters import rebuild_counters
+from notifications.models import Notification, NotificationType
+from notifications.recipients import recipient_directory
+from .models import Order, Product, Supplier
+from .rollups import rebuild_all_rollups
+from .summary import rebuild_summary
+
+User = get_user_model()
+
+# Row counts at --scale 1
+SCALE_BASE = {
+    'users': 1_000,
+    'suppliers': 200,
+    'products': 100_000,
+    'orders': 5_000_000,
+    'notifications': 20_000_000,
+}
+
+ROLE_WEIGHTS = [('Admin', 0.02), ('Manager', 0.08), ('Employee', 0.90)]
+
+CATEGORIES = {
+    # category: (share of products, median price, product nouns)
+    'Electronics': (0.5, 250, ['Laptop', 'Monitor', 'Headphones', 'Keyboard', 'Router', 'Tablet', 'Webcam', 'Charger']),
+    'Office Supplies': (0.3, 15, ['Paper Ream', 'Stapler', 'Printer Ink', 'Notebook', 'Pen Set', 'Folder', 'Label Roll']),
+    'Furniture': (0.2, 300, ['Desk', 'Office Chair', 'Bookshelf', 'Filing Cabinet', 'Standing Desk', 'Lamp']),
+}
+
+ADJECTIVES = ['Pro', 'Plus', 'Lite', 'Max', 'Compact', 'Ergo', 'Classic', 'Ultra', 'Basic', 'Prime']
+
+# Relative order volume per month (peaks in November/December)
+MONTH_WEIGHTS = [0.8, 0.8, 0.9, 0.95, 1.0, 0.95, 0.9, 0.95, 1.0, 1.05, 1.4, 1.6]
+WEEKDAY_WEIGHTS = [1.1, 1.1, 1.1, 1.05, 1.0, 0.6, 0.5]
+
+NOTIFICATION_TEMPLATES = [
+    (NotificationType.ORDER_STATUS, 0.35, "New Order Received", "New order #{n} from a customer is waiting to be processed.", 'order'),
+    (NotificationType.SUCCESS, 0.2, "Order Placed Successfully", "Your order #{n} has been placed successfully.", 'order'),
+    (NotificationType.WARNING, 0.15, "Stock Level Decreased", "Stock for product #{n} decreased significantly.", 'product'),
+    (NotificationType.INVENTORY_LOW, 0.12, "Low Stock Alert", "Product #{n} is running low.", 'product'),
+    (NotificationType.ORDER_HIGH_VALUE, 0.05, "🎉 High-Value Order Alert!", "Order #{n} is a high-value order.", 'order'),
+    (NotificationType.ERROR, 0.03, "CRITICAL: Stock Almost Empty", "Product #{n} has almost no units left.", 'product'),
+    (NotificationType.INFO, 0.06, "Inventory Report Generated", "Your inventory report #{n} is ready for review.", None),
+    (NotificationType.SYSTEM, 0.04, "Backup Completed", "Daily backup #{n} completed successfully.", None),
+]
+
+def zipf_cum_weights(n: int, exponent: float = 1.1) -> List[float]:
+    """Cumulative weights giving rank ``r`` a share proportional to 1/r**exponent"""
+    return list(accumulate(1 / rank ** exponent for rank in range(1, n + 1)))
+
+def batched(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+@contextmanager
+def historical_timestamps(*models):
+    """Let generated rows keep their own created/updated timestamps"""
+    fields = [
+        field for model in models for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    saved = [(field, field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+class TableWriter:
+    """Writes unsaved model instances with bulk_create, COPY or (with signals) save()"""
+
+    def __init__(self, model, batch_size: int = 10_000, use_copy: bool = False, send_signals: bool = False):
+        self.model = model
+        self.batch_size = batch_size
+        self.use_copy = use_copy and connection.vendor == 'postgresql' and not send_signals
+        self.send_signals = send_signals
+        self.fields = [field for field in model._meta.concrete_fields if not field.primary_key and not field.generated]
+
+    def write(self, objects: Iterable, on_batch: Optional[Callable[[int], None]] = None) -> int:
+        written = 0
+        with historical_timestamps(self.model):
+            for batch in batched(objects, self.batch_size):
+                with transaction.atomic():
+                    if self.use_copy:
+                        self._copy(batch)
+                    elif self.send_signals:
+                        for obj in batch:
+                            obj.save()
+                    else:
+                        self.model.objects.bulk_create(batch)
+                written += len(batch)
+                if on_batch is not None:
+                    on_batch(written)
+        return written
+
+    def _copy(self, batch):
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        columns = ', '.join(connection.ops.quote_name(field.column) for field in self.fields)
+        with connection.cursor() as cursor:
+            with cursor.cursor.copy(f"COPY {table} ({columns}) FROM STDIN") as copy:
+                for obj in batch:
+                    copy.write_row([field.get_db_prep_save(getattr(obj, field.attname), connection) for field in self.fields])
+
+class SyntheticDataGenerator:
+    def __init__(
+        self,
+        seed: int = 42,
+        years: float = 2,
+        batch_size: int = 10_000,
+        use_copy: bool = False,
+        send_signals: bool = False,
+        on_progress: Optional[Callable[[str, int], None]] = None
+    ):
+        self.seed = seed
+        self.batch_size = batch_size
+        self.use_copy = use_copy
+        self.send_signals = send_signals
+        self.on_progress = on_progress
+        self.end = timezone.now().replace(microsecond=0)
+        self.start = self.end - timedelta(days=365 * years)
+        self.span = (self.end - self.start).total_seconds()
+
+    def _rng(self, table: str) -> random.Random:
+        # Each table has its own stream, so changing one count leaves the others unchanged
+        return random.Random(f'{self.seed}:{table}')
+
+    def _write(self, model, objects: Iterable) -> int:
+        writer = TableWriter(model, self.batch_size, self.use_copy, self.send_signals)
+        on_batch = (lambda written: self.on_progress(model.__name__, written)) if self.on_progress else None
+        return writer.write(objects, on_batch)
+
+    def _new_ids(self, model, after_id: int) -> List[int]:
+        return list(model.objects.filter(id__gt=after_id).order_by('id').values_list('id', flat=True))
+
+    def _last_id(self, model) -> int:
+        last = model.objects.order_by('-id').values_list('id', flat=True).first()
+        return last or 0
+
+    def _moment(self, rng: random.Random, recency: float = 1.5) -> timezone.datetime:
+        """
+        A timestamp in the window, weighted towards recent dates (business
+        growth), weekdays and the end-of-year peak
+        """
+        while True:
+            position = rng.random() ** (1 / recency)
+            moment = self.start + timedelta(seconds=position * self.span)
+            weight = MONTH_WEIGHTS[moment.month - 1] * WEEKDAY_WEIGHTS[moment.weekday()]
+            if rng.random() * 1.6 * 1.1 < weight:
+                return moment
+
+    def users(self, count: int) -> List[int]:
+        rng = self._rng('users')
+        roles, weights = zip(*ROLE_WEIGHTS)
+        password = make_password(None)
+        prefix = f'loadtest-{self.seed}-'
+        if User.objects.filter(username__startswith=prefix).exists():
+            raise ValueError(f"Synthetic users for seed {self.seed} already exist; use another --seed")
+
+        def rows():
+            for i in range(count):
+                joined = self.start + timedelta(seconds=rng.random() * self.span)
+                yield User(
+                    username=f'{prefix}{i}',
+                    email=f'{prefix}{i}@example.com',
+                    first_name=f'User{i}',
+                    role=rng.choices(roles, weights)[0],
+                    password=password,
+                    date_joined=joined,
+                )
+
+        last_id = self._last_id(User)
+        self._write(User, rows())
+        recipient_directory.invalidate()
+        return self._new_ids(User, last_id)
+
+    def suppliers(self, count: int) -> List[int]:
+        rng = self._rng('suppliers')
+
+        def rows():
+            for i in range(count):
+                created = self.start + timedelta(seconds=rng.random() * self.span * 0.2)
+                yield Supplier(
+                    name=f'Supplier {i:04d}',
+                    contact=f'supplier{i}@example.com',
+                    phone=f'555-{rng.randrange(1000):03d}-{rng.randrange(10000):04d}',
+                    created_at=created,
+                    updated_at=created,
+                )
+
+        last_id = self._last_id(Supplier)
+        self._write(Supplier, rows())
+        return self._new_ids(Supplier, last_id)
+
+    def products(self, count: int, supplier_ids: List[int]) -> List[int]:
+        rng = self._rng('products')
+        categories = list(CATEGORIES)
+        category_weights = [CATEGORIES[category][0] for category in categories]
+        # A handful of suppliers carry most of the catalogue
+        supplier_weights = zipf_cum_weights(len(supplier_ids))
+
+        def rows():
+            for i in range(count):
+                category = rng.choices(categories, category_weights)[0]
+                _, median_price, nouns = CATEGORIES[category]
+                price = Decimal(str(round(median_price * math.exp(rng.gauss(0, 0.6)), 2)))
+                created = self.start + timedelta(seconds=rng.random() * self.span * 0.8)
+                min_stock = rng.choice([5, 10, 10, 20, 25, 50])
+                yield Product(
+                    name=f'{rng.choice(nouns)} {rng.choice(ADJECTIVES)} {i}',
+                    category=category,
+                    quantity=int(min_stock * math.exp(rng.gauss(1.2, 1.0))),
+                    price=max(price, Decimal('0.50')),
+                    supplier_id=supplier_ids[bisect.bisect(supplier_weights, rng.random() * supplier_weights[-1])],
+                    min_stock=min_stock,
+                    created_at=created,
+                    updated_at=created,
+                )
+
+        last_id = self._last_id(Product)
+        self._write(Product, rows())
+        # Bulk writes bypass the inventory summary bookkeeping
+        rebuild_summary()
+        return self._new_ids(Product, last_id)
+
+    def orders(self, count: int, product_ids: List[int], user_ids: List[int]) -> int:
+        rng = self._rng('orders')
+        # Popular products and repeat customers dominate; shuffle ranks so
+        # popularity does not simply follow insertion order
+        product_ranks = product_ids[:]
+        rng.shuffle(product_ranks)
+        user_ranks = user_ids[:]
+        rng.shuffle(user_ranks)
+        product_weights = zipf_cum_weights(len(product_ranks), 1.05)
+        user_weights = zipf_cum_weights(len(user_ranks), 0.9)
+        prices = dict(Product.objects.filter(pk__in=product_ids).values_list('id', 'price'))
+        # Saved one by one, active orders reserve stock, so they must fit in what is left
+        stock = dict(Product.objects.filter(pk__in=product_ids).values_list('id', 'quantity')) if self.send_signals else None
+
+        def pick(ranks, weights):
+            return ranks[bisect.bisect(weights, rng.random() * weights[-1])]
+
+        def rows():
+            for _ in range(count):
+                placed = self._moment(rng)
+                age_days = (self.end - placed).days
+                if age_days > 30:
+                    status = rng.choices(['Delivered', 'Cancelled'], [0.93, 0.07])[0]
+                elif age_days > 7:
+                    status = rng.choices(['Delivered', 'Shipped', 'Cancelled'], [0.6, 0.33, 0.07])[0]
+                else:
+                    status = rng.choices(['Pending', 'Processing', 'Shipped', 'Cancelled'], [0.4, 0.3, 0.25, 0.05])[0]
+                updated = min(placed + timedelta(days=rng.randint(0, min(age_days, 14))), self.end)
+                product_id = pick(product_ranks, product_weights)
+                user_id = pick(user_ranks, user_weights)
+                quantity = min(int(rng.expovariate(0.35)) + 1, 50)
+                if stock is not None and status != 'Cancelled':
+                    if stock[product_id] == 0:
+                        # Sold out: the customer's order was cancelled, which holds no stock
+                        status = 'Cancelled'
+                    else:
+                        quantity = min(quantity, stock[product_id])
+                        stock[product_id] -= quantity
+                yield Order(
+                    product_id=product_id,
+                    user_id=user_id,
+                    unit_price=prices[product_id],
+                    quantity=quantity,
+                    status=status,
+                    date=placed,
+                    updated_at=updated,
+                )
+
+        written = self._write(Order, rows())
+        # Bulk writes bypass the daily sales bookkeeping
+        rebuild_all_rollups()
+        return written
+
+    def notifications(self, count: int, user_ids: List[int]) -> int:
+        rng = self._rng('notifications')
+        staff = set(
+            User.objects.filter(id__in=user_ids, role__in=['Admin', 'Manager']).values_list('id', flat=True)
+        )
+        # Staff receive the broadcasts, so they get most of the rows
+        recipients = sorted(user_ids, key=lambda user_id: user_id not in staff)
+        recipient_weights = zipf_cum_weights(len(recipients), 0.8)
+        templates = [template[:1] + template[2:] for template in NOTIFICATION_TEMPLATES]
+        template_weights = [template[1] for template in NOTIFICATION_TEMPLATES]
+
+        def rows():
+            for i in range(count):
+                notification_type, title, message, object_type = rng.choices(templates, template_weights)[0]
+                created = self._moment(rng, recency=2.5)
+                age_days = (self.end - created).days
+                is_read = rng.random() < min(0.2 + age_days / 30, 0.97)
+                updated = min(created + timedelta(hours=rng.randint(0, 72)), self.end) if is_read else created
+                yield Notification(
+                    recipient_id=recipients[bisect.bisect(recipient_weights, rng.random() * recipient_weights[-1])],
+                    title=title,
+                    message=message.format(n=i),
+                    notification_type=notification_type,
+                    is_read=is_read,
+                    related_object_id=rng.randint(1, 1_000_000) if object_type else None,
+                    related_object_type=object_type,
+                    created_at=created,
+                    updated_at=updated,
+                )
+
+        written = self._write(Notification, rows())
+        # Bulk writes bypass the counter bookkeeping
+        for batch in batched(user_ids, 1000):
+            rebuild_counters(batch)
+        return written
@@ -1,3 +1,246 @@
+from datetime import timedelta
+from decimal import Decimal
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from .models import InventorySummary, Order, Product, ProductSalesDay, Supplier
+from .rollups import ROLLUP_FIELDS, compute_rollups, order_date_range, rebuild_all_rollups
+from .stock import InsufficientStock
+from .summary import SUMMARY_FIELDS, compute_summary
 
-# Create your tests here.
+User = get_user_model()
+
+class InventoryTestCase(TestCase):
+    def setUp(self):
+        self.supplier = Supplier.objects.create(name='Acme', contact='acme@example.com', phone='555-0100')
+        self.user = User.objects.create_user(username='buyer', password='secret')
+        self.product = self.make_product('Widget', quantity=10)
+
+    def make_product(self, name, quantity=10, price='2.50', category='Electronics', min_stock=5):
+        return Product.objects.create(
+            name=name, supplier=self.supplier, category=category,
+            quantity=quantity, price=price, min_stock=min_stock,
+        )
+
+    def stock_of(self, product):
+        return Product.objects.values_list('quantity', flat=True).get(pk=product.pk)
+
+class StockReservationTests(InventoryTestCase):
+    def test_order_reserves_stock(self):
+        Order.objects.create(product=self.product, user=self.user, quantity=4)
+        self.assertEqual(self.stock_of(self.product), 6)
+
+    def test_oversell_raises_and_leaves_stock_unchanged(self):
+        with self.assertRaises(InsufficientStock) as raised:
+            Order.objects.create(product=self.product, user=self.user, quantity=11)
+        self.assertEqual(raised.exception.available, 10)
+        self.assertEqual(self.stock_of(self.product), 10)
+        self.assertFalse(Order.objects.exists())
+
+    def test_oversell_through_the_api_returns_400(self):
+        client = APIClient()
+        response = client.post('/api/orders/', {
+            'product': self.product.pk, 'user': self.user.pk, 'quantity': 11, 'status': 'Pending',
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('quantity', response.data)
+        self.assertEqual(self.stock_of(self.product), 10)
+        self.assertFalse(Order.objects.exists())
+
+    def test_cancelling_restores_stock(self):
+        order = Order.objects.create(product=self.product, user=self.user, quantity=4)
+        order.status = 'Cancelled'
+        order.save()
+        self.assertEqual(self.stock_of(self.product), 10)
+
+    def test_reopening_a_cancelled_order_reserves_again(self):
+        order = Order.objects.create(product=self.product, user=self.user, quantity=4, status='Cancelled')
+        self.assertEqual(self.stock_of(self.product), 10)
+        order.status = 'Pending'
+        order.save()
+        self.assertEqual(self.stock_of(self.product), 6)
+
+    def test_deleting_restores_stock(self):
+        order = Order.objects.create(product=self.product, user=self.user, quantity=4)
+        order.delete()
+        self.assertEqual(self.stock_of(self.product), 10)
+
+    def test_deleting_a_cancelled_order_leaves_stock_alone(self):
+        order = Order.objects.create(product=self.product, user=self.user, quantity=4, status='Cancelled')
+        order.delete()
+        self.assertEqual(self.stock_of(self.product), 10)
+
+    def test_quantity_edit_applies_only_the_delta(self):
+        order = Order.objects.create(product=self.product, user=self.user, quantity=4)
+        # Stock moved by someone else in between must survive the edit
+        Product.objects.filter(pk=self.product.pk).update(quantity=20)
+        order.quantity = 7
+        order.save()
+        self.assertEqual(self.stock_of(self.product), 17)
+        order.quantity = 2
+        order.save()
+        self.assertEqual(self.stock_of(self.product), 22)
+
+    def test_quantity_edit_beyond_stock_is_rejected(self):
+        order = Order.objects.create(product=self.product, user=self.user, quantity=4)
+        order.quantity = 15
+        with self.assertRaises(InsufficientStock):
+            order.save()
+        self.assertEqual(self.stock_of(self.product), 6)
+
+    def test_moving_an_order_to_another_product(self):
+        other = self.make_product('Gadget', quantity=5)
+        order = Order.objects.create(product=self.product, user=self.user, quantity=4)
+        order.product = other
+        order.save()
+        self.assertEqual(self.stock_of(self.product), 10)
+        self.assertEqual(self.stock_of(other), 1)
+
+    def test_hand_built_order_uses_the_stored_hold(self):
+        order = Order.objects.create(product=self.product, user=self.user, quantity=4)
+        stale = Order(pk=order.pk, product=self.product, user=self.user, quantity=6,
+                      status='Pending', date=order.date, unit_price=order.unit_price)
+        stale.save()
+        self.assertEqual(self.stock_of(self.product), 4)
+
+class SummaryTests(InventoryTestCase):
+    def assertSummaryMatchesRecompute(self):
+        stored = {row.category: row for row in InventorySummary.objects.all()}
+        for expected in compute_summary():
+            row = stored.get(expected.category, InventorySummary(category=expected.category))
+            for field in SUMMARY_FIELDS:
+                self.assertEqual(
+                    Decimal(str(getattr(row, field))), Decimal(str(getattr(expected, field))),
+                    f'{expected.category}.{field}'
+                )
+
+    def test_create_update_delete(self):
+        gadget = self.make_product('Gadget', quantity=3, price='10.00', category='Furniture', min_stock=8)
+        self.assertSummaryMatchesRecompute()
+
+        gadget.quantity = 40
+        gadget.price = '7.25'
+        gadget.save()
+        self.assertSummaryMatchesRecompute()
+
+        gadget.category = 'Office Supplies'
+        gadget.min_stock = 50
+        gadget.save()
+        self.assertSummaryMatchesRecompute()
+
+        gadget.delete()
+        self.assertSummaryMatchesRecompute()
+
+    def test_orders_move_stock_in_the_summary(self):
+        order = Order.objects.create(product=self.product, user=self.user, quantity=8)
+        self.assertSummaryMatchesRecompute()
+        order.quantity = 3
+        order.save()
+        self.assertSummaryMatchesRecompute()
+        order.delete()
+        self.assertSummaryMatchesRecompute()
+
+    def test_hand_built_product_save(self):
+        stale = Product(
+            pk=self.product.pk, name='Widget', supplier=self.supplier, category='Furniture',
+            quantity=1, price='9.00', min_stock=5, created_at=self.product.created_at,
+        )
+        stale.save()
+        self.assertSummaryMatchesRecompute()
+
+    def test_deleting_a_product_with_orders(self):
+        Order.objects.create(product=self.product, user=self.user, quantity=2)
+        self.make_product('Gadget')
+        self.product.delete()
+        self.assertSummaryMatchesRecompute()
+
+    def test_batch_endpoint(self):
+        client = APIClient()
+        response = client.post('/api/products/batch/', [
+            {'id': self.product.pk, 'quantity': 2, 'category': 'Furniture'},
+            {'name': 'Gizmo', 'supplier': self.supplier.pk, 'category': 'Office Supplies',
+             'quantity': 7, 'price': '3.00', 'min_stock': 9},
+        ], format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertSummaryMatchesRecompute()
+
+class RollupTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.product.quantity = 1000
+        self.product.save()
+        self.other = self.make_product('Gadget', quantity=1000, price='4.00')
+
+    def rollup_rows(self, rows):
+        # Rows whose orders all moved away stay behind with zero counts
+        return {
+            (row.product_id, row.day): tuple(Decimal(str(getattr(row, field))) for field in ROLLUP_FIELDS)
+            for row in rows if row.order_count
+        }
+
+    def assertRollupsMatchRecompute(self):
+        bounds = order_date_range()
+        expected = compute_rollups(bounds[0], bounds[1] + timedelta(days=1)) if bounds else []
+        self.assertEqual(self.rollup_rows(ProductSalesDay.objects.all()), self.rollup_rows(expected))
+
+    def order(self, product=None, quantity=2, **kwargs):
+        return Order.objects.create(product=product or self.product, user=self.user, quantity=quantity, **kwargs)
+
+    def test_create_update_delete(self):
+        first, second = self.order(), self.order(quantity=5)
+        self.order(product=self.other, status='Cancelled')
+        self.assertRollupsMatchRecompute()
+
+        first.quantity = 9
+        first.status = 'Shipped'
+        first.save()
+        self.assertRollupsMatchRecompute()
+
+        second.status = 'Cancelled'
+        second.save()
+        self.assertRollupsMatchRecompute()
+
+        first.delete()
+        self.assertRollupsMatchRecompute()
+
+    def test_moving_orders_between_products_and_days(self):
+        order = self.order(quantity=4)
+        order.product = self.other
+        order.save()
+        self.assertRollupsMatchRecompute()
+
+        order.date = timezone.now() - timedelta(days=3)
+        order.save()
+        self.assertRollupsMatchRecompute()
+
+    def test_price_changes_keep_order_revenue(self):
+        order = self.order(quantity=3)
+        self.product.price = '99.00'
+        self.product.save()
+        order.status = 'Processing'
+        order.save()
+        self.assertRollupsMatchRecompute()
+
+    def test_hand_built_order_save(self):
+        order = self.order(quantity=3)
+        stale = Order(pk=order.pk, product=self.other, user=self.user, quantity=6,
+                      status='Pending', date=order.date, unit_price=order.unit_price)
+        stale.save()
+        self.assertRollupsMatchRecompute()
+
+    def test_deleting_a_product_drops_its_rows(self):
+        self.order()
+        self.order(product=self.other)
+        self.other.delete()
+        self.assertRollupsMatchRecompute()
+        self.assertFalse(ProductSalesDay.objects.filter(product_id=self.other.pk).exists())
+
+    def test_rebuild_matches_deltas(self):
+        self.order()
+        order = self.order(product=self.other, quantity=7)
+        order.date = timezone.now() - timedelta(days=40)
+        order.save()
+        before = self.rollup_rows(ProductSalesDay.objects.all())
+        rebuild_all_rollups(chunk_days=7)
+        self.assertEqual(self.rollup_rows(ProductSalesDay.objects.all()), before)
@@ -1,43 +1,180 @@
+from django.conf import settings
+from django.utils import timezone
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from django.db.models import Sum, Count
-from .models import Supplier, Product, Order
+from collections import Counter, defaultdict
+from .models import LOW_STOCK_THRESHOLD, InventorySummary, Supplier, Product, Order
 from .serializers import SupplierSerializer, ProductSerializer, OrderSerializer
+from .batch import BatchItemErrors, BatchWriteMixin
+from .importer import FORMATS, ProductImporter, detect_format
+from .export import ExportMixin
+from .order_stats import StatsFilters, order_stats
+from . import rollups, stock, summary
 
-class SupplierViewSet(viewsets.ModelViewSet):
+class SupplierViewSet(BatchWriteMixin, viewsets.ModelViewSet):
     queryset = Supplier.objects.all()
     serializer_class = SupplierSerializer
     permission_classes = [AllowAny]  # Temporarily allow all
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(BatchWriteMixin, ExportMixin, viewsets.ModelViewSet):
     queryset = Product.objects.all().select_related('supplier')
     serializer_class = ProductSerializer
     permission_classes = [AllowAny]  # Temporarily allow all
+    export_columns = [
+        ('id', 'id'),
+        ('name', 'name'),
+        ('category', 'category'),
+        ('quantity', 'quantity'),
+        ('min_stock', 'min_stock'),
+        ('price', 'price'),
+        ('supplier_id', 'supplier_id'),
+        ('supplier', 'supplier__name'),
+        ('description', 'description'),
+        ('created_at', 'created_at'),
+        ('updated_at', 'updated_at'),
+    ]
 
     @action(detail=False, methods=['get'])
     def low_stock(self, request):
-        products = self.queryset.filter(quantity__lt=50)
+        products = self.queryset.filter(quantity__lt=LOW_STOCK_THRESHOLD)
         serializer = self.get_serializer(products, many=True)
         return Response(serializer.data)
 
     @action(detail=False, methods=['get'])
     def stats(self, request):
-        total_products = self.queryset.count()
-        low_stock_count = self.queryset.filter(quantity__lt=50).count()
-        categories = self.queryset.values('category').annotate(count=Count('id'))
+        """Catalog totals, read from the inventory summary rather than counted"""
+        summaries = summary.load_summary()
+        total = summaries.pop(InventorySummary.TOTAL)
 
         return Response({
-            'total_products': total_products,
-            'low_stock_count': low_stock_count,
-            'categories': list(categories)
+            'total_products': total.product_count,
+            'low_stock_count': total.low_stock_count,
+            'below_min_stock_count': total.below_min_stock_count,
+            'total_units': total.units,
+            'stock_value': str(total.stock_value),
+            'categories': [
+                {
+                    'category': row.category,
+                    'count': row.product_count,
+                    'units': row.units,
+                    'stock_value': str(row.stock_value),
+                    'low_stock_count': row.low_stock_count,
+                }
+                for row in sorted(summaries.values(), key=lambda row: row.category)
+                if row.product_count
+            ],
+            'updated_at': total.updated_at,
         })
 
-class OrderViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['get'])
+    def sales(self, request):
+        """
+        Daily, weekly (``?interval=week``) or monthly sales from the rollup,
+        with the same ``?start=&end=&product=&category=`` filters as order stats
+        """
+        interval = request.query_params.get('interval', 'day')
+        if interval not in rollups.INTERVALS:
+            return Response(
+                {'detail': f"'interval' must be one of: {', '.join(rollups.INTERVALS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            filters = StatsFilters.from_params(request.query_params)
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(rollups.sales_series(
+            start=timezone.localdate(filters.start) if filters.start else None,
+            end=timezone.localdate(filters.end) if filters.end else None,
+            product_id=filters.product_id,
+            category=filters.category,
+            interval=interval,
+        ))
+
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_products(self, request):
+        """
+        Upsert products from a CSV or NDJSON price list, sent either as the
+        raw request body or as a multipart ``file`` upload
+        """
+        if request.content_type.startswith('multipart/'):
+            upload = request.FILES.get('file')
+            if upload is None:
+                return Response({'detail': "Upload the price list as 'file'."}, status=status.HTTP_400_BAD_REQUEST)
+            lines, fmt = upload, detect_format(upload.content_type, upload.name)
+        else:
+            lines, fmt = request.stream, detect_format(request.content_type)
+        fmt = request.query_params.get('type', fmt)
+        if fmt not in FORMATS:
+            return Response(
+                {'detail': f"Send text/csv or application/x-ndjson, or pass ?type= with one of: {', '.join(FORMATS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if lines is None:
+            return Response({'detail': 'The request body is empty.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        importer = ProductImporter(
+            chunk_size=settings.INVENTORY_IMPORT_CHUNK_SIZE,
+            create_suppliers=request.query_params.get('create_suppliers') in ('1', 'true', 'True'),
+        )
+        report = importer.run(lines, fmt)
+        return Response(report.as_dict())
+
+    def perform_batch(self, creates, updates):
+        # Stock may have moved since validation; read and hold the current rows,
+        # so fields an item leaves alone are counted at their stored value
+        current = summary.stored_states((instance.pk for _, instance, _ in updates), lock=True)
+        old_states = []
+        for _, instance, data in updates:
+            old = current.get(instance.pk)
+            if old is not None:
+                for field, value in old._asdict().items():
+                    if field not in data:
+                        setattr(instance, field, value)
+            old_states.append(old)
+        created, updated = super().perform_batch(creates, updates)
+        deltas = summary.SummaryDeltas()
+        for product in created:
+            deltas.changed(None, summary.state_of(product))
+        for old, product in zip(old_states, updated):
+            # A product deleted in the meantime was not updated either
+            if old is not None:
+                deltas.changed(old, summary.state_of(product))
+        deltas.apply()
+        return created, updated
+
+    def batch_summary(self, created, updated):
+        payload = super().batch_summary(created, updated)
+        # Products that are now below their minimum and were not before
+        dropped = [product for product in created if product.quantity < product.min_stock]
+        dropped += [
+            product for product in updated
+            if product.previous('quantity') is not None and product.previous('quantity') >= product.min_stock > product.quantity
+        ]
+        payload['low_stock'] = [
+            {'product_id': product.pk, 'name': product.name, 'quantity': product.quantity, 'min_stock': product.min_stock}
+            for product in dropped
+        ]
+        return payload
+
+class OrderViewSet(BatchWriteMixin, ExportMixin, viewsets.ModelViewSet):
     queryset = Order.objects.all().select_related('product', 'user')
     serializer_class = OrderSerializer
     permission_classes = [AllowAny]  # Temporarily allow all
+    export_columns = [
+        ('id', 'id'),
+        ('date', 'date'),
+        ('status', 'status'),
+        ('product_id', 'product_id'),
+        ('product', 'product__name'),
+        ('user_id', 'user_id'),
+        ('username', 'user__username'),
+        ('quantity', 'quantity'),
+        ('unit_price', 'unit_price'),
+        ('total', 'line_total'),
+        ('updated_at', 'updated_at'),
+    ]
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -48,12 +185,73 @@ class OrderViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['get'])
     def stats(self, request):
-        total_orders = self.queryset.count()
-        pending_orders = self.queryset.filter(status='Pending').count()
-        delivered_orders = self.queryset.filter(status='Delivered').count()
+        """
+        Order count, units and revenue per status, optionally limited to
+        ``?start=``/``?end=`` dates, one ``?product=`` or one ``?category=``
+        """
+        try:
+            filters = StatsFilters.from_params(request.query_params)
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(order_stats(filters))
 
-        return Response({
-            'total_orders': total_orders,
-            'pending_orders': pending_orders,
-            'delivered_orders': delivered_orders
-        })
+    def perform_batch(self, creates, updates):
+        """Reserve the net stock change of the whole batch with one UPDATE per product"""
+        deltas = defaultdict(int)
+        items_by_product = defaultdict(list)
+
+        def add(index, hold, sign=1):
+            if hold is not None:
+                product_id, quantity = hold
+                deltas[product_id] += sign * quantity
+                items_by_product[product_id].append(index)
+
+        for index, data in creates:
+            data.setdefault('unit_price', data['product'].price)
+            add(index, stock.held(data['product'].pk, data['quantity'], data.get('status', 'Pending')))
+        for index, instance, data in updates:
+            if 'product' in data and data['product'].pk != instance.product_id:
+                data['unit_price'] = data['product'].price
+            add(index, stock.previous_hold(instance), sign=-1)
+            add(index, stock.held(
+                data.get('product', instance.product).pk,
+                data.get('quantity', instance.quantity),
+                data.get('status', instance.status)
+            ))
+
+        self.reservations = []
+        errors = {}
+        # A fixed order keeps concurrent batches from deadlocking on product rows
+        for product_id, delta in sorted(deltas.items()):
+            if delta > 0:
+                try:
+                    self.reservations.append(stock.reserve(product_id, delta, notify=False))
+                except stock.InsufficientStock as e:
+                    errors.update({index: {'quantity': [str(e)]} for index in items_by_product[product_id]})
+            elif delta < 0:
+                stock.release(product_id, -delta)
+        if errors:
+            raise BatchItemErrors(errors)
+
+        old_states = [rollups.previous_state(instance) or rollups.stored_state(instance) for _, instance, _ in updates]
+        created, updated = super().perform_batch(creates, updates)
+        deltas = rollups.RollupDeltas()
+        for order in created:
+            deltas.changed(None, rollups.state_of(order))
+        for old, order in zip(old_states, updated):
+            deltas.changed(old, rollups.state_of(order))
+        deltas.apply()
+        return created, updated
+
+    def batch_summary(self, created, updated):
+        payload = super().batch_summary(created, updated)
+        payload['names'] = [f"#{order.pk} {order.product.name}" for order in created[:5]]
+        payload['total'] = str(sum((order.total_price for order in created), 0))
+        payload['placed_by'] = sorted(Counter(order.user_id for order in created).items())
+        payload['updated_for'] = sorted(Counter(order.user_id for order in updated).items())
+        payload['low_stock'] = [
+            {'product_id': r.product_id, 'name': r.name, 'quantity': r.new_quantity, 'min_stock': r.min_stock}
+            for r in self.reservations
+            if r.old_quantity >= r.min_stock > r.new_quantity
+        ]
+        return payload
@@ -1,12 +1,14 @@
 from django.contrib import admin
-from .models import Notification, NotificationPreference
+from .models import Notification, NotificationPreference, NotificationEvent, EmailDelivery
 
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
-    list_display = ['title', 'recipient', 'notification_type', 'is_read', 'created_at']
+    list_display = ['display_title', 'recipient', 'notification_type', 'is_read', 'created_at']
     list_filter = ['notification_type', 'is_read', 'created_at']
-    search_fields = ['title', 'message', 'recipient__username', 'recipient__email']
+    search_fields = ['title', 'message', 'content__title', 'content__message', 'recipient__username', 'recipient__email']
     readonly_fields = ['created_at', 'updated_at']
+    list_select_related = ['recipient', 'content']
+    raw_id_fields = ['content']
     ordering = ['-created_at']
 
     fieldsets = (
@@ -14,7 +16,7 @@ class NotificationAdmin(admin.ModelAdmin):
             'fields': ('recipient', 'title', 'message', 'notification_type', 'is_read')
         }),
         ('Optional Fields', {
-            'fields': ('related_object_id', 'related_object_type', 'action_url', 'action_text', 'expires_at'),
+            'fields': ('content', 'related_object_id', 'related_object_type', 'action_url', 'action_text', 'expires_at'),
             'classes': ('collapse',)
         }),
         ('Timestamps', {
@@ -23,6 +25,10 @@ class NotificationAdmin(admin.ModelAdmin):
         }),
     )
 
+    @admin.display(description='Title')
+    def display_title(self, obj):
+        return obj.display('title')
+
 @admin.register(NotificationPreference)
 class NotificationPreferenceAdmin(admin.ModelAdmin):
     list_display = ['user', 'email_enabled', 'push_enabled', 'auto_delete_read_after_days']
@@ -48,3 +54,18 @@ class NotificationPreferenceAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+
+@admin.register(NotificationEvent)
+class NotificationEventAdmin(admin.ModelAdmin):
+    list_display = ['id', 'event_type', 'status', 'attempts', 'available_at', 'created_at']
+    list_filter = ['status', 'event_type']
+    readonly_fields = ['created_at']
+    ordering = ['id']
+
+@admin.register(EmailDelivery)
+class EmailDeliveryAdmin(admin.ModelAdmin):
+    list_display = ['id', 'recipient', 'notification_id', 'status', 'attempts', 'available_at', 'created_at']
+    list_filter = ['status']
+    raw_id_fields = ['recipient', 'notification']
+    readonly_fields = ['created_at']
+    ordering = ['id']
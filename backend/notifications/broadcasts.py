@@ -0,0 +1,57 @@
+"""
+Shared content for broadcast notifications.
+
+When one event sends the same text to many users, the title, message and
+action are written once as a NotificationContent row and every recipient's
+Notification keeps only a reference to it plus its own read state and
+timestamps, so a broadcast costs a few bytes per recipient.
+"""
+from collections import defaultdict
+from typing import Dict, List, Tuple
+from .models import Notification, NotificationContent
+
+# Content sent to fewer recipients than this stays inline on the row
+MIN_SHARED_RECIPIENTS = 2
+
+def content_key(notification: Notification) -> Tuple:
+    return tuple(getattr(notification, field) for field in NotificationContent.SHARED_FIELDS)
+
+def detach_fields(notification: Notification, content: NotificationContent):
+    """Point ``notification`` at ``content`` and drop its inline copy of the text"""
+    notification.content = content
+    notification.title = ''
+    notification.message = ''
+    notification.action_url = None
+    notification.action_text = None
+
+def create_contents(keys: List[Tuple]) -> List[NotificationContent]:
+    return NotificationContent.objects.bulk_create([
+        NotificationContent(**dict(zip(NotificationContent.SHARED_FIELDS, key))) for key in keys
+    ])
+
+def share_content(notifications: List[Notification]) -> List[Notification]:
+    """Move text repeated across unsaved notifications into shared content rows"""
+    groups: Dict[Tuple, List[Notification]] = defaultdict(list)
+    for notification in notifications:
+        if notification.content_id is None:
+            groups[content_key(notification)].append(notification)
+
+    shared = {key: rows for key, rows in groups.items() if len(rows) >= MIN_SHARED_RECIPIENTS}
+    if shared:
+        for content, rows in zip(create_contents(list(shared)), shared.values()):
+            for notification in rows:
+                detach_fields(notification, content)
+    return notifications
+
+def cleanup_orphaned_content(batch_size: int = 1000) -> int:
+    """Delete shared content no notification refers to any more"""
+    deleted = 0
+    while True:
+        ids = list(
+            NotificationContent.objects.filter(receipts__isnull=True)
+            .order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted
+        _, per_model = NotificationContent.objects.filter(id__in=ids, receipts__isnull=True).delete()
+        deleted += per_model.get(NotificationContent._meta.label, 0)
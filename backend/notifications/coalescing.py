@@ -0,0 +1,163 @@
+"""
+Coalescing and storm suppression for generated notifications.
+
+A notification about the same object, of the same type, for the same
+recipient within ``NOTIFICATION_COALESCE_WINDOW`` seconds does not add a row:
+the recipient's existing unread notification takes the newer title and
+message and its ``occurrences`` count goes up. Rows written together come
+from one event, so rows sharing a key there are distinct alerts (say a
+high-value and a critical alert about one order) and are never merged with
+each other; only the first of them folds into an existing notification.
+
+On top of that, a recipient receives at most ``NOTIFICATION_RATE_LIMIT`` new
+rows per ``NOTIFICATION_RATE_WINDOW`` seconds; anything beyond the cap is
+folded into one digest notification per recipient.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F
+from django.utils import timezone
+from .models import Notification, NotificationType
+from . import counters
+from .broadcasts import MIN_SHARED_RECIPIENTS, create_contents, share_content
+
+DIGEST_OBJECT_TYPE = 'notification_digest'
+
+CoalesceKey = Tuple[int, str, str, Optional[int]]
+
+def coalesce_key(notification: Notification) -> Optional[CoalesceKey]:
+    """Rows that are not about an object never coalesce"""
+    if not notification.related_object_type:
+        return None
+    return (
+        notification.recipient_id,
+        notification.notification_type,
+        notification.related_object_type,
+        notification.related_object_id,
+    )
+
+class NotificationCoalescer:
+    def __init__(
+        self,
+        window_seconds: Optional[int] = None,
+        rate_limit: Optional[int] = None,
+        rate_window_seconds: Optional[int] = None
+    ):
+        self.window = timedelta(seconds=(
+            settings.NOTIFICATION_COALESCE_WINDOW if window_seconds is None else window_seconds
+        ))
+        self.rate_limit = settings.NOTIFICATION_RATE_LIMIT if rate_limit is None else rate_limit
+        self.rate_window = timedelta(seconds=(
+            settings.NOTIFICATION_RATE_WINDOW if rate_window_seconds is None else rate_window_seconds
+        ))
+
+    def write(self, notifications: List[Notification]) -> List[Notification]:
+        """Insert, merge or suppress ``notifications``; returns the inserted rows"""
+        if not notifications:
+            return []
+        now = timezone.now()
+        with transaction.atomic():
+            pending = self._update_existing(notifications, now)
+            inserts, suppressed = self._apply_rate_limit(pending, now)
+            if suppressed:
+                digests = self._update_existing(self._digests(suppressed), now)
+                inserts.extend(digests)
+            return counters.create_notifications(share_content(inserts))
+
+    def _update_existing(self, notifications: List[Notification], now) -> List[Notification]:
+        """Fold rows into matching unread notifications; returns the rows left to insert"""
+        keyed = [n for n in notifications if coalesce_key(n) is not None]
+        if not self.window or not keyed:
+            return notifications
+
+        candidates = Notification.objects.filter(
+            recipient_id__in={n.recipient_id for n in keyed},
+            notification_type__in={n.notification_type for n in keyed},
+            related_object_type__in={n.related_object_type for n in keyed},
+            is_read=False,
+            created_at__gte=now - self.window,
+        ).values_list('id', 'recipient_id', 'notification_type', 'related_object_type', 'related_object_id')
+        existing: Dict[CoalesceKey, int] = {}
+        for notification_id, *key in candidates.order_by('id'):
+            existing[tuple(key)] = notification_id
+
+        # Rows carrying the same content (one event sent to many staff users)
+        # are merged with a single UPDATE and point at one shared content row
+        groups: Dict[tuple, List[int]] = defaultdict(list)
+        remaining = []
+        folded = set()
+        touched = counters.CounterDeltas()
+        for notification in notifications:
+            key = coalesce_key(notification)
+            notification_id = existing.get(key) if key is not None else None
+            if notification_id is None or key in folded:
+                remaining.append(notification)
+                continue
+            folded.add(key)
+            content = (
+                notification.title, notification.message, notification.action_url,
+                notification.action_text, notification.expires_at, notification.occurrences,
+            )
+            groups[content].append(notification_id)
+            touched.touch(notification.recipient_id)
+
+        shared_groups = [content for content, ids in groups.items() if len(ids) >= MIN_SHARED_RECIPIENTS]
+        shared = dict(zip(shared_groups, create_contents([content[:4] for content in shared_groups])))
+        for content, ids in groups.items():
+            title, message, action_url, action_text, expires_at, occurrences = content
+            if content in shared:
+                text = {'content': shared[content], 'title': '', 'message': '', 'action_url': None, 'action_text': None}
+            else:
+                text = {'content': None, 'title': title, 'message': message, 'action_url': action_url, 'action_text': action_text}
+            Notification.objects.filter(id__in=ids).update(
+                **text,
+                expires_at=expires_at,
+                occurrences=F('occurrences') + occurrences,
+                updated_at=now,
+            )
+        # Counts are unchanged, but delta-sync ETags and streams must see the edit
+        touched.apply()
+        return remaining
+
+    def _apply_rate_limit(self, notifications: List[Notification], now):
+        if not self.rate_limit:
+            return notifications, {}
+        recipient_ids = {n.recipient_id for n in notifications}
+        recent = dict(
+            Notification.objects.filter(
+                recipient_id__in=recipient_ids, created_at__gte=now - self.rate_window
+            ).exclude(related_object_type=DIGEST_OBJECT_TYPE)
+            .values('recipient_id').annotate(count=Count('id')).order_by()
+            .values_list('recipient_id', 'count')
+        )
+
+        inserts: List[Notification] = []
+        suppressed: Dict[int, int] = defaultdict(int)
+        for notification in notifications:
+            recipient_id = notification.recipient_id
+            if recent.get(recipient_id, 0) < self.rate_limit:
+                recent[recipient_id] = recent.get(recipient_id, 0) + 1
+                inserts.append(notification)
+            else:
+                suppressed[recipient_id] += notification.occurrences
+        return inserts, suppressed
+
+    def _digests(self, suppressed: Dict[int, int]) -> List[Notification]:
+        minutes = max(int(self.rate_window.total_seconds() // 60), 1)
+        return [
+            Notification(
+                recipient_id=recipient_id,
+                title="More notifications were grouped",
+                message=f"You received more than {self.rate_limit} notifications in the last {minutes} minutes. "
+                        f"Further updates have been grouped here; check the dashboard for the latest activity.",
+                notification_type=NotificationType.INFO,
+                related_object_type=DIGEST_OBJECT_TYPE,
+                action_url='/dashboard',
+                action_text='Open Dashboard',
+                occurrences=count,
+            )
+            for recipient_id, count in suppressed.items()
+        ]
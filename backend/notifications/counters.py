@@ -0,0 +1,308 @@
+"""
+Maintenance of the denormalized NotificationCounter rows.
+
+Every code path that inserts, deletes or flips ``is_read`` on notifications
+records the change here inside the same transaction. Counters cover every
+stored notification, expired or not; readers subtract expired rows only for
+users whose ``next_expiry`` has passed, until cleanup deletes those rows.
+"""
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, Count, F, Min, Q, Value, When
+from django.utils import timezone
+from .models import Notification, NotificationCounter, NotificationTombstone
+from .emails import queue_emails
+
+@dataclass
+class CounterDelta:
+    total: int = 0
+    unread: int = 0
+    by_type: Counter = field(default_factory=Counter)
+    next_expiry: Optional[datetime] = None
+
+    def add(self, notification_type: str, is_read: bool, sign: int = 1, expires_at: Optional[datetime] = None):
+        self.total += sign
+        self.by_type[notification_type] += sign
+        if not is_read:
+            self.unread += sign
+        if sign > 0 and expires_at is not None:
+            if self.next_expiry is None or expires_at < self.next_expiry:
+                self.next_expiry = expires_at
+
+    def signature(self):
+        return (
+            self.total,
+            self.unread,
+            tuple(sorted((t, n) for t, n in self.by_type.items() if n)),
+            self.next_expiry,
+        )
+
+class CounterDeltas:
+    """Accumulates counter changes per user and applies them in as few UPDATEs as possible"""
+
+    def __init__(self):
+        self._deltas: Dict[int, CounterDelta] = defaultdict(CounterDelta)
+        self._touched = set()
+
+    def added(self, notifications: Iterable[Notification]):
+        for notification in notifications:
+            self._deltas[notification.recipient_id].add(
+                notification.notification_type, notification.is_read, 1, notification.expires_at
+            )
+        return self
+
+    def removed(self, rows: Iterable[tuple]):
+        """``rows`` are ``(recipient_id, notification_type, is_read)`` tuples"""
+        for recipient_id, notification_type, is_read in rows:
+            self._deltas[recipient_id].add(notification_type, is_read, -1)
+        return self
+
+    def read_changed(self, recipient_id: int, delta: int):
+        """``delta`` is the change in the unread count (-n when n rows were marked read)"""
+        if delta:
+            self._deltas[recipient_id].unread += delta
+        return self
+
+    def touch(self, recipient_id: int):
+        """Bump ``updated_at`` even if no count changes (e.g. an edited title)"""
+        self._touched.add(recipient_id)
+        return self
+
+    def apply(self):
+        groups: Dict[tuple, List[int]] = defaultdict(list)
+        for user_id, delta in self._deltas.items():
+            signature = delta.signature()
+            if signature[:3] != (0, 0, ()) or signature[3] is not None or user_id in self._touched:
+                groups[signature].append(user_id)
+        for user_id in self._touched - set(self._deltas):
+            groups[CounterDelta().signature()].append(user_id)
+        self._deltas.clear()
+        self._touched.clear()
+
+        missing = []
+        for (total, unread, by_type, next_expiry), user_ids in groups.items():
+            updates = {'updated_at': timezone.now()}
+            if total:
+                updates['total_count'] = F('total_count') + total
+            if unread:
+                updates['unread_count'] = F('unread_count') + unread
+            for notification_type, count in by_type:
+                type_field = NotificationCounter.TYPE_FIELDS[notification_type]
+                updates[type_field] = F(type_field) + count
+            if next_expiry is not None:
+                updates['next_expiry'] = Case(
+                    When(Q(next_expiry__isnull=True) | Q(next_expiry__gt=next_expiry), then=Value(next_expiry)),
+                    default=F('next_expiry')
+                )
+            updated = NotificationCounter.objects.filter(user_id__in=user_ids).update(**updates)
+            if updated < len(user_ids):
+                existing = set(
+                    NotificationCounter.objects.filter(user_id__in=user_ids).values_list('user_id', flat=True)
+                )
+                missing.extend(user_id for user_id in user_ids if user_id not in existing)
+
+        if missing:
+            # Rows for these users were never created; computing them from the
+            # table already includes the change being recorded
+            rebuild_counters(missing)
+
+        changed = [user_id for user_ids in groups.values() for user_id in user_ids]
+        if changed:
+            invalidate_stats(changed)
+            # Again after commit, in case a reader cached the old counts meanwhile
+            transaction.on_commit(lambda: invalidate_stats(changed))
+
+def _conditional_counts(queryset):
+    """Total, unread and per-type counts for each recipient in one GROUP BY"""
+    return queryset.values('recipient_id').annotate(
+        total=Count('id'),
+        unread=Count('id', filter=Q(is_read=False)),
+        **{
+            type_field: Count('id', filter=Q(notification_type=notification_type))
+            for notification_type, type_field in NotificationCounter.TYPE_FIELDS.items()
+        }
+    ).order_by()
+
+def compute_counters(user_ids: Iterable[int]) -> Dict[int, NotificationCounter]:
+    """Build (unsaved) counters for ``user_ids`` from the notifications table"""
+    user_ids = list(user_ids)
+    counters = {user_id: NotificationCounter(user_id=user_id) for user_id in user_ids}
+
+    rows = _conditional_counts(Notification.objects.filter(recipient_id__in=user_ids)).annotate(
+        next_expiry=Min('expires_at')
+    )
+    for row in rows:
+        counter = counters[row['recipient_id']]
+        counter.total_count = row['total']
+        counter.unread_count = row['unread']
+        counter.next_expiry = row['next_expiry']
+        for type_field in NotificationCounter.TYPE_FIELDS.values():
+            setattr(counter, type_field, row[type_field])
+
+    return counters
+
+COUNTER_FIELDS = ['total_count', 'unread_count', 'next_expiry', *NotificationCounter.TYPE_FIELDS.values()]
+
+def rebuild_counters(user_ids: Iterable[int]) -> Dict[int, NotificationCounter]:
+    """Recompute and upsert the counters of ``user_ids``"""
+    counters = compute_counters(user_ids)
+    invalidate_stats(counters)
+    NotificationCounter.objects.bulk_create(
+        counters.values(),
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=COUNTER_FIELDS + ['updated_at'],
+    )
+    return counters
+
+def _expired_breakdown(user_ids: List[int], now) -> Dict[int, Dict]:
+    """Expired notifications still stored for ``user_ids``, per user and type"""
+    rows = _conditional_counts(Notification.objects.filter(recipient_id__in=user_ids, expires_at__lte=now))
+    return {
+        row['recipient_id']: {
+            'total': row['total'],
+            'unread': row['unread'],
+            'by_type': {
+                notification_type: row[type_field]
+                for notification_type, type_field in NotificationCounter.TYPE_FIELDS.items()
+            },
+        }
+        for row in rows
+    }
+
+def get_counter(user_id: int) -> NotificationCounter:
+    return _load_counters([user_id])[user_id]
+
+def _load_counters(user_ids: List[int]) -> Dict[int, NotificationCounter]:
+    counters = NotificationCounter.objects.in_bulk(user_ids)
+    missing = [user_id for user_id in user_ids if user_id not in counters]
+    if missing:
+        counters.update(rebuild_counters(missing))
+    return counters
+
+def _refresh_next_expiry(user_ids: List[int], now):
+    """Move next_expiry past rows that have already been cleaned up"""
+    upcoming = dict(
+        Notification.objects.filter(recipient_id__in=user_ids, expires_at__gt=now)
+        .values('recipient_id').annotate(next_expiry=Min('expires_at')).order_by()
+        .values_list('recipient_id', 'next_expiry')
+    )
+    for user_id in user_ids:
+        NotificationCounter.objects.filter(user_id=user_id, next_expiry__lte=now).update(
+            next_expiry=upcoming.get(user_id)
+        )
+
+def _stats_key(user_id: int) -> str:
+    return f'notifications:stats:{user_id}'
+
+def invalidate_stats(user_ids: Iterable[int]):
+    cache.delete_many([_stats_key(user_id) for user_id in user_ids])
+
+def counter_stats(user_id: int) -> Dict:
+    """
+    Total, unread, read and per-type counts of a user's active notifications,
+    cached for NOTIFICATION_STATS_CACHE_TIMEOUT seconds (never past the next expiry)
+    """
+    stats = cache.get(_stats_key(user_id))
+    if stats is not None:
+        return stats
+
+    now = timezone.now()
+    counter = _load_counters([user_id])[user_id]
+    total, unread, by_type = counter.total_count, counter.unread_count, counter.by_type()
+
+    if counter.next_expiry is not None and counter.next_expiry <= now:
+        expired = _expired_breakdown([user_id], now).get(user_id)
+        if expired is None:
+            _refresh_next_expiry([user_id], now)
+        else:
+            total -= expired['total']
+            unread -= expired['unread']
+            for notification_type, count in expired['by_type'].items():
+                by_type[notification_type] = by_type.get(notification_type, 0) - count
+            by_type = {t: n for t, n in by_type.items() if n > 0}
+
+    total, unread = max(total, 0), max(unread, 0)
+    stats = {
+        'total_count': total,
+        'unread_count': unread,
+        'read_count': total - unread,
+        'by_type': by_type,
+    }
+
+    timeout = settings.NOTIFICATION_STATS_CACHE_TIMEOUT
+    if counter.next_expiry is not None:
+        timeout = min(timeout, (counter.next_expiry - now).total_seconds())
+    if timeout > 0:
+        cache.set(_stats_key(user_id), stats, timeout)
+    return stats
+
+def unread_counts(user_ids: Iterable[int]) -> Dict[int, int]:
+    """Unread count of active notifications for each of ``user_ids``"""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
+    now = timezone.now()
+    counters = _load_counters(user_ids)
+    counts = {user_id: counters[user_id].unread_count for user_id in user_ids}
+
+    stale = [
+        user_id for user_id in user_ids
+        if counters[user_id].next_expiry is not None and counters[user_id].next_expiry <= now
+    ]
+    if stale:
+        expired = _expired_breakdown(stale, now)
+        for user_id, entry in expired.items():
+            counts[user_id] -= entry['unread']
+        cleaned = [user_id for user_id in stale if user_id not in expired]
+        if cleaned:
+            _refresh_next_expiry(cleaned, now)
+
+    return {user_id: max(count, 0) for user_id, count in counts.items()}
+
+def create_notifications(notifications: List[Notification]) -> List[Notification]:
+    """
+    Insert notifications, bump their recipients' counters and queue their
+    emails atomically
+    """
+    if not notifications:
+        return []
+    with transaction.atomic():
+        created = Notification.objects.bulk_create(notifications)
+        CounterDeltas().added(created).apply()
+        queue_emails(created)
+    return created
+
+def delete_notifications(queryset, chunk_size: int = 1000) -> int:
+    """
+    Delete the notifications in ``queryset``, decrement the counters and leave
+    tombstones for delta-sync clients
+    """
+    deleted = 0
+    with transaction.atomic():
+        rows = list(
+            queryset.select_for_update().order_by().values_list('id', 'recipient_id', 'notification_type', 'is_read')
+        )
+        for start in range(0, len(rows), chunk_size):
+            chunk = rows[start:start + chunk_size]
+            Notification.objects.filter(id__in=[row[0] for row in chunk]).delete()
+            NotificationTombstone.objects.bulk_create([
+                NotificationTombstone(notification_id=row[0], recipient_id=row[1]) for row in chunk
+            ])
+            deleted += len(chunk)
+        CounterDeltas().removed(row[1:] for row in rows).apply()
+    return deleted
+
+def set_read_state(user_id: int, queryset, is_read: bool, now=None) -> int:
+    """Flip ``is_read`` on the user's matching notifications and adjust the unread counter"""
+    with transaction.atomic():
+        updated = queryset.filter(recipient_id=user_id, is_read=not is_read).update(
+            is_read=is_read, updated_at=now or timezone.now()
+        )
+        CounterDeltas().read_changed(user_id, -updated if is_read else updated).apply()
+    return updated
@@ -0,0 +1,185 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Any, Callable, Dict, List
+from django.conf import settings
+from django.db import transaction, close_old_connections
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+from .models import NotificationEvent, NotificationEventStatus
+
+logger = logging.getLogger(__name__)
+
+_handlers: Dict[str, Callable[[Dict[str, Any]], None]] = {}
+
+_paused = 0
+_paused_lock = threading.Lock()
+
+def event_handler(event_type: str):
+    """Register the function that materializes notifications for ``event_type``"""
+    def register(func):
+        _handlers[event_type] = func
+        return func
+    return register
+
+def run_handler(event_type: str, payload: Dict[str, Any]):
+    handler = _handlers.get(event_type)
+    if handler is None:
+        raise LookupError(f"No notification handler registered for '{event_type}'")
+    handler(payload)
+
+def enqueue(event_type: str, payload: Dict[str, Any]):
+    """
+    Schedule the notifications for an event once the current transaction
+    commits. Nothing is written if the transaction rolls back.
+    """
+    if _paused:
+        return
+    transaction.on_commit(lambda: _publish(event_type, payload), robust=True)
+
+@contextmanager
+def paused():
+    """
+    Drop every event enqueued while active, in all threads of the process.
+    Meant for benchmarks and maintenance commands, never request handling.
+    """
+    global _paused
+    with _paused_lock:
+        _paused += 1
+    try:
+        yield
+    finally:
+        with _paused_lock:
+            _paused -= 1
+
+def _publish(event_type: str, payload: Dict[str, Any]):
+    if getattr(settings, 'NOTIFICATION_DISPATCH_MODE', 'queue') == 'inline':
+        try:
+            with transaction.atomic():
+                run_handler(event_type, payload)
+        except Exception as e:
+            logger.error(f"❌ Failed to dispatch '{event_type}' inline - Error: {str(e)}")
+        return
+
+    NotificationEvent.objects.create(event_type=event_type, payload=payload)
+
+def queue_metrics() -> Dict[str, Any]:
+    """Queue depth and lag (age of the oldest unfinished event) in one query"""
+    stats = NotificationEvent.objects.aggregate(
+        pending=Count('id', filter=Q(status=NotificationEventStatus.PENDING)),
+        processing=Count('id', filter=Q(status=NotificationEventStatus.PROCESSING)),
+        failed=Count('id', filter=Q(status=NotificationEventStatus.FAILED)),
+        oldest=Min('created_at', filter=~Q(status=NotificationEventStatus.FAILED)),
+    )
+    oldest = stats.pop('oldest')
+    stats['depth'] = stats['pending'] + stats['processing']
+    stats['lag_seconds'] = (timezone.now() - oldest).total_seconds() if oldest else 0.0
+    return stats
+
+class NotificationWorker:
+    """
+    Drains the NotificationEvent queue.
+
+    Each pass claims at most ``batch_size`` due events, leasing them for
+    ``lease_seconds`` so a crashed worker's events are picked up again, and
+    materializes them on a pool of ``concurrency`` threads. The worker never
+    holds more than one batch in memory, so a backlog simply waits in the
+    table. Failed events are retried with exponential backoff until
+    ``max_attempts`` is reached and are then parked as failed.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 100,
+        concurrency: int = 4,
+        max_attempts: int = 5,
+        lease_seconds: int = 300,
+        max_backoff_seconds: int = 300
+    ):
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.lease = timedelta(seconds=lease_seconds)
+        self.max_backoff_seconds = max_backoff_seconds
+        self.counters = {'processed': 0, 'retried': 0, 'failed': 0}
+        self._counter_lock = threading.Lock()
+
+    def _count(self, name: str):
+        with self._counter_lock:
+            self.counters[name] += 1
+
+    def claim(self) -> List[NotificationEvent]:
+        now = timezone.now()
+        with transaction.atomic():
+            events = list(
+                NotificationEvent.objects.select_for_update(skip_locked=True).filter(
+                    status__in=[NotificationEventStatus.PENDING, NotificationEventStatus.PROCESSING],
+                    available_at__lte=now
+                ).order_by('id')[:self.batch_size]
+            )
+            if events:
+                NotificationEvent.objects.filter(pk__in=[event.pk for event in events]).update(
+                    status=NotificationEventStatus.PROCESSING,
+                    available_at=now + self.lease,
+                    attempts=F('attempts') + 1
+                )
+        for event in events:
+            event.attempts += 1
+        return events
+
+    def process(self, event: NotificationEvent) -> bool:
+        try:
+            with transaction.atomic():
+                run_handler(event.event_type, event.payload)
+                NotificationEvent.objects.filter(pk=event.pk).delete()
+            self._count('processed')
+            return True
+        except Exception as e:
+            # Drop this thread's connection if the failure left it unusable
+            close_old_connections()
+            self._record_failure(event, e)
+            return False
+
+    def _record_failure(self, event: NotificationEvent, error: Exception):
+        if event.attempts >= self.max_attempts:
+            status, available_at = NotificationEventStatus.FAILED, timezone.now()
+            self._count('failed')
+            logger.error(f"❌ Notification event #{event.pk} ({event.event_type}) failed permanently: {error}")
+        else:
+            delay = min(2 ** event.attempts, self.max_backoff_seconds)
+            status, available_at = NotificationEventStatus.PENDING, timezone.now() + timedelta(seconds=delay)
+            self._count('retried')
+            logger.warning(f"⚠️ Notification event #{event.pk} ({event.event_type}) failed, retrying in {delay}s: {error}")
+
+        NotificationEvent.objects.filter(pk=event.pk).update(
+            status=status,
+            available_at=available_at,
+            last_error=str(error)
+        )
+
+    def run_once(self, executor: ThreadPoolExecutor = None) -> int:
+        """Claim and process one batch; returns the number of events claimed"""
+        events = self.claim()
+        if not events:
+            return 0
+        if executor is None:
+            for event in events:
+                self.process(event)
+        else:
+            list(executor.map(self.process, events))
+        return len(events)
+
+    def run(self, poll_interval: float = 1.0, stop_when_empty: bool = False, on_batch=None):
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='notification-worker') as executor:
+            while True:
+                claimed = self.run_once(executor if self.concurrency > 1 else None)
+                if claimed:
+                    if on_batch is not None:
+                        on_batch(claimed)
+                elif stop_when_empty:
+                    return
+                else:
+                    time.sleep(poll_interval)
@@ -0,0 +1,206 @@
+"""
+Email delivery for notifications.
+
+Creating notifications only inserts EmailDelivery rows for recipients whose
+``email_*`` preferences accept the type; no mail is sent in the request,
+signal or notification-worker path. ``send_notification_emails`` claims due
+rows in batches, folds each recipient's rows into one digest message and
+sends the whole batch over a single backend connection. Failed digests are
+retried with exponential backoff and parked as failed after ``max_attempts``.
+"""
+import logging
+import time
+from collections import defaultdict
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import EmailDelivery, EmailDeliveryStatus, Notification
+from .preferences import EMAIL, allowed, preference_cache
+
+User = get_user_model()
+logger = logging.getLogger(__name__)
+
+def queue_emails(notifications: List[Notification]) -> int:
+    """Queue an email for each new notification whose recipient wants it by email"""
+    if not notifications:
+        return 0
+    masks = preference_cache.masks({n.recipient_id for n in notifications}, EMAIL)
+    available_at = timezone.now() + timedelta(seconds=settings.NOTIFICATION_EMAIL_DIGEST_DELAY)
+    deliveries = [
+        EmailDelivery(recipient_id=n.recipient_id, notification_id=n.pk, available_at=available_at)
+        for n in notifications
+        if allowed(masks[n.recipient_id], n.notification_type)
+    ]
+    EmailDelivery.objects.bulk_create(deliveries)
+    return len(deliveries)
+
+def render_digest(user, notifications: List[Notification]) -> EmailMessage:
+    """One plain-text message covering all of ``notifications``"""
+    if len(notifications) == 1:
+        subject = notifications[0].display('title')
+    else:
+        subject = f"You have {len(notifications)} new notifications"
+
+    sections = []
+    for notification in notifications:
+        lines = [notification.display('title'), notification.display('message')]
+        action_url = notification.display('action_url')
+        if action_url:
+            link = action_url if '://' in action_url else f"{settings.FRONTEND_URL}{action_url}"
+            lines.append(f"{notification.display('action_text') or 'Open'}: {link}")
+        sections.append('\n'.join(lines))
+
+    greeting = f"Hi {user.first_name or user.username},"
+    body = '\n\n'.join([greeting, *sections, "You can change which emails you receive under Profile → Notification Settings."])
+    return EmailMessage(
+        subject=f"{settings.EMAIL_SUBJECT_PREFIX}{subject}",
+        body=body,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[user.email],
+    )
+
+class EmailSender:
+    """Drains the EmailDelivery queue in digest batches"""
+
+    def __init__(
+        self,
+        batch_size: int = 200,
+        max_attempts: int = 5,
+        lease_seconds: int = 300,
+        max_backoff_seconds: int = 3600,
+        backend: Optional[str] = None,
+        recipient_ids: Optional[Iterable[int]] = None
+    ):
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.lease = timedelta(seconds=lease_seconds)
+        self.max_backoff_seconds = max_backoff_seconds
+        self.backend = backend
+        # Only these recipients' deliveries are claimed; None claims everyone's
+        self.recipient_ids = None if recipient_ids is None else list(recipient_ids)
+        self.counters = {'sent': 0, 'messages': 0, 'retried': 0, 'failed': 0, 'dropped': 0}
+
+    def claim(self) -> List[EmailDelivery]:
+        """
+        Lease up to ``batch_size`` due deliveries, plus up to as many more
+        belonging to the same recipients so each gets one digest
+        """
+        now = timezone.now()
+        due = EmailDelivery.objects.filter(
+            status__in=[EmailDeliveryStatus.PENDING, EmailDeliveryStatus.SENDING],
+            available_at__lte=now
+        )
+        if self.recipient_ids is not None:
+            due = due.filter(recipient_id__in=self.recipient_ids)
+        with transaction.atomic():
+            deliveries = list(due.select_for_update(skip_locked=True).order_by('id')[:self.batch_size])
+            recipient_ids = {delivery.recipient_id for delivery in deliveries}
+            claimed_ids = {delivery.pk for delivery in deliveries}
+            deliveries.extend(
+                due.select_for_update(skip_locked=True)
+                .filter(recipient_id__in=recipient_ids).exclude(pk__in=claimed_ids)
+                .order_by('id')[:self.batch_size]
+            )
+            if deliveries:
+                EmailDelivery.objects.filter(pk__in=[delivery.pk for delivery in deliveries]).update(
+                    status=EmailDeliveryStatus.SENDING,
+                    available_at=now + self.lease,
+                    attempts=F('attempts') + 1
+                )
+        for delivery in deliveries:
+            delivery.attempts += 1
+        return deliveries
+
+    def run_once(self) -> int:
+        """Claim and send one batch; returns the number of deliveries claimed"""
+        deliveries = self.claim()
+        if not deliveries:
+            return 0
+
+        notifications = Notification.objects.select_related('content').in_bulk(
+            [delivery.notification_id for delivery in deliveries]
+        )
+        users = User.objects.in_bulk({delivery.recipient_id for delivery in deliveries})
+
+        by_recipient: Dict[int, List[EmailDelivery]] = defaultdict(list)
+        dropped = []
+        for delivery in deliveries:
+            user = users.get(delivery.recipient_id)
+            if delivery.notification_id not in notifications or user is None or not user.email:
+                # The notification was deleted, or there is nowhere to send it
+                dropped.append(delivery.pk)
+            else:
+                by_recipient[delivery.recipient_id].append(delivery)
+        if dropped:
+            EmailDelivery.objects.filter(pk__in=dropped).delete()
+            self.counters['dropped'] += len(dropped)
+
+        sent, failed = [], []
+        connection = get_connection(self.backend)
+        try:
+            connection.open()
+            for recipient_id, recipient_deliveries in by_recipient.items():
+                message = render_digest(
+                    users[recipient_id],
+                    [notifications[delivery.notification_id] for delivery in recipient_deliveries]
+                )
+                try:
+                    connection.send_messages([message])
+                    sent.extend(recipient_deliveries)
+                    self.counters['messages'] += 1
+                except Exception as e:
+                    failed.append((recipient_deliveries, e))
+        except Exception as e:
+            # Could not reach the mail server at all; everything not sent is retried
+            done = {delivery.pk for delivery in sent}
+            done.update(delivery.pk for failed_deliveries, _ in failed for delivery in failed_deliveries)
+            unsent = [
+                delivery for recipient_deliveries in by_recipient.values()
+                for delivery in recipient_deliveries if delivery.pk not in done
+            ]
+            failed.append((unsent, e))
+        finally:
+            connection.close()
+
+        if sent:
+            EmailDelivery.objects.filter(pk__in=[delivery.pk for delivery in sent]).delete()
+            self.counters['sent'] += len(sent)
+        for failed_deliveries, error in failed:
+            self._record_failure(failed_deliveries, error)
+        return len(deliveries)
+
+    def _record_failure(self, deliveries: List[EmailDelivery], error: Exception):
+        if not deliveries:
+            return
+        attempts = max(delivery.attempts for delivery in deliveries)
+        if attempts >= self.max_attempts:
+            status, available_at = EmailDeliveryStatus.FAILED, timezone.now()
+            self.counters['failed'] += len(deliveries)
+            logger.error(f"❌ Notification email to user {deliveries[0].recipient_id} failed permanently: {error}")
+        else:
+            delay = min(2 ** attempts * 30, self.max_backoff_seconds)
+            status, available_at = EmailDeliveryStatus.PENDING, timezone.now() + timedelta(seconds=delay)
+            self.counters['retried'] += len(deliveries)
+            logger.warning(f"⚠️ Notification email to user {deliveries[0].recipient_id} failed, retrying in {delay}s: {error}")
+
+        EmailDelivery.objects.filter(pk__in=[delivery.pk for delivery in deliveries]).update(
+            status=status,
+            available_at=available_at,
+            last_error=str(error)
+        )
+
+    def run(self, poll_interval: float = 5.0, stop_when_empty: bool = False, on_batch=None):
+        while True:
+            claimed = self.run_once()
+            if claimed:
+                if on_batch is not None:
+                    on_batch(claimed)
+            elif stop_when_empty:
+                return
+            else:
+                time.sleep(poll_interval)
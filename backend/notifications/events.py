@@ -0,0 +1,374 @@
+"""
+Notification handlers for queued events.
+
+Signal receivers only capture a compact payload and enqueue it after commit
+(see ``dispatch.enqueue``); the functions here turn those payloads into
+notification rows, either in the ``notification_worker`` process or inline.
+"""
+from decimal import Decimal
+import logging
+from .dispatch import event_handler
+from .models import NotificationType
+from .services import NotificationFanOut
+
+logger = logging.getLogger(__name__)
+
+STAFF_ROLES = ('Admin', 'Manager')
+ADMIN_ROLES = ('Admin',)
+
+@event_handler('user_created')
+def user_created(payload):
+    """Welcome the new user and tell admins about them"""
+    fan_out = NotificationFanOut()
+    fan_out.add(
+        [payload['user_id']],
+        title="Welcome to InvAI! 🎉",
+        message=f"Welcome {payload['first_name'] or payload['username']}! Your inventory management account is ready. Explore the dashboard to get started.",
+        notification_type=NotificationType.SUCCESS,
+        action_url='/dashboard',
+        action_text='Get Started'
+    )
+
+    # Notify admins about new user
+    admin_ids = fan_out.recipients(ADMIN_ROLES, exclude=[payload['user_id']])
+    logger.info(f"📢 Notifying {len(admin_ids)} admins about new user")
+    fan_out.add(
+        admin_ids,
+        title="New User Registered",
+        message=f"New user '{payload['username']}' ({payload['email']}) has joined the system.",
+        notification_type=NotificationType.USER_ACTION,
+        action_url='/dashboard/users',
+        action_text='Manage Users'
+    )
+    fan_out.send()
+
+@event_handler('product_created')
+def product_created(payload):
+    """Notify all admin/manager users about a new product"""
+    fan_out = NotificationFanOut()
+    fan_out.add(
+        fan_out.recipients(STAFF_ROLES),
+        title="New Product Added",
+        message=f"New product '{payload['name']}' has been added to inventory with {payload['quantity']} units in stock.",
+        notification_type=NotificationType.SUCCESS,
+        related_object_id=payload['product_id'],
+        related_object_type='product',
+        action_url='/dashboard/products',
+        action_text='View Products'
+    )
+    fan_out.send()
+
+@event_handler('stock_changed')
+def stock_changed(payload):
+    """Alert admins/managers when a product's stock dropped past a threshold"""
+    name = payload['name']
+    old_quantity = payload['old_quantity']
+    new_quantity = payload['new_quantity']
+    min_stock = payload['min_stock']
+    fan_out = NotificationFanOut()
+
+    # Stock decreased significantly (by 20% or more)
+    if new_quantity < old_quantity * 0.8:
+        fan_out.add(
+            fan_out.recipients(STAFF_ROLES),
+            title="Stock Level Decreased",
+            message=f"Stock for '{name}' decreased from {old_quantity} to {new_quantity} units.",
+            notification_type=NotificationType.WARNING,
+            related_object_id=payload['product_id'],
+            related_object_type='product',
+            action_url='/dashboard/products',
+            action_text='Check Product'
+        )
+
+    # Check if we crossed into low stock territory
+    if old_quantity >= min_stock and new_quantity < min_stock:
+        fan_out.add(
+            fan_out.recipients(STAFF_ROLES),
+            title="Low Stock Alert",
+            message=f"'{name}' is running low! Current stock: {new_quantity}, minimum required: {min_stock}",
+            notification_type=NotificationType.INVENTORY_LOW,
+            related_object_id=payload['product_id'],
+            related_object_type='product',
+            action_url='/dashboard/products',
+            action_text='Reorder Now'
+        )
+
+    # Critical stock level (below 5 units) - separate check, not elif
+    if new_quantity <= 5 and old_quantity > 5:
+        fan_out.add(
+            fan_out.recipients(STAFF_ROLES),
+            title="CRITICAL: Stock Almost Empty",
+            message=f"URGENT: '{name}' has only {new_quantity} units left! Immediate reordering required.",
+            notification_type=NotificationType.ERROR,
+            related_object_id=payload['product_id'],
+            related_object_type='product',
+            action_url='/dashboard/products',
+            action_text='Emergency Reorder'
+        )
+
+    fan_out.send()
+
+@event_handler('order_created')
+def order_created(payload):
+    """Confirm the order to the customer and alert admins/managers"""
+    order_id = payload['order_id']
+    username = payload['username']
+    product_name = payload['product_name']
+    quantity = payload['quantity']
+    order_total = Decimal(payload['total'])
+    fan_out = NotificationFanOut()
+
+    # New order created - notify customer
+    fan_out.add(
+        [payload['user_id']],
+        title="Order Placed Successfully",
+        message=f"Your order for {quantity}x '{product_name}' has been placed successfully.",
+        notification_type=NotificationType.SUCCESS,
+        related_object_id=order_id,
+        related_object_type='order',
+        action_url='/dashboard/orders',
+        action_text='Track Order'
+    )
+
+    # Notify admins about new order
+    staff_ids = fan_out.recipients(STAFF_ROLES)
+    logger.info(f"📢 Notifying {len(staff_ids)} admin/manager users about new order")
+
+    fan_out.add(
+        staff_ids,
+        title="New Order Received",
+        message=f"New order #{order_id} for {quantity}x '{product_name}' from {username} (Total: ${order_total:.2f})",
+        notification_type=NotificationType.ORDER_STATUS,
+        related_object_id=order_id,
+        related_object_type='order',
+        action_url='/dashboard/orders',
+        action_text='Process Order'
+    )
+
+    # High-value order notification (orders over $1000)
+    if order_total >= 1000:
+        logger.info(f"🎉 High-value order detected: ${order_total:.2f}")
+        fan_out.add(
+            staff_ids,
+            title="🎉 High-Value Order Alert!",
+            message=f"Excellent! Order #{order_id} worth ${order_total:.2f} has been placed by {username} for {quantity}x '{product_name}'. This is a significant revenue opportunity!",
+            notification_type=NotificationType.ORDER_HIGH_VALUE,
+            related_object_id=order_id,
+            related_object_type='order',
+            action_url='/dashboard/orders',
+            action_text='View Order Details'
+        )
+
+    # Very high-value order notification (orders over $5000) - additional alert
+    if order_total >= 5000:
+        logger.info(f"🚀 MAJOR order detected: ${order_total:.2f}")
+        fan_out.add(
+            fan_out.recipients(ADMIN_ROLES),
+            title="🚀 MAJOR ORDER ALERT - Immediate Attention Required!",
+            message=f"CRITICAL: Exceptional order #{order_id} worth ${order_total:.2f} from {username}! This order requires priority processing and verification. Product: {quantity}x '{product_name}'.",
+            notification_type=NotificationType.SUCCESS,
+            related_object_id=order_id,
+            related_object_type='order',
+            action_url='/dashboard/orders',
+            action_text='Priority Processing'
+        )
+
+    fan_out.send()
+
+@event_handler('order_status_changed')
+def order_status_changed(payload):
+    """Tell the customer about the new status; alert staff on cancellation"""
+    order_id = payload['order_id']
+    status = payload['status']
+    username = payload['username']
+    product_name = payload['product_name']
+    quantity = payload['quantity']
+    fan_out = NotificationFanOut()
+
+    # Notify the customer about status change
+    fan_out.add(
+        [payload['user_id']],
+        title=f"Order {status}",
+        message=f"Your order #{order_id} for '{product_name}' is now {status.lower()}.",
+        notification_type=NotificationType.ORDER_STATUS,
+        related_object_id=order_id,
+        related_object_type='order',
+        action_url='/dashboard/orders',
+        action_text='View Order'
+    )
+
+    # Special notification for delivered orders
+    if status == 'Delivered':
+        fan_out.add(
+            [payload['user_id']],
+            title="Order Delivered! 🎉",
+            message=f"Your order #{order_id} for '{product_name}' has been delivered successfully. Thank you for your business!",
+            notification_type=NotificationType.SUCCESS,
+            related_object_id=order_id,
+            related_object_type='order',
+            action_url='/dashboard/orders',
+            action_text='Leave Review'
+        )
+
+    # Alert admins/managers when order is cancelled
+    elif status == 'Cancelled':
+        order_total = Decimal(payload['total'])
+        staff_ids = fan_out.recipients(STAFF_ROLES)
+
+        fan_out.add(
+            staff_ids,
+            title="⚠️ Order Cancelled",
+            message=f"Order #{order_id} for {quantity}x '{product_name}' from {username} (Total: ${order_total:.2f}) has been cancelled.",
+            notification_type=NotificationType.WARNING,
+            related_object_id=order_id,
+            related_object_type='order',
+            action_url='/dashboard/orders',
+            action_text='View Order'
+        )
+
+        # High-value order cancellation alert
+        if order_total >= 1000:
+            fan_out.add(
+                staff_ids,
+                title="🚨 High-Value Order Cancelled!",
+                message=f"ALERT: A high-value order #{order_id} worth ${order_total:.2f} from {username} has been cancelled! This represents lost revenue. Product: {quantity}x '{product_name}'.",
+                notification_type=NotificationType.ERROR,
+                related_object_id=order_id,
+                related_object_type='order',
+                action_url='/dashboard/orders',
+                action_text='Investigate'
+            )
+
+    fan_out.send()
+
+@event_handler('order_deleted')
+def order_deleted(payload):
+    """Alert admins/managers about a deleted order"""
+    order_id = payload['order_id']
+    username = payload['username']
+    product_name = payload['product_name']
+    quantity = payload['quantity']
+    order_total = Decimal(payload['total'])
+    fan_out = NotificationFanOut()
+
+    # Notify admins and managers about order deletion
+    staff_ids = fan_out.recipients(STAFF_ROLES)
+    logger.info(f"📢 Notifying {len(staff_ids)} admin/manager users about order deletion")
+
+    fan_out.add(
+        staff_ids,
+        title="⚠️ Order Deleted",
+        message=f"Order #{order_id} for {quantity}x '{product_name}' from {username} (Total: ${order_total:.2f}) has been deleted from the system.",
+        notification_type=NotificationType.WARNING,
+        related_object_id=order_id,
+        related_object_type='order',
+        action_url='/dashboard/orders',
+        action_text='View Orders'
+    )
+
+    # Special alert for high-value order deletions
+    if order_total >= 1000:
+        logger.info(f"🚨 High-value order deletion detected: ${order_total:.2f}")
+        fan_out.add(
+            staff_ids,
+            title="🚨 HIGH-VALUE Order Deleted!",
+            message=f"ALERT: A high-value order #{order_id} worth ${order_total:.2f} from {username} has been deleted! This represents significant lost revenue. Product: {quantity}x '{product_name}'.",
+            notification_type=NotificationType.ERROR,
+            related_object_id=order_id,
+            related_object_type='order',
+            action_url='/dashboard/orders',
+            action_text='Investigate'
+        )
+
+    # Critical alert for very high-value order deletions (Admin only)
+    if order_total >= 5000:
+        logger.info(f"🔴 CRITICAL order deletion detected: ${order_total:.2f}")
+        fan_out.add(
+            fan_out.recipients(ADMIN_ROLES),
+            title="🔴 CRITICAL: Major Order Deleted!",
+            message=f"URGENT: A major order #{order_id} worth ${order_total:.2f} has been deleted! This is a critical revenue loss of ${order_total:.2f}. Customer: {username}, Product: {quantity}x '{product_name}'. Immediate investigation required!",
+            notification_type=NotificationType.ERROR,
+            related_object_id=order_id,
+            related_object_type='order',
+            action_url='/dashboard/orders',
+            action_text='Urgent Review'
+        )
+
+    fan_out.send()
+
+BATCH_LABELS = {
+    'product': ('product', 'products', '/dashboard/products'),
+    'supplier': ('supplier', 'suppliers', '/dashboard/suppliers'),
+    'order': ('order', 'orders', '/dashboard/orders'),
+}
+
+@event_handler('inventory_batch')
+def inventory_batch(payload):
+    """One summary for a whole /batch/ write instead of one notification per row"""
+    singular, plural, url = BATCH_LABELS[payload['resource']]
+    created = payload['created']
+    updated = payload['updated']
+    fan_out = NotificationFanOut()
+    staff_ids = fan_out.recipients(STAFF_ROLES)
+
+    def count(n):
+        return f"{n} {singular if n == 1 else plural}"
+
+    parts = []
+    if created:
+        parts.append(f"{count(created)} added")
+    if updated:
+        parts.append(f"{count(updated)} updated")
+    message = f"Batch import: {' and '.join(parts)}."
+    if payload['names']:
+        more = f" and {created - len(payload['names'])} more" if created > len(payload['names']) else ""
+        message += f" New: {', '.join(payload['names'])}{more}."
+    if payload.get('total') and created:
+        message += f" Total value: ${Decimal(payload['total']):.2f}."
+    logger.info(f"📢 Notifying {len(staff_ids)} admin/manager users about a {singular} batch")
+
+    fan_out.add(
+        staff_ids,
+        title=f"Bulk {singular.capitalize()} Import",
+        message=message,
+        notification_type=NotificationType.ORDER_STATUS if singular == 'order' else NotificationType.INFO,
+        action_url=url,
+        action_text=f'View {plural.capitalize()}'
+    )
+
+    # Each customer hears about their own orders once
+    for user_id, placed in payload.get('placed_by', []):
+        fan_out.add(
+            [user_id],
+            title="Orders Placed Successfully",
+            message=f"{count(placed).capitalize()} placed successfully.",
+            notification_type=NotificationType.SUCCESS,
+            action_url='/dashboard/orders',
+            action_text='Track Orders'
+        )
+    for user_id, changed in payload.get('updated_for', []):
+        fan_out.add(
+            [user_id],
+            title="Orders Updated",
+            message=f"{count(changed).capitalize()} of yours {'was' if changed == 1 else 'were'} updated.",
+            notification_type=NotificationType.ORDER_STATUS,
+            action_url='/dashboard/orders',
+            action_text='View Orders'
+        )
+
+    low_stock = payload.get('low_stock', [])
+    if low_stock:
+        # Large imports only carry the first few products and a total
+        total = payload.get('low_stock_total', len(low_stock))
+        names = ', '.join(f"'{item['name']}' ({item['quantity']}/{item['min_stock']})" for item in low_stock[:5])
+        more = f" and {total - len(low_stock[:5])} more" if total > 5 else ""
+        fan_out.add(
+            staff_ids,
+            title="Low Stock Alert",
+            message=f"{total} {'product is' if total == 1 else 'products are'} below minimum stock: {names}{more}",
+            notification_type=NotificationType.INVENTORY_LOW,
+            action_url='/dashboard/products',
+            action_text='Reorder Now'
+        )
+
+    fan_out.send()
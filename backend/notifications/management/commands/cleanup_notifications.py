@@ -1,4 +1,6 @@
 from django.core.management.base import BaseCommand
+from notifications import retention
+from notifications.retention import RetentionEngine
 from notifications.services import NotificationService
 
 class Command(BaseCommand):
@@ -14,30 +16,57 @@ class Command(BaseCommand):
             '--days',
             type=int,
             default=30,
-            help='Delete read notifications older than X days (default: 30)',
+            help='Delete read notifications older than X days for users without preferences (default: 30)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Notifications deleted per transaction (default: 1000)',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=0.1,
+            help='Seconds to pause between batches (default: 0.1)',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Ignore the checkpoint of an interrupted run and scan from the start',
         )
 
     def handle(self, *args, **options):
-        expired_only = options['expired_only']
-        days = options['days']
+        engine = RetentionEngine(
+            batch_size=options['batch_size'],
+            sleep_seconds=options['sleep'],
+            default_read_days=options['days'],
+            resume=not options['restart'],
+            on_batch=self.report_batch if options['verbosity'] > 1 else None,
+        )
 
-        if expired_only:
-            # Only clean up expired notifications
-            deleted_count = NotificationService.cleanup_expired_notifications()
+        policies = [retention.EXPIRED] if options['expired_only'] else [retention.EXPIRED, retention.READ]
+        total_deleted = 0
+        for policy in policies:
+            report = engine.run(policy)
+            total_deleted += report.deleted
+            resumed = f', resumed after #{report.resumed_from}' if report.resumed_from else ''
             self.stdout.write(
-                self.style.SUCCESS(f'Deleted {deleted_count} expired notifications')
+                f'  - {report.deleted} {policy} notifications in {report.batches} batches, '
+                f'{report.elapsed:.1f}s ({report.rows_per_second:.0f} rows/s{resumed})'
             )
-        else:
-            # Clean up both expired and old read notifications
-            expired_count = NotificationService.cleanup_expired_notifications()
-            old_read_count = NotificationService.cleanup_old_read_notifications(days)
 
-            total_deleted = expired_count + old_read_count
+        if not options['expired_only']:
+            tombstone_count = NotificationService.cleanup_tombstones()
+            self.stdout.write(f'  - {tombstone_count} sync tombstones past retention')
 
-            self.stdout.write(
-                self.style.SUCCESS(
-                    f'Cleaned up {total_deleted} notifications:\n'
-                    f'  - {expired_count} expired notifications\n'
-                    f'  - {old_read_count} old read notifications (older than {days} days)'
-                )
-            )
\ No newline at end of file
+        content_count = NotificationService.cleanup_orphaned_content(options['batch_size'])
+        self.stdout.write(f'  - {content_count} unreferenced broadcast contents')
+
+        self.stdout.write(self.style.SUCCESS(f'Cleaned up {total_deleted} notifications'))
+
+    def report_batch(self, report):
+        self.stdout.write(
+            f'    {report.policy}: {report.deleted} deleted after {report.batches} batches '
+            f'({report.rows_per_second:.0f} rows/s)'
+        )
@@ -0,0 +1,93 @@
+import time
+from django.core.management.base import BaseCommand
+from notifications.dispatch import NotificationWorker, queue_metrics
+
+class Command(BaseCommand):
+    help = 'Materialize queued notification events in the background'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Maximum number of events claimed per pass (default: 100)',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=4,
+            help='Number of threads materializing events (default: 4)',
+        )
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            default=5,
+            help='Attempts before an event is marked as failed (default: 5)',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=1.0,
+            help='Seconds to wait when the queue is empty (default: 1.0)',
+        )
+        parser.add_argument(
+            '--metrics-interval',
+            type=float,
+            default=60.0,
+            help='Seconds between queue depth/lag reports (default: 60)',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Drain the queue and exit instead of polling forever',
+        )
+        parser.add_argument(
+            '--stats',
+            action='store_true',
+            help='Print queue depth and lag and exit',
+        )
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self._report()
+            return
+
+        worker = NotificationWorker(
+            batch_size=options['batch_size'],
+            concurrency=options['concurrency'],
+            max_attempts=options['max_attempts'],
+        )
+        metrics_interval = options['metrics_interval']
+        last_report = time.monotonic()
+
+        def on_batch(claimed):
+            nonlocal last_report
+            if time.monotonic() - last_report >= metrics_interval:
+                self._report(worker)
+                last_report = time.monotonic()
+
+        self.stdout.write(self.style.SUCCESS('Notification worker started'))
+        try:
+            worker.run(
+                poll_interval=options['poll_interval'],
+                stop_when_empty=options['once'],
+                on_batch=on_batch,
+            )
+        except KeyboardInterrupt:
+            pass
+        self._report(worker)
+
+    def _report(self, worker=None):
+        metrics = queue_metrics()
+        line = (
+            f"Queue depth: {metrics['depth']} "
+            f"(pending {metrics['pending']}, processing {metrics['processing']}), "
+            f"failed: {metrics['failed']}, lag: {metrics['lag_seconds']:.1f}s"
+        )
+        if worker is not None:
+            counters = worker.counters
+            line += (
+                f" | processed {counters['processed']}, "
+                f"retried {counters['retried']}, failed {counters['failed']}"
+            )
+        self.stdout.write(line)
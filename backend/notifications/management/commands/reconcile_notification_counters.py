@@ -0,0 +1,76 @@
+from django.core.management.base import BaseCommand
+from django.contrib.auth import get_user_model
+from notifications.counters import COUNTER_FIELDS, compute_counters
+from notifications.models import NotificationCounter
+
+User = get_user_model()
+
+class Command(BaseCommand):
+    help = 'Recompute notification counters and repair any that drifted'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user-id',
+            type=int,
+            help='Only reconcile this user',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Users checked per batch (default: 1000)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drift without writing fixes',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        dry_run = options['dry_run']
+
+        users = User.objects.order_by('id').values_list('id', flat=True)
+        if options.get('user_id'):
+            users = users.filter(id=options['user_id'])
+
+        checked = repaired = 0
+        last_id = 0
+        while True:
+            batch = list(users.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            last_id = batch[-1]
+
+            expected = compute_counters(batch)
+            current = NotificationCounter.objects.in_bulk(batch)
+            drifted = [
+                counter for user_id, counter in expected.items()
+                if user_id not in current or any(
+                    getattr(counter, field) != getattr(current[user_id], field)
+                    for field in COUNTER_FIELDS
+                )
+            ]
+            for counter in drifted:
+                before = current.get(counter.user_id)
+                self.stdout.write(
+                    f'User {counter.user_id}: '
+                    f'{"missing" if before is None else f"{before.unread_count}/{before.total_count}"}'
+                    f' -> {counter.unread_count}/{counter.total_count} (unread/total)'
+                )
+
+            if drifted and not dry_run:
+                NotificationCounter.objects.bulk_create(
+                    drifted,
+                    update_conflicts=True,
+                    unique_fields=['user'],
+                    update_fields=COUNTER_FIELDS + ['updated_at'],
+                )
+
+            checked += len(batch)
+            repaired += len(drifted)
+
+        verb = 'would repair' if dry_run else 'repaired'
+        self.stdout.write(
+            self.style.SUCCESS(f'Checked {checked} users, {verb} {repaired} counters')
+        )
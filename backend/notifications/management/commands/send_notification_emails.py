@@ -0,0 +1,134 @@
+import time
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q
+from notifications.emails import EmailSender
+from notifications.models import EmailDelivery, EmailDeliveryStatus, Notification, NotificationType
+
+User = get_user_model()
+
+class Rollback(Exception):
+    pass
+
+class Command(BaseCommand):
+    help = 'Send queued notification emails as per-recipient digests'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Deliveries claimed per batch; one connection is used per batch (default: 200)',
+        )
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            default=5,
+            help='Attempts before a delivery is marked as failed (default: 5)',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5.0,
+            help='Seconds to wait when nothing is due (default: 5.0)',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Send everything that is due and exit instead of polling forever',
+        )
+        parser.add_argument(
+            '--stats',
+            action='store_true',
+            help='Print queue depth and exit',
+        )
+        parser.add_argument(
+            '--benchmark',
+            type=int,
+            metavar='N',
+            help='Measure throughput by sending N synthetic notifications through the '
+                 'in-memory backend inside a rolled-back transaction',
+        )
+        parser.add_argument(
+            '--recipients',
+            type=int,
+            default=100,
+            help='Recipients the benchmark spreads its notifications over (default: 100)',
+        )
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self._report()
+            return
+        if options['benchmark']:
+            self._benchmark(options['benchmark'], options['recipients'], options['batch_size'])
+            return
+
+        sender = EmailSender(batch_size=options['batch_size'], max_attempts=options['max_attempts'])
+        self.stdout.write(self.style.SUCCESS('Notification email sender started'))
+        try:
+            sender.run(poll_interval=options['poll_interval'], stop_when_empty=options['once'])
+        except KeyboardInterrupt:
+            pass
+        self._report(sender)
+
+    def _report(self, sender=None):
+        stats = EmailDelivery.objects.aggregate(
+            pending=Count('id', filter=Q(status=EmailDeliveryStatus.PENDING)),
+            sending=Count('id', filter=Q(status=EmailDeliveryStatus.SENDING)),
+            failed=Count('id', filter=Q(status=EmailDeliveryStatus.FAILED)),
+        )
+        line = f"Email queue: pending {stats['pending']}, sending {stats['sending']}, failed {stats['failed']}"
+        if sender is not None:
+            counters = sender.counters
+            line += (
+                f" | sent {counters['sent']} notifications in {counters['messages']} emails, "
+                f"retried {counters['retried']}, failed {counters['failed']}, dropped {counters['dropped']}"
+            )
+        self.stdout.write(line)
+
+    def _benchmark(self, count, recipients, batch_size):
+        try:
+            with transaction.atomic():
+                users = User.objects.bulk_create([
+                    User(username=f'email-benchmark-{i}', email=f'email-benchmark-{i}@example.com')
+                    for i in range(recipients)
+                ])
+                # Real deliveries that happen to be due are left for the real sender
+                sender = EmailSender(
+                    batch_size=batch_size,
+                    backend='django.core.mail.backends.locmem.EmailBackend',
+                    recipient_ids=[user.pk for user in users],
+                )
+                notifications = Notification.objects.bulk_create([
+                    Notification(
+                        recipient=users[i % recipients],
+                        title=f"Benchmark notification {i}",
+                        message="Synthetic notification used to measure email throughput.",
+                        notification_type=NotificationType.INFO,
+                        action_url='/dashboard',
+                        action_text='Open Dashboard'
+                    )
+                    for i in range(count)
+                ])
+                EmailDelivery.objects.bulk_create([
+                    EmailDelivery(recipient_id=n.recipient_id, notification_id=n.pk) for n in notifications
+                ])
+
+                started = time.monotonic()
+                batches = 0
+                while sender.run_once():
+                    batches += 1
+                elapsed = time.monotonic() - started
+                raise Rollback
+        except Rollback:
+            pass
+
+        counters = sender.counters
+        self.stdout.write(self.style.SUCCESS(
+            f"Sent {counters['sent']} notifications as {counters['messages']} digests "
+            f"in {batches} batches, {elapsed:.2f}s "
+            f"({counters['sent'] / elapsed if elapsed else 0:.0f} notifications/s, "
+            f"{counters['messages'] / elapsed if elapsed else 0:.0f} emails/s)"
+        ))
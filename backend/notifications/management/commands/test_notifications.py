@@ -17,18 +17,22 @@ class Command(BaseCommand):
             }
         )
 
-        # Test 1: Create a new product (should trigger notification)
+        # Test 1: Create a new product (should trigger notification); later
+        # runs find it again, as supplier and name are unique, and restock it
         self.stdout.write("Creating new product...")
-        product = Product.objects.create(
+        product, created = Product.objects.update_or_create(
             name="Test Widget Pro",
-            category="Electronics",
-            quantity=100,
-            price=29.99,
             supplier=supplier,
-            min_stock=20,
-            description="A test product to trigger notifications"
+            defaults={
+                'category': "Electronics",
+                'quantity': 100,
+                'price': 29.99,
+                'min_stock': 20,
+                'description': "A test product to trigger notifications",
+            }
         )
-        self.stdout.write(self.style.SUCCESS(f"Created product: {product.name}"))
+        action = "Created" if created else "Restocked existing"
+        self.stdout.write(self.style.SUCCESS(f"{action} product: {product.name}"))
 
         # Test 2: Update product to trigger low stock alert
         self.stdout.write("Reducing stock to trigger low stock alert...")
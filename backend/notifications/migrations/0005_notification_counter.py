@@ -0,0 +1,63 @@
+# Generated by Django 5.2.7 on 2026-10-17 04:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def backfill_counters(apps, schema_editor):
+    Notification = apps.get_model('notifications', 'Notification')
+    NotificationCounter = apps.get_model('notifications', 'NotificationCounter')
+
+    counters = {}
+    rows = Notification.objects.values('recipient_id', 'notification_type', 'is_read').annotate(
+        count=Count('id')
+    ).order_by()
+    for row in rows:
+        counter = counters.setdefault(row['recipient_id'], NotificationCounter(user_id=row['recipient_id']))
+        counter.total_count += row['count']
+        if not row['is_read']:
+            counter.unread_count += row['count']
+        type_field = f"{row['notification_type']}_count"
+        if hasattr(counter, type_field):
+            setattr(counter, type_field, getattr(counter, type_field) + row['count'])
+
+    expiries = Notification.objects.filter(expires_at__isnull=False).values('recipient_id').annotate(
+        next_expiry=Min('expires_at')
+    ).order_by()
+    for row in expiries:
+        counters[row['recipient_id']].next_expiry = row['next_expiry']
+
+    NotificationCounter.objects.bulk_create(counters.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('notifications', '0004_notification_event'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='notification_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('total_count', models.IntegerField(default=0)),
+                ('unread_count', models.IntegerField(default=0)),
+                ('info_count', models.IntegerField(default=0)),
+                ('success_count', models.IntegerField(default=0)),
+                ('warning_count', models.IntegerField(default=0)),
+                ('error_count', models.IntegerField(default=0)),
+                ('inventory_low_count', models.IntegerField(default=0)),
+                ('order_status_count', models.IntegerField(default=0)),
+                ('order_high_value_count', models.IntegerField(default=0)),
+                ('user_action_count', models.IntegerField(default=0)),
+                ('system_count', models.IntegerField(default=0)),
+                ('next_expiry', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
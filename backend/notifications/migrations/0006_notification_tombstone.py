@@ -0,0 +1,41 @@
+# Generated by Django 5.2.7 on 2026-10-17 04:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0005_notification_counter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('notification_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', 'updated_at'], name='notificatio_recipie_96a518_idx'),
+        ),
+        migrations.AddField(
+            model_name='notificationtombstone',
+            name='recipient',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notification_tombstones', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='notificationtombstone',
+            index=models.Index(fields=['recipient', 'deleted_at'], name='notificatio_recipie_fa05c6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationtombstone',
+            index=models.Index(fields=['deleted_at'], name='notificatio_deleted_8031fa_idx'),
+        ),
+    ]
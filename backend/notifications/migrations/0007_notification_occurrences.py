@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-17 04:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0006_notification_tombstone'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='occurrences',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_read', False), ('related_object_type__isnull', False)), fields=['recipient', 'related_object_type', 'related_object_id', '-created_at'], name='notification_coalesce_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.7 on 2026-10-17 04:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0007_notification_occurrences'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationRetentionCheckpoint',
+            fields=[
+                ('policy', models.CharField(max_length=20, primary_key=True, serialize=False)),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -15,10 +15,26 @@ class NotificationType(models.TextChoices):
     USER_ACTION = 'user_action', 'User Action'
     SYSTEM = 'system', 'System'
 
-class Notification(models.Model):
-    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+class NotificationContent(models.Model):
+    """
+    Title, message and action of a notification sent to many recipients,
+    stored once and shared by every recipient's Notification row
+    """
     title = models.CharField(max_length=200)
     message = models.TextField()
+    action_url = models.URLField(null=True, blank=True)
+    action_text = models.CharField(max_length=100, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    SHARED_FIELDS = ('title', 'message', 'action_url', 'action_text')
+
+    def __str__(self):
+        return self.title
+
+class Notification(models.Model):
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    title = models.CharField(max_length=200, blank=True)
+    message = models.TextField(blank=True)
     notification_type = models.CharField(
         max_length=20,
         choices=NotificationType.choices,
@@ -39,6 +55,19 @@ class Notification(models.Model):
     # Expiration date for temporary notifications
     expires_at = models.DateTimeField(null=True, blank=True)
 
+    # How many events were coalesced into this notification
+    occurrences = models.PositiveIntegerField(default=1)
+
+    # Broadcasts keep their text in a shared NotificationContent row and leave
+    # title/message/action empty here
+    content = models.ForeignKey(
+        NotificationContent,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='receipts'
+    )
+
     class Meta:
         ordering = ['-created_at']
         indexes = [
@@ -46,10 +75,22 @@ class Notification(models.Model):
             models.Index(fields=['recipient', 'is_read']),
             models.Index(fields=['notification_type']),
             models.Index(fields=['expires_at']),
+            models.Index(fields=['recipient', 'updated_at']),
+            models.Index(
+                fields=['recipient', 'related_object_type', 'related_object_id', '-created_at'],
+                condition=models.Q(is_read=False, related_object_type__isnull=False),
+                name='notification_coalesce_idx'
+            ),
         ]
 
     def __str__(self):
-        return f"{self.title} - {self.recipient.username}"
+        return f"{self.display('title')} - {self.recipient.username}"
+
+    def display(self, field):
+        """Value of a text field, read from the shared content for broadcasts"""
+        if self.content_id is not None:
+            return getattr(self.content, field)
+        return getattr(self, field)
 
     @property
     def is_expired(self):
@@ -59,13 +100,18 @@ class Notification(models.Model):
 
     def mark_as_read(self):
         if not self.is_read:
-            self.is_read = True
-            self.save(update_fields=['is_read', 'updated_at'])
+            self._set_read_state(True)
 
     def mark_as_unread(self):
         if self.is_read:
-            self.is_read = False
-            self.save(update_fields=['is_read', 'updated_at'])
+            self._set_read_state(False)
+
+    def _set_read_state(self, is_read):
+        from .counters import set_read_state
+        now = timezone.now()
+        set_read_state(self.recipient_id, Notification.objects.filter(pk=self.pk), is_read, now=now)
+        self.is_read = is_read
+        self.updated_at = now
 
 class NotificationPreference(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='notification_preferences')
@@ -94,3 +140,137 @@ class NotificationPreference(models.Model):
 
     def __str__(self):
         return f"{self.user.username} - Notification Preferences"
+
+class NotificationEventStatus(models.TextChoices):
+    PENDING = 'pending', 'Pending'
+    PROCESSING = 'processing', 'Processing'
+    FAILED = 'failed', 'Failed'
+
+class NotificationEvent(models.Model):
+    """Compact description of an event whose notifications are still to be written"""
+    event_type = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(
+        max_length=20,
+        choices=NotificationEventStatus.choices,
+        default=NotificationEventStatus.PENDING
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+
+    # Earliest time a worker may (re)claim the event; doubles as the lease
+    # expiry while an event is being processed
+    available_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} #{self.pk} ({self.status})"
+
+class NotificationCounter(models.Model):
+    """
+    Per-user running totals over the user's stored notifications, so the
+    unread badge and stats are a primary-key lookup. Maintained by
+    ``notifications.counters``; ``reconcile_notification_counters`` repairs drift.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='notification_counter')
+    total_count = models.IntegerField(default=0)
+    unread_count = models.IntegerField(default=0)
+
+    # One column per NotificationType so increments stay single-row UPDATEs
+    info_count = models.IntegerField(default=0)
+    success_count = models.IntegerField(default=0)
+    warning_count = models.IntegerField(default=0)
+    error_count = models.IntegerField(default=0)
+    inventory_low_count = models.IntegerField(default=0)
+    order_status_count = models.IntegerField(default=0)
+    order_high_value_count = models.IntegerField(default=0)
+    user_action_count = models.IntegerField(default=0)
+    system_count = models.IntegerField(default=0)
+
+    # Earliest expires_at among the counted notifications; once it has passed,
+    # readers subtract the expired rows until cleanup removes them
+    next_expiry = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    TYPE_FIELDS = {notification_type: f'{notification_type}_count' for notification_type in NotificationType.values}
+
+    def __str__(self):
+        return f"{self.user.username} - {self.unread_count} unread / {self.total_count}"
+
+    def by_type(self):
+        counts = {
+            notification_type: getattr(self, field)
+            for notification_type, field in self.TYPE_FIELDS.items()
+        }
+        return {notification_type: count for notification_type, count in counts.items() if count}
+
+class NotificationTombstone(models.Model):
+    """Marker left behind by a deleted notification so delta-sync clients can drop it"""
+    notification_id = models.BigIntegerField()
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notification_tombstones')
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['recipient', 'deleted_at']),
+            models.Index(fields=['deleted_at']),
+        ]
+
+    def __str__(self):
+        return f"Deleted notification #{self.notification_id} - {self.recipient_id}"
+
+class NotificationRetentionCheckpoint(models.Model):
+    """Last notification id a retention pass got through, so an interrupted run can resume"""
+    policy = models.CharField(max_length=20, primary_key=True)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.policy} retention at #{self.last_id}"
+
+class EmailDeliveryStatus(models.TextChoices):
+    PENDING = 'pending', 'Pending'
+    SENDING = 'sending', 'Sending'
+    FAILED = 'failed', 'Failed'
+
+class EmailDelivery(models.Model):
+    """
+    A notification waiting to be emailed. Rows are grouped per recipient into
+    digests by ``send_notification_emails`` and deleted once sent.
+    """
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='email_deliveries')
+    # No constraint so deleting notifications stays a plain DELETE; deliveries
+    # whose notification is gone are dropped by the sender
+    notification = models.ForeignKey(
+        Notification,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+'
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=EmailDeliveryStatus.choices,
+        default=EmailDeliveryStatus.PENDING
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default='')
+
+    # Earliest time the sender may pick the row up: the digest delay for new
+    # rows, the backoff after a failure, or the lease while sending
+    available_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+        ]
+
+    def __str__(self):
+        return f"Email for notification #{self.notification_id} to {self.recipient_id} ({self.status})"
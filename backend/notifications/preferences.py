@@ -0,0 +1,96 @@
+"""
+Bulk resolution of notification preferences.
+
+Each user's flags for a channel (``push_*`` for in-app, ``email_*`` for
+email) are folded into one small integer in SQL, so a fan-out to hundreds of
+staff users costs a single query for the whole recipient set. Masks are kept
+in the Django cache for a short while and dropped whenever a user's
+preferences are saved or deleted, from any process; the cache must be shared
+between processes (see CACHES) for that to reach the workers.
+"""
+from typing import Dict, Iterable, List
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Case, IntegerField, Value, When
+from .models import NotificationPreference, NotificationType
+
+PUSH = 'push'
+EMAIL = 'email'
+CHANNELS = (PUSH, EMAIL)
+
+CHANNEL_ENABLED = 1
+
+# One bit per type that has its own <channel>_* switch; other types only need
+# <channel>_enabled
+TYPE_BITS = {
+    NotificationType.INVENTORY_LOW: 1 << 1,
+    NotificationType.ORDER_STATUS: 1 << 2,
+    NotificationType.ORDER_HIGH_VALUE: 1 << 3,
+    NotificationType.USER_ACTION: 1 << 4,
+    NotificationType.SYSTEM: 1 << 5,
+}
+
+def field_bits(channel: str) -> Dict[str, int]:
+    return {
+        f'{channel}_enabled': CHANNEL_ENABLED,
+        **{f'{channel}_{notification_type}': bit for notification_type, bit in TYPE_BITS.items()},
+    }
+
+def encode_mask(preferences: NotificationPreference, channel: str = PUSH) -> int:
+    return sum(bit for field, bit in field_bits(channel).items() if getattr(preferences, field))
+
+# Users without a NotificationPreference row get the model defaults
+DEFAULT_MASKS = {channel: encode_mask(NotificationPreference(), channel) for channel in CHANNELS}
+
+def allowed(mask: int, notification_type: str) -> bool:
+    if not mask & CHANNEL_ENABLED:
+        return False
+    bit = TYPE_BITS.get(notification_type)
+    return bit is None or bool(mask & bit)
+
+class PreferenceCache:
+    KEY_PREFIX = 'notifications:preference_mask:'
+
+    def __init__(self, timeout: int = 60):
+        self.timeout = timeout
+
+    def _key(self, channel: str, user_id: int) -> str:
+        return f'{self.KEY_PREFIX}{channel}:{user_id}'
+
+    def masks(self, user_ids: Iterable[int], channel: str = PUSH) -> Dict[int, int]:
+        """Bitmask of each of ``user_ids`` for ``channel``; at most one query for the cache misses"""
+        user_ids = list(dict.fromkeys(user_ids))
+        if not user_ids:
+            return {}
+        keys = {user_id: self._key(channel, user_id) for user_id in user_ids}
+        cached = cache.get_many(list(keys.values()))
+        masks = {user_id: cached[key] for user_id, key in keys.items() if key in cached}
+
+        missing = [user_id for user_id in user_ids if user_id not in masks]
+        if missing:
+            bits = [
+                Case(When(**{field: True}, then=Value(bit)), default=Value(0), output_field=IntegerField())
+                for field, bit in field_bits(channel).items()
+            ]
+            loaded = dict(
+                NotificationPreference.objects.filter(user_id__in=missing)
+                .annotate(mask=sum(bits[1:], bits[0]))
+                .values_list('user_id', 'mask')
+            )
+            fresh = {user_id: loaded.get(user_id, DEFAULT_MASKS[channel]) for user_id in missing}
+            cache.set_many({keys[user_id]: mask for user_id, mask in fresh.items()}, self.timeout)
+            masks.update(fresh)
+        return masks
+
+    def filter_recipients(self, user_ids: Iterable[int], notification_type: str, channel: str = PUSH) -> List[int]:
+        """Keep the users who accept notifications of ``notification_type`` on ``channel``"""
+        user_ids = list(user_ids)
+        masks = self.masks(user_ids, channel)
+        return [user_id for user_id in user_ids if allowed(masks[user_id], notification_type)]
+
+    def invalidate(self, user_id: int):
+        cache.delete_many([self._key(channel, user_id) for channel in CHANNELS])
+
+preference_cache = PreferenceCache(
+    timeout=getattr(settings, 'NOTIFICATION_PREFERENCE_CACHE_TIMEOUT', 60)
+)
@@ -0,0 +1,68 @@
+import threading
+import time
+import uuid
+from typing import Dict, FrozenSet, Iterable, Optional, Tuple
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+User = get_user_model()
+
+class RecipientDirectory:
+    """
+    Process-local map of role sets to the ids of users holding those roles.
+
+    Entries are dropped whenever the shared version in the Django cache
+    changes, so a role change in one worker is picked up by every other
+    worker on its next lookup without touching the users table. That needs
+    a cache shared between processes (see CACHES); entries also expire after
+    ``timeout`` seconds, which bounds how stale a missed invalidation can be.
+    """
+
+    VERSION_KEY = 'notifications:recipient_directory:version'
+
+    def __init__(self, timeout: int = 300):
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._entries: Dict[FrozenSet[str], Tuple[float, Tuple[int, ...]]] = {}
+        self._version: Optional[str] = None
+
+    def _current_version(self) -> str:
+        version = cache.get(self.VERSION_KEY)
+        if version is None:
+            cache.add(self.VERSION_KEY, uuid.uuid4().hex, timeout=None)
+            version = cache.get(self.VERSION_KEY)
+        return version
+
+    def get(self, roles: Iterable[str]) -> Tuple[int, ...]:
+        """Return the ids of users holding any of ``roles``"""
+        key = frozenset(roles)
+        version = self._current_version()
+
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            entry = self._entries.get(key)
+        ids = entry[1] if entry and entry[0] > time.monotonic() else None
+
+        if ids is None:
+            ids = tuple(
+                User.objects.filter(role__in=key).order_by('id').values_list('id', flat=True)
+            )
+            with self._lock:
+                if self._version == version:
+                    self._entries[key] = (time.monotonic() + self.timeout, ids)
+        return ids
+
+    def invalidate(self):
+        """Drop cached entries in this process and move the shared version on"""
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+        # A fresh random version can never match one another process already cached under
+        cache.set(self.VERSION_KEY, uuid.uuid4().hex, timeout=None)
+
+recipient_directory = RecipientDirectory(
+    timeout=getattr(settings, 'NOTIFICATION_RECIPIENT_CACHE_TIMEOUT', 300)
+)
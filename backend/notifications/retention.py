@@ -0,0 +1,123 @@
+"""
+Batched, throttled deletion of expired and old read notifications.
+
+Rows are deleted in primary-key order, ``batch_size`` at a time, each batch
+in its own short transaction (through ``counters.delete_notifications`` so
+counters and tombstones stay right). The last id reached is checkpointed, so
+a pass that is interrupted picks up where it stopped instead of rescanning
+the table.
+"""
+import logging
+import time
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Callable, Optional
+from django.db.models import Q
+from django.utils import timezone
+from .models import Notification, NotificationPreference, NotificationRetentionCheckpoint
+from . import counters
+
+logger = logging.getLogger(__name__)
+
+EXPIRED = 'expired'
+READ = 'read'
+
+@dataclass
+class RetentionReport:
+    policy: str
+    deleted: int = 0
+    batches: int = 0
+    elapsed: float = 0.0
+    resumed_from: int = 0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.deleted / self.elapsed if self.elapsed else 0.0
+
+class RetentionEngine:
+    def __init__(
+        self,
+        batch_size: int = 1000,
+        sleep_seconds: float = 0.0,
+        default_read_days: int = 30,
+        resume: bool = True,
+        on_batch: Optional[Callable[[RetentionReport], None]] = None
+    ):
+        self.batch_size = batch_size
+        self.sleep_seconds = sleep_seconds
+        self.default_read_days = default_read_days
+        self.resume = resume
+        self.on_batch = on_batch
+        self.now = timezone.now()
+        # Shortest read retention in force, set by _read_cutoffs
+        self._shortest_read_days = default_read_days
+
+    def condition(self, policy: str) -> Q:
+        if policy == EXPIRED:
+            return Q(expires_at__lt=self.now)
+        if policy == READ:
+            return Q(is_read=True) & self._read_cutoffs()
+        raise ValueError(f"Unknown retention policy '{policy}'")
+
+    def _read_cutoffs(self) -> Q:
+        """
+        One condition per distinct ``auto_delete_read_after_days`` value, all
+        evaluated against the preferences join; 0 keeps read notifications
+        """
+        preference = 'recipient__notification_preferences__auto_delete_read_after_days'
+        cutoffs = Q(
+            recipient__notification_preferences__isnull=True,
+            updated_at__lt=self.now - timedelta(days=self.default_read_days)
+        )
+        days_values = NotificationPreference.objects.filter(
+            auto_delete_read_after_days__gt=0
+        ).values_list('auto_delete_read_after_days', flat=True).distinct().order_by()
+        for days in days_values:
+            cutoffs |= Q(**{preference: days}, updated_at__lt=self.now - timedelta(days=days))
+            self._shortest_read_days = min(self._shortest_read_days, days)
+        return cutoffs
+
+    def run(self, policy: str) -> RetentionReport:
+        condition = self.condition(policy)
+        checkpoint, _ = NotificationRetentionCheckpoint.objects.get_or_create(policy=policy)
+        last_id = checkpoint.last_id if self.resume else 0
+        report = RetentionReport(policy=policy, resumed_from=last_id)
+        started = time.monotonic()
+
+        while True:
+            ids = list(
+                Notification.objects.filter(condition, id__gt=last_id)
+                .order_by('id').values_list('id', flat=True)[:self.batch_size]
+            )
+            if not ids:
+                break
+            # A row may have been marked unread, or read again, since it was
+            # selected; the check stays on the notifications table so the rows
+            # can be locked. Any row it passes is older than the shortest
+            # retention, and a row touched since selection is newer than that.
+            if policy == READ:
+                recheck = Q(is_read=True, updated_at__lt=self.now - timedelta(days=self._shortest_read_days))
+            else:
+                recheck = condition
+            report.deleted += counters.delete_notifications(
+                Notification.objects.filter(recheck, id__in=ids)
+            )
+            report.batches += 1
+            last_id = ids[-1]
+            NotificationRetentionCheckpoint.objects.filter(policy=policy).update(last_id=last_id)
+            report.elapsed = time.monotonic() - started
+            if self.on_batch is not None:
+                self.on_batch(report)
+            if len(ids) < self.batch_size:
+                break
+            if self.sleep_seconds:
+                time.sleep(self.sleep_seconds)
+
+        # Completed passes start from the beginning next time
+        NotificationRetentionCheckpoint.objects.filter(policy=policy).update(last_id=0)
+        report.elapsed = time.monotonic() - started
+        logger.info(
+            f"🧹 Retention '{policy}': deleted {report.deleted} notifications in "
+            f"{report.batches} batches ({report.rows_per_second:.0f} rows/s)"
+        )
+        return report
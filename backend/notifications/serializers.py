@@ -1,5 +1,6 @@
 from rest_framework import serializers
-from .models import Notification, NotificationPreference, NotificationType
+from .models import Notification, NotificationContent, NotificationPreference, NotificationType
+from .services import NotificationService
 
 class NotificationSerializer(serializers.ModelSerializer):
     is_expired = serializers.ReadOnlyField()
@@ -9,9 +10,25 @@ class NotificationSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'title', 'message', 'notification_type', 'is_read',
             'created_at', 'updated_at', 'related_object_id', 'related_object_type',
-            'action_url', 'action_text', 'expires_at', 'is_expired'
+            'action_url', 'action_text', 'expires_at', 'is_expired', 'occurrences'
         ]
-        read_only_fields = ['created_at', 'updated_at', 'is_expired']
+        read_only_fields = ['created_at', 'updated_at', 'is_expired', 'occurrences']
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        if instance.content_id is not None:
+            for field in NotificationContent.SHARED_FIELDS:
+                data[field] = getattr(instance.content, field)
+        return data
+
+    def update(self, instance, validated_data):
+        # Editing the text of one recipient's copy of a broadcast gives that
+        # recipient its own inline text
+        if instance.content_id is not None and set(validated_data) & set(NotificationContent.SHARED_FIELDS):
+            for field in NotificationContent.SHARED_FIELDS:
+                setattr(instance, field, getattr(instance.content, field))
+            instance.content = None
+        return super().update(instance, validated_data)
 
 class NotificationCreateSerializer(serializers.ModelSerializer):
     class Meta:
@@ -22,6 +39,9 @@ class NotificationCreateSerializer(serializers.ModelSerializer):
             'action_text', 'expires_at'
         ]
 
+    def create(self, validated_data):
+        return NotificationService.create_notification(**validated_data)
+
 class NotificationPreferenceSerializer(serializers.ModelSerializer):
     class Meta:
         model = NotificationPreference
@@ -1,10 +1,103 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterable, Union
+import logging
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.utils import timezone
-from django.db.models import Q, Count
-from .models import Notification, NotificationPreference, NotificationType
+from django.db.models import Q
+from .models import Notification, NotificationPreference, NotificationTombstone, NotificationType
+from .recipients import recipient_directory
+from .preferences import preference_cache, allowed
+from .coalescing import NotificationCoalescer
+from .broadcasts import cleanup_orphaned_content
+from .retention import RetentionEngine
+from . import retention
+from . import counters
 
 User = get_user_model()
+logger = logging.getLogger(__name__)
+
+class NotificationFanOut:
+    """
+    Collects every notification produced by one event and writes them with a
+    single bulk INSERT.
+
+    Recipients are resolved through the shared role directory, so repeated
+    lookups within an event (and across events) do not hit the users table.
+    Unless ``respect_preferences`` is False, recipients who turned off in-app
+    notifications of a type are dropped before any row is built; their
+    preferences are resolved for the whole set at once.
+    """
+
+    def __init__(self, respect_preferences: bool = True):
+        self.respect_preferences = respect_preferences
+        self._rows: List[Notification] = []
+        self._masks: Dict[int, int] = {}
+
+    def recipients(self, roles: Iterable[str], exclude: Iterable[int] = ()) -> List[int]:
+        """Return the ids of users holding any of ``roles``"""
+        excluded = set(exclude)
+        return [
+            user_id for user_id in recipient_directory.get(roles)
+            if user_id not in excluded
+        ]
+
+    def add(
+        self,
+        recipients: Iterable[Union[User, int]],
+        title: str,
+        message: str,
+        notification_type: str = NotificationType.INFO,
+        related_object_id: Optional[int] = None,
+        related_object_type: Optional[str] = None,
+        action_url: Optional[str] = None,
+        action_text: Optional[str] = None,
+        expires_at: Optional[timezone.datetime] = None
+    ) -> int:
+        """Queue one notification per recipient (users or user ids) that accepts this type"""
+        recipient_ids = [
+            recipient if isinstance(recipient, int) else recipient.pk
+            for recipient in recipients
+        ]
+        if self.respect_preferences:
+            recipient_ids = self._accepting(recipient_ids, notification_type)
+
+        added = 0
+        for recipient_id in recipient_ids:
+            self._rows.append(Notification(
+                recipient_id=recipient_id,
+                title=title,
+                message=message,
+                notification_type=notification_type,
+                related_object_id=related_object_id,
+                related_object_type=related_object_type,
+                action_url=action_url,
+                action_text=action_text,
+                expires_at=expires_at
+            ))
+            added += 1
+        return added
+
+    def _accepting(self, recipient_ids: List[int], notification_type: str) -> List[int]:
+        unknown = [recipient_id for recipient_id in recipient_ids if recipient_id not in self._masks]
+        if unknown:
+            self._masks.update(preference_cache.masks(unknown))
+        return [
+            recipient_id for recipient_id in recipient_ids
+            if allowed(self._masks[recipient_id], notification_type)
+        ]
+
+    def __len__(self):
+        return len(self._rows)
+
+    def send(self) -> List[Notification]:
+        """
+        Write all queued notifications, coalescing repeats about the same
+        object and capping each recipient's rate; returns the inserted rows
+        """
+        if not self._rows:
+            return []
+        rows, self._rows = self._rows, []
+        return NotificationCoalescer().write(rows)
 
 class NotificationService:
     """
@@ -24,7 +117,7 @@ class NotificationService:
         expires_at: Optional[timezone.datetime] = None
     ) -> Notification:
         """Create a new notification"""
-        notification = Notification.objects.create(
+        notification = Notification(
             recipient=recipient,
             title=title,
             message=message,
@@ -35,7 +128,7 @@ class NotificationService:
             action_text=action_text,
             expires_at=expires_at
         )
-        return notification
+        return counters.create_notifications([notification])[0]
 
     @staticmethod
     def create_bulk_notifications(
@@ -45,18 +138,16 @@ class NotificationService:
         notification_type: str = NotificationType.INFO,
         **kwargs
     ) -> List[Notification]:
-        """Create notifications for multiple recipients"""
-        notifications = []
-        for recipient in recipients:
-            notification = NotificationService.create_notification(
-                recipient=recipient,
-                title=title,
-                message=message,
-                notification_type=notification_type,
-                **kwargs
-            )
-            notifications.append(notification)
-        return notifications
+        """Create notifications for multiple recipients with a single INSERT"""
+        fan_out = NotificationFanOut()
+        fan_out.add(
+            recipients,
+            title=title,
+            message=message,
+            notification_type=notification_type,
+            **kwargs
+        )
+        return fan_out.send()
 
     @staticmethod
     def get_user_notifications(
@@ -87,93 +178,65 @@ class NotificationService:
     @staticmethod
     def mark_notifications_as_read(notification_ids: List[int], user: User) -> int:
         """Mark multiple notifications as read for a user"""
-        updated = Notification.objects.filter(
-            id__in=notification_ids,
-            recipient=user,
-            is_read=False
-        ).update(is_read=True, updated_at=timezone.now())
-        return updated
+        return counters.set_read_state(
+            user.id, Notification.objects.filter(id__in=notification_ids), is_read=True
+        )
 
     @staticmethod
     def mark_notifications_as_unread(notification_ids: List[int], user: User) -> int:
         """Mark multiple notifications as unread for a user"""
-        updated = Notification.objects.filter(
-            id__in=notification_ids,
-            recipient=user,
-            is_read=True
-        ).update(is_read=False, updated_at=timezone.now())
-        return updated
+        return counters.set_read_state(
+            user.id, Notification.objects.filter(id__in=notification_ids), is_read=False
+        )
 
     @staticmethod
     def mark_all_as_read(user: User) -> int:
         """Mark all notifications as read for a user"""
-        updated = Notification.objects.filter(
-            recipient=user,
-            is_read=False
-        ).update(is_read=True, updated_at=timezone.now())
-        return updated
+        return counters.set_read_state(user.id, Notification.objects.all(), is_read=True)
 
     @staticmethod
     def delete_notifications(notification_ids: List[int], user: User) -> int:
         """Delete multiple notifications for a user"""
-        deleted, _ = Notification.objects.filter(
-            id__in=notification_ids,
-            recipient=user
-        ).delete()
-        return deleted
+        return counters.delete_notifications(
+            Notification.objects.filter(id__in=notification_ids, recipient=user)
+        )
 
     @staticmethod
     def delete_all_read_notifications(user: User) -> int:
         """Delete all read notifications for a user"""
-        deleted, _ = Notification.objects.filter(
-            recipient=user,
-            is_read=True
-        ).delete()
-        return deleted
+        return counters.delete_notifications(
+            Notification.objects.filter(recipient=user, is_read=True)
+        )
 
     @staticmethod
     def get_notification_stats(user: User) -> Dict[str, Any]:
-        """Get notification statistics for a user"""
-        notifications = Notification.objects.filter(
-            recipient=user
-        ).filter(
-            Q(expires_at__isnull=True) | Q(expires_at__gt=timezone.now())
-        )
+        """Get notification statistics for a user from the denormalized counter"""
+        return counters.counter_stats(user.id)
 
-        total_count = notifications.count()
-        unread_count = notifications.filter(is_read=False).count()
-        read_count = total_count - unread_count
-
-        # Count by type
-        by_type = notifications.values('notification_type').annotate(
-            count=Count('id')
-        )
-        type_counts = {item['notification_type']: item['count'] for item in by_type}
+    @staticmethod
+    def cleanup_expired_notifications(**options) -> int:
+        """Remove expired notifications in batches (see RetentionEngine for options)"""
+        return RetentionEngine(**options).run(retention.EXPIRED).deleted
 
-        return {
-            'total_count': total_count,
-            'unread_count': unread_count,
-            'read_count': read_count,
-            'by_type': type_counts
-        }
+    @staticmethod
+    def cleanup_old_read_notifications(days: int = 30, **options) -> int:
+        """
+        Remove read notifications older than each recipient's
+        auto_delete_read_after_days; ``days`` applies to users without preferences
+        """
+        return RetentionEngine(default_read_days=days, **options).run(retention.READ).deleted
 
     @staticmethod
-    def cleanup_expired_notifications() -> int:
-        """Remove expired notifications"""
-        deleted, _ = Notification.objects.filter(
-            expires_at__lt=timezone.now()
-        ).delete()
+    def cleanup_tombstones() -> int:
+        """Remove delta-sync tombstones older than any cursor still accepted"""
+        cutoff_date = timezone.now() - timezone.timedelta(days=settings.NOTIFICATION_TOMBSTONE_RETENTION_DAYS)
+        deleted, _ = NotificationTombstone.objects.filter(deleted_at__lt=cutoff_date).delete()
         return deleted
 
     @staticmethod
-    def cleanup_old_read_notifications(days: int = 30) -> int:
-        """Remove old read notifications"""
-        cutoff_date = timezone.now() - timezone.timedelta(days=days)
-        deleted, _ = Notification.objects.filter(
-            is_read=True,
-            updated_at__lt=cutoff_date
-        ).delete()
-        return deleted
+    def cleanup_orphaned_content(batch_size: int = 1000) -> int:
+        """Remove shared broadcast content whose notifications are all gone"""
+        return cleanup_orphaned_content(batch_size)
 
     @staticmethod
     def get_or_create_user_preferences(user: User) -> NotificationPreference:
@@ -190,23 +253,8 @@ class NotificationService:
     @staticmethod
     def should_send_notification(user: User, notification_type: str) -> bool:
         """Check if notification should be sent based on user preferences"""
-        try:
-            preferences = user.notification_preferences
-        except NotificationPreference.DoesNotExist:
-            preferences = NotificationService.get_or_create_user_preferences(user)
-
-        if not preferences.push_enabled:
-            return False
-
-        type_mapping = {
-            NotificationType.INVENTORY_LOW: preferences.push_inventory_low,
-            NotificationType.ORDER_STATUS: preferences.push_order_status,
-            NotificationType.ORDER_HIGH_VALUE: preferences.push_order_high_value,
-            NotificationType.USER_ACTION: preferences.push_user_action,
-            NotificationType.SYSTEM: preferences.push_system,
-        }
-
-        return type_mapping.get(notification_type, True)
+        mask = preference_cache.masks([user.pk])[user.pk]
+        return allowed(mask, notification_type)
 
 # Convenience functions for common notification types
 class NotificationTemplates:
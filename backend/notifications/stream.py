@@ -0,0 +1,171 @@
+"""
+Server-Sent Events fan-in for notifications.
+
+Each process runs at most one poller, shared by every connected client: it
+asks the database for notifications created or edited (e.g. coalesced
+repeats) and counters changed since the previous tick for the users that currently hold a stream open, and
+pushes the results onto the per-connection queues. Ten open tabs therefore
+cost one query per tick instead of two queries per tab every few seconds.
+"""
+import asyncio
+import functools
+import json
+import logging
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.db.models import Max, Q
+from django.utils import timezone
+from .models import Notification, NotificationCounter
+from .counters import unread_counts
+from .serializers import NotificationSerializer
+
+logger = logging.getLogger(__name__)
+
+def format_event(event: str, data, event_id: Optional[int] = None) -> str:
+    """Encode one SSE message"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return '\n'.join(lines) + '\n\n'
+
+def _in_worker(func):
+    """
+    ``func`` on an executor thread (off the event loop), closing that
+    thread's database connections afterwards; nothing else would, and each
+    call may land on a different thread
+    """
+    def run(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            connections.close_all()
+    return sync_to_async(functools.wraps(func)(run), thread_sensitive=False)
+
+def _active(queryset):
+    return queryset.filter(Q(expires_at__isnull=True) | Q(expires_at__gt=timezone.now()))
+
+def notifications_after(user_id: int, last_id: int, limit: int = 50) -> List[dict]:
+    """Notifications a reconnecting client missed, oldest first"""
+    queryset = _active(Notification.objects.filter(recipient_id=user_id, id__gt=last_id)).select_related('content').order_by('id')[:limit]
+    return NotificationSerializer(queryset, many=True).data
+
+class NotificationBroker:
+    """In-process pub/sub: one database poller feeding many SSE connections"""
+
+    QUEUE_SIZE = 100
+
+    def __init__(self, poll_interval: float = 2.0):
+        self.poll_interval = poll_interval
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = defaultdict(set)
+        self._task: Optional[asyncio.Task] = None
+        self._last_id: Optional[int] = None
+        self._last_tick = None
+
+    def subscribe(self, user_id: int) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.QUEUE_SIZE)
+        self._subscribers[user_id].add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return queue
+
+    def unsubscribe(self, user_id: int, queue: asyncio.Queue):
+        queues = self._subscribers.get(user_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[user_id]
+
+    def _poll(self, user_ids: List[int]) -> Dict[int, List[str]]:
+        """Collect pending SSE messages per subscribed user"""
+        now = timezone.now()
+        if self._last_id is None:
+            self._last_id = Notification.objects.aggregate(last=Max('id'))['last'] or 0
+            self._last_tick = now
+            return {}
+
+        new = list(
+            _active(Notification.objects.filter(recipient_id__in=user_ids, id__gt=self._last_id))
+            .select_related('content').order_by('id')
+        )
+        # Rows edited in place, e.g. repeats folded into an unread notification
+        updated = list(
+            _active(Notification.objects.filter(
+                recipient_id__in=user_ids, id__lte=self._last_id, updated_at__gt=self._last_tick
+            )).select_related('content').order_by('id')
+        )
+        changed = list(
+            NotificationCounter.objects.filter(
+                user_id__in=user_ids, updated_at__gt=self._last_tick
+            ).values_list('user_id', flat=True)
+        )
+        self._last_tick = now
+        if new:
+            self._last_id = new[-1].id
+
+        messages: Dict[int, List[str]] = defaultdict(list)
+        for notification, data in zip(new, NotificationSerializer(new, many=True).data):
+            messages[notification.recipient_id].append(
+                format_event('notification', data, event_id=notification.id)
+            )
+        for notification, data in zip(updated, NotificationSerializer(updated, many=True).data):
+            messages[notification.recipient_id].append(format_event('notification_updated', data))
+        if changed:
+            for user_id, count in unread_counts(changed).items():
+                messages[user_id].append(format_event('unread_count', {'unread_count': count}))
+        return messages
+
+    async def _run(self):
+        try:
+            await self._loop()
+        finally:
+            # Start from the newest row again when the next client connects
+            self._last_id = None
+
+    async def _loop(self):
+        while self._subscribers:
+            user_ids = list(self._subscribers)
+            try:
+                messages = await _in_worker(self._poll)(user_ids)
+            except Exception as e:
+                logger.error(f"❌ Notification stream poll failed - Error: {str(e)}")
+                messages = {}
+            for user_id, user_messages in messages.items():
+                for queue in list(self._subscribers.get(user_id, ())):
+                    for message in user_messages:
+                        try:
+                            queue.put_nowait(message)
+                        except asyncio.QueueFull:
+                            # Drop messages for a stalled client instead of buffering forever
+                            break
+            await asyncio.sleep(self.poll_interval)
+
+    async def stream(self, user_id: int, last_event_id: Optional[int] = None, heartbeat: float = 15.0):
+        """Async iterator of SSE messages for one connection"""
+        queue = self.subscribe(user_id)
+        try:
+            yield 'retry: 3000\n\n'
+            if last_event_id is not None:
+                missed = await _in_worker(notifications_after)(user_id, last_event_id)
+                for data in missed:
+                    yield format_event('notification', data, event_id=data['id'])
+            counts = await _in_worker(unread_counts)([user_id])
+            yield format_event('unread_count', {'unread_count': counts[user_id]})
+
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    yield ': heartbeat\n\n'
+                    continue
+                yield message
+        finally:
+            self.unsubscribe(user_id, queue)
+
+broker = NotificationBroker(
+    poll_interval=getattr(settings, 'NOTIFICATION_STREAM_POLL_INTERVAL', 2.0)
+)
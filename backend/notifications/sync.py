@@ -0,0 +1,70 @@
+"""
+Delta sync for notification lists.
+
+A client that already holds a list asks for ``?since=<cursor>`` and gets back
+only the rows changed after the cursor plus the ids it should drop (deleted
+rows, recorded as tombstones, and rows that have expired meanwhile). The
+per-user NotificationCounter doubles as a version: its ``updated_at`` moves
+on every write to the user's notifications, so it makes a cheap ETag.
+"""
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Dict, Optional
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from .models import Notification, NotificationTombstone
+from .counters import get_counter
+from .serializers import NotificationSerializer
+
+def encode_cursor(moment: datetime) -> str:
+    return str(int(moment.timestamp() * 1_000_000))
+
+def decode_cursor(cursor: str) -> datetime:
+    """Parse a cursor produced by ``encode_cursor``; raises ValueError when malformed"""
+    return datetime.fromtimestamp(int(cursor) / 1_000_000, tz=dt_timezone.utc)
+
+def current_etag(user_id: int) -> Optional[str]:
+    """
+    ETag of the user's notification list, or None when it can't be trusted
+    because a stored notification has expired since the last write
+    """
+    counter = get_counter(user_id)
+    if counter.next_expiry is not None and counter.next_expiry <= timezone.now():
+        return None
+    return f'"{user_id}-{encode_cursor(counter.updated_at)}"'
+
+def changes_since(user_id: int, since: datetime) -> Dict:
+    """Notifications changed and ids removed for ``user_id`` after ``since``"""
+    now = timezone.now()
+    # Rows committed by slower transactions may carry an earlier updated_at,
+    # so the next cursor trails the clock a little
+    margin = timedelta(seconds=settings.NOTIFICATION_SYNC_CURSOR_MARGIN)
+    active = Q(expires_at__isnull=True) | Q(expires_at__gt=now)
+    user_notifications = Notification.objects.filter(recipient_id=user_id)
+
+    if since < now - timedelta(days=settings.NOTIFICATION_TOMBSTONE_RETENTION_DAYS):
+        # Tombstones this old are gone; the client has to start over
+        changed = user_notifications.filter(active)
+        deleted = []
+        reset = True
+    else:
+        changed = user_notifications.filter(active, updated_at__gt=since)
+        deleted = set(
+            NotificationTombstone.objects.filter(
+                recipient_id=user_id, deleted_at__gt=since
+            ).values_list('notification_id', flat=True)
+        )
+        deleted.update(
+            user_notifications.filter(
+                expires_at__gt=since, expires_at__lte=now
+            ).values_list('id', flat=True)
+        )
+        deleted = sorted(deleted)
+        reset = False
+
+    return {
+        'cursor': encode_cursor(now - margin),
+        'reset': reset,
+        'notifications': NotificationSerializer(changed.select_related('recipient', 'content'), many=True).data,
+        'deleted': deleted,
+    }
@@ -1,3 +1,245 @@
+from datetime import timedelta
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+from .counters import COUNTER_FIELDS, compute_counters
+from .dispatch import run_handler
+from .models import EmailDelivery, EmailDeliveryStatus, Notification, NotificationCounter, NotificationType
+from .recipients import recipient_directory
+from .retention import EXPIRED, READ, RetentionEngine
+from .services import NotificationService
+from .sync import encode_cursor
 
-# Create your tests here.
+User = get_user_model()
+
+class NotificationTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader', password='secret')
+        self.other = User.objects.create_user(username='bystander', password='secret')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def notify(self, user=None, notification_type=NotificationType.INFO, **kwargs):
+        return NotificationService.create_notification(
+            user or self.user, 'Title', 'Message', notification_type=notification_type, **kwargs
+        )
+
+class CounterTests(NotificationTestCase):
+    def setUp(self):
+        super().setUp()
+        self.info = [self.notify() for _ in range(3)]
+        self.warning = self.notify(notification_type=NotificationType.WARNING)
+        self.notify(user=self.other)
+
+    def assertCountersReconciled(self):
+        for user in (self.user, self.other):
+            expected = compute_counters([user.id])[user.id]
+            stored = NotificationCounter.objects.get(user_id=user.id)
+            for field in COUNTER_FIELDS:
+                self.assertEqual(getattr(stored, field), getattr(expected, field), f'{user.username}.{field}')
+        out = StringIO()
+        call_command('reconcile_notification_counters', '--dry-run', stdout=out)
+        self.assertIn('would repair 0 counters', out.getvalue())
+
+    def unread_count(self):
+        return self.client.get('/api/notifications/unread_count/').data['unread_count']
+
+    def test_create(self):
+        self.assertEqual(self.unread_count(), 4)
+        self.assertCountersReconciled()
+
+    def test_mark_one_read_and_unread(self):
+        response = self.client.post(f'/api/notifications/{self.info[0].pk}/mark_read/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.unread_count(), 3)
+        self.assertCountersReconciled()
+
+        self.client.post(f'/api/notifications/{self.info[0].pk}/mark_unread/')
+        self.assertEqual(self.unread_count(), 4)
+        self.assertCountersReconciled()
+
+    def test_marking_read_twice_counts_once(self):
+        self.client.post(f'/api/notifications/{self.info[0].pk}/mark_read/')
+        self.client.post(f'/api/notifications/{self.info[0].pk}/mark_read/')
+        self.assertEqual(self.unread_count(), 3)
+        self.assertCountersReconciled()
+
+    def test_mark_all_read(self):
+        response = self.client.post('/api/notifications/mark_all_read/')
+        self.assertEqual(response.data['updated_count'], 4)
+        self.assertEqual(self.unread_count(), 0)
+        self.assertCountersReconciled()
+
+    def test_type_edit(self):
+        response = self.client.patch(
+            f'/api/notifications/{self.info[0].pk}/', {'notification_type': NotificationType.SYSTEM}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        stats = self.client.get('/api/notifications/stats/').data
+        self.assertEqual(stats['by_type'], {'info': 2, 'warning': 1, 'system': 1})
+        self.assertCountersReconciled()
+
+    def test_delete_one(self):
+        response = self.client.delete(f'/api/notifications/{self.warning.pk}/')
+        self.assertEqual(response.status_code, 204)
+        stats = self.client.get('/api/notifications/stats/').data
+        self.assertEqual(stats['total_count'], 3)
+        self.assertEqual(stats['by_type'], {'info': 3})
+        self.assertCountersReconciled()
+
+    def test_bulk_delete_ignores_other_users_rows(self):
+        foreign = Notification.objects.get(recipient=self.other)
+        response = self.client.post('/api/notifications/bulk_action/', {
+            'action': 'delete', 'notification_ids': [self.info[0].pk, self.info[1].pk, foreign.pk],
+        }, format='json')
+        self.assertEqual(response.data['affected_count'], 2)
+        self.assertTrue(Notification.objects.filter(pk=foreign.pk).exists())
+        self.assertCountersReconciled()
+
+    def test_delete_all_read(self):
+        self.client.post('/api/notifications/bulk_action/', {
+            'action': 'mark_read', 'notification_ids': [self.info[0].pk, self.warning.pk],
+        }, format='json')
+        response = self.client.delete('/api/notifications/delete_all_read/')
+        self.assertEqual(response.data['deleted_count'], 2)
+        self.assertEqual(self.unread_count(), 2)
+        self.assertCountersReconciled()
+
+    def test_expired_retention(self):
+        expired = self.notify(expires_at=timezone.now() - timedelta(hours=1))
+        self.notify(expires_at=timezone.now() + timedelta(days=1))
+        # Expired rows still stored are left out of the counts readers see
+        self.assertEqual(self.unread_count(), 5)
+
+        report = RetentionEngine(batch_size=2, resume=False).run(EXPIRED)
+        self.assertEqual(report.deleted, 1)
+        self.assertFalse(Notification.objects.filter(pk=expired.pk).exists())
+        self.assertEqual(self.unread_count(), 5)
+        self.assertCountersReconciled()
+
+    def test_read_retention(self):
+        NotificationService.mark_all_as_read(self.user)
+        Notification.objects.filter(pk__in=[self.info[0].pk, self.info[1].pk]).update(
+            updated_at=timezone.now() - timedelta(days=31)
+        )
+        report = RetentionEngine(batch_size=1, resume=False).run(READ)
+        self.assertEqual(report.deleted, 2)
+        self.assertEqual(NotificationCounter.objects.get(user_id=self.user.id).total_count, 2)
+        self.assertCountersReconciled()
+
+    def test_reconcile_repairs_drift(self):
+        NotificationCounter.objects.filter(user_id=self.user.id).update(unread_count=99, total_count=0)
+        out = StringIO()
+        call_command('reconcile_notification_counters', stdout=out)
+        self.assertIn('repaired 1 counters', out.getvalue())
+        self.assertCountersReconciled()
+
+class DeltaSyncTests(NotificationTestCase):
+    def setUp(self):
+        super().setUp()
+        self.kept, self.edited, self.removed = [self.notify() for _ in range(3)]
+        Notification.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        self.cursor = encode_cursor(timezone.now() - timedelta(minutes=1))
+
+    def changes(self, cursor=None, **headers):
+        return self.client.get('/api/notifications/', {'since': cursor or self.cursor}, headers=headers)
+
+    def test_returns_changed_rows_and_tombstones(self):
+        self.client.post(f'/api/notifications/{self.edited.pk}/mark_read/')
+        self.client.delete(f'/api/notifications/{self.removed.pk}/')
+        added = self.notify()
+        self.notify(user=self.other)
+
+        response = self.changes()
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.data['reset'])
+        self.assertEqual(sorted(row['id'] for row in response.data['notifications']), [self.edited.pk, added.pk])
+        self.assertEqual(response.data['deleted'], [self.removed.pk])
+
+    def test_expired_rows_are_reported_as_deleted(self):
+        Notification.objects.filter(pk=self.kept.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+        response = self.changes()
+        self.assertEqual(response.data['notifications'], [])
+        self.assertEqual(response.data['deleted'], [self.kept.pk])
+
+    def test_next_cursor_picks_up_later_changes_only(self):
+        self.client.post(f'/api/notifications/{self.edited.pk}/mark_read/')
+        cursor = self.changes().data['cursor']
+        Notification.objects.filter(pk=self.edited.pk).update(updated_at=timezone.now() - timedelta(minutes=1))
+        response = self.changes(cursor)
+        self.assertEqual(response.data['notifications'], [])
+        self.assertEqual(response.data['deleted'], [])
+
+    def test_cursor_older_than_tombstones_resets(self):
+        response = self.changes(encode_cursor(timezone.now() - timedelta(days=365)))
+        self.assertTrue(response.data['reset'])
+        self.assertEqual(len(response.data['notifications']), 3)
+
+    def test_matching_etag_returns_304(self):
+        first = self.changes()
+        etag = first['ETag']
+        self.assertTrue(etag)
+
+        unchanged = self.changes(**{'If-None-Match': etag})
+        self.assertEqual(unchanged.status_code, 304)
+        self.assertEqual(unchanged['ETag'], etag)
+
+        self.client.post(f'/api/notifications/{self.edited.pk}/mark_read/')
+        changed = self.changes(**{'If-None-Match': etag})
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], etag)
+
+    def test_other_users_writes_keep_the_etag(self):
+        etag = self.changes()['ETag']
+        self.notify(user=self.other)
+        self.assertEqual(self.changes(**{'If-None-Match': etag}).status_code, 304)
+
+    def test_malformed_cursor_returns_400(self):
+        for cursor in ('yesterday', '1e99', '99999999999999999999999'):
+            response = self.changes(cursor)
+            self.assertEqual(response.status_code, 400, cursor)
+            self.assertIn('error', response.data)
+
+class EmailBenchmarkTests(NotificationTestCase):
+    def test_benchmark_leaves_real_deliveries_alone(self):
+        self.user.email = 'reader@example.com'
+        self.user.save()
+        notification = self.notify()
+        EmailDelivery.objects.filter(notification=notification).delete()
+        EmailDelivery.objects.create(recipient=self.user, notification=notification)
+
+        out = StringIO()
+        call_command('send_notification_emails', '--benchmark', '30', '--recipients', '4', '--batch-size', '8', stdout=out)
+        self.assertIn('Sent 30 notifications as', out.getvalue())
+        self.assertEqual(
+            EmailDelivery.objects.filter(notification=notification, status=EmailDeliveryStatus.PENDING).count(), 1
+        )
+
+class CoalescingTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username='admin', password='secret', role='Admin')
+        recipient_directory.invalidate()
+
+    def test_alerts_from_one_event_stay_separate(self):
+        run_handler('order_deleted', {
+            'order_id': 7, 'username': 'buyer', 'product_name': 'Widget', 'quantity': 3, 'total': '6000.00',
+        })
+        titles = sorted(Notification.objects.filter(recipient=self.admin).values_list('title', flat=True))
+        self.assertEqual(titles, ['⚠️ Order Deleted', '🔴 CRITICAL: Major Order Deleted!', '🚨 HIGH-VALUE Order Deleted!'])
+
+    def test_repeats_from_later_events_fold(self):
+        payload = {'product_id': 3, 'name': 'Widget', 'old_quantity': 100, 'new_quantity': 50, 'min_stock': 10}
+        run_handler('stock_changed', payload)
+        run_handler('stock_changed', {**payload, 'old_quantity': 50, 'new_quantity': 20})
+        notification = Notification.objects.get(recipient=self.admin)
+        self.assertEqual(notification.occurrences, 2)
+        self.assertIn('from 50 to 20', notification.display('message'))
+
+class StreamTests(NotificationTestCase):
+    def test_stream_needs_asgi(self):
+        response = self.client.get('/api/notifications/stream/', HTTP_ACCEPT='text/event-stream')
+        self.assertEqual(response.status_code, 501)
+        self.assertTrue(response.json()['poll_url'].endswith('/api/notifications/?since=0'))
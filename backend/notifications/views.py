@@ -2,7 +2,12 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import BaseRenderer
+from rest_framework.reverse import reverse
 from django.shortcuts import get_object_or_404
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.db import transaction
 from django.db.models import Q
 from django.utils import timezone
 
@@ -15,6 +20,16 @@ from .serializers import (
     NotificationStatsSerializer
 )
 from .services import NotificationService
+from . import counters, sync
+from .stream import broker
+
+class EventStreamRenderer(BaseRenderer):
+    """Lets content negotiation accept EventSource's ``text/event-stream``"""
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return data
 
 class NotificationViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
@@ -26,7 +41,7 @@ class NotificationViewSet(viewsets.ModelViewSet):
             recipient=self.request.user
         ).filter(
             Q(expires_at__isnull=True) | Q(expires_at__gt=timezone.now())
-        ).select_related('recipient')
+        ).select_related('recipient', 'content')
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -46,8 +61,23 @@ class NotificationViewSet(viewsets.ModelViewSet):
         return_serializer = NotificationSerializer(notification)
         return Response(return_serializer.data, status=status.HTTP_201_CREATED)
 
+    def perform_update(self, serializer):
+        """Keep the recipient's counters in step with type and read-state edits"""
+        instance = serializer.instance
+        old_row = (instance.recipient_id, instance.notification_type, instance.is_read)
+        with transaction.atomic():
+            notification = serializer.save()
+            counters.CounterDeltas().removed([old_row]).added([notification]).touch(old_row[0]).apply()
+
+    def perform_destroy(self, instance):
+        counters.delete_notifications(Notification.objects.filter(pk=instance.pk))
+
     def list(self, request, *args, **kwargs):
         """List notifications with optional filtering"""
+        since = request.query_params.get('since')
+        if since is not None:
+            return self._list_changes(request, since)
+
         queryset = self.get_queryset()
 
         # Filter by read status
@@ -73,6 +103,22 @@ class NotificationViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(queryset, many=True)
         return Response(serializer.data)
 
+    def _list_changes(self, request, since):
+        """Delta response for ``?since=<cursor>``; 304 when nothing changed"""
+        try:
+            since_at = sync.decode_cursor(since)
+        except (TypeError, ValueError, OverflowError, OSError):
+            return Response({'error': 'Invalid since cursor'}, status=status.HTTP_400_BAD_REQUEST)
+
+        etag = sync.current_etag(request.user.id)
+        if etag is not None and etag == request.headers.get('If-None-Match'):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(sync.changes_since(request.user.id, since_at))
+        if etag is not None:
+            response['ETag'] = etag
+        return response
+
     @action(detail=True, methods=['post'])
     def mark_read(self, request, pk=None):
         """Mark a specific notification as read"""
@@ -144,9 +190,35 @@ class NotificationViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def unread_count(self, request):
         """Get count of unread notifications"""
-        unread_count = self.get_queryset().filter(is_read=False).count()
+        unread_count = counters.unread_counts([request.user.id])[request.user.id]
         return Response({'unread_count': unread_count})
 
+    @action(detail=False, methods=['get'], renderer_classes=[EventStreamRenderer])
+    def stream(self, request):
+        """Push new notifications and unread count changes (Server-Sent Events, ASGI only)"""
+        if not isinstance(request._request, ASGIRequest):
+            # Under WSGI every open stream would hold a worker thread for good
+            return JsonResponse(
+                {
+                    'error': 'Live updates need the ASGI server; poll for changes instead',
+                    'poll_url': f"{reverse('notification-list', request=request)}?since=0",
+                },
+                status=status.HTTP_501_NOT_IMPLEMENTED
+            )
+        last_event_id = request.headers.get('Last-Event-ID') or request.query_params.get('last_event_id')
+        try:
+            last_event_id = int(last_event_id) if last_event_id else None
+        except ValueError:
+            last_event_id = None
+
+        response = StreamingHttpResponse(
+            broker.stream(request.user.id, last_event_id),
+            content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
     @action(detail=False, methods=['delete'])
     def delete_all_read(self, request):
         """Delete all read notifications for the current user"""
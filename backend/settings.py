@@ -37,6 +37,7 @@ ALLOWED_HOSTS = ['localhost', '127.0.0.1', 'backend', 'frontend', '*']
 # Application definition
 
 INSTALLED_APPS = [
+    'daphne',
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -49,6 +50,7 @@ INSTALLED_APPS = [
     'inventory',
     'ai_insights',
     'notifications',
+    'forecasting',
 ]
 
 MIDDLEWARE = [
@@ -80,6 +82,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'wsgi.application'
+ASGI_APPLICATION = 'asgi.application'
 
 
 # Database
@@ -98,6 +101,101 @@ DATABASES = {
 }
 
 
+# Cache
+# In-process caches (e.g. the notification recipient directory) and the
+# notification preference masks use this cache for cross-worker invalidation.
+# The local-memory default is per process and only suits a single process;
+# anything with separate workers (docker-compose included) must share one
+# backend, e.g. CACHE_BACKEND=django.core.cache.backends.redis.RedisCache and
+# CACHE_LOCATION=redis://redis:6379/1.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+
+# Largest list accepted by the inventory /batch/ endpoints
+INVENTORY_BATCH_MAX_SIZE = int(os.getenv('INVENTORY_BATCH_MAX_SIZE', '1000'))
+
+# Rows upserted per transaction by the streaming product import
+INVENTORY_IMPORT_CHUNK_SIZE = int(os.getenv('INVENTORY_IMPORT_CHUNK_SIZE', '1000'))
+
+# Rows fetched per round trip by the streaming /export/ endpoints
+INVENTORY_EXPORT_CHUNK_SIZE = int(os.getenv('INVENTORY_EXPORT_CHUNK_SIZE', '2000'))
+
+# Seconds /api/orders/stats/ results are cached per filter set (0 disables)
+INVENTORY_ORDER_STATS_CACHE_TIMEOUT = int(os.getenv('INVENTORY_ORDER_STATS_CACHE_TIMEOUT', '10'))
+
+
+# Demand forecasting: days of sales history fitted, the default and largest
+# forecast horizon in days, and the seasonal period (7 = weekly pattern)
+FORECAST_HISTORY_DAYS = int(os.getenv('FORECAST_HISTORY_DAYS', '182'))
+FORECAST_HORIZON_DAYS = int(os.getenv('FORECAST_HORIZON_DAYS', '30'))
+FORECAST_MAX_HORIZON_DAYS = int(os.getenv('FORECAST_MAX_HORIZON_DAYS', '365'))
+FORECAST_SEASON_LENGTH = int(os.getenv('FORECAST_SEASON_LENGTH', '7'))
+
+# Products refit per transaction by refresh_forecasts
+FORECAST_REFRESH_BATCH_SIZE = int(os.getenv('FORECAST_REFRESH_BATCH_SIZE', '5000'))
+
+
+# Notification dispatch
+# 'queue' writes one event row per change and lets `manage.py notification_worker`
+# materialize the notifications; 'inline' does it right after the transaction
+# commits (handy for local development without a worker).
+NOTIFICATION_DISPATCH_MODE = os.getenv('NOTIFICATION_DISPATCH_MODE', 'queue')
+
+# Seconds between database polls feeding /api/notifications/stream/
+NOTIFICATION_STREAM_POLL_INTERVAL = float(os.getenv('NOTIFICATION_STREAM_POLL_INTERVAL', '2'))
+
+# Delta sync (?since=): how long deletions are remembered, and how far the
+# returned cursor trails the clock to cover in-flight transactions
+NOTIFICATION_TOMBSTONE_RETENTION_DAYS = int(os.getenv('NOTIFICATION_TOMBSTONE_RETENTION_DAYS', '7'))
+NOTIFICATION_SYNC_CURSOR_MARGIN = 5
+
+# Seconds a user's resolved push/email preferences stay cached during fan-out
+NOTIFICATION_PREFERENCE_CACHE_TIMEOUT = int(os.getenv('NOTIFICATION_PREFERENCE_CACHE_TIMEOUT', '60'))
+
+# Seconds a process keeps a role's recipient ids before re-reading them, even
+# without an invalidation
+NOTIFICATION_RECIPIENT_CACHE_TIMEOUT = int(os.getenv('NOTIFICATION_RECIPIENT_CACHE_TIMEOUT', '300'))
+
+# Repeats about the same object within this many seconds update the existing
+# unread notification instead of adding a row (0 disables coalescing)
+NOTIFICATION_COALESCE_WINDOW = int(os.getenv('NOTIFICATION_COALESCE_WINDOW', '900'))
+
+# At most NOTIFICATION_RATE_LIMIT new notifications per recipient every
+# NOTIFICATION_RATE_WINDOW seconds; the rest go into a digest (0 disables)
+NOTIFICATION_RATE_LIMIT = int(os.getenv('NOTIFICATION_RATE_LIMIT', '50'))
+NOTIFICATION_RATE_WINDOW = int(os.getenv('NOTIFICATION_RATE_WINDOW', '3600'))
+
+# Seconds /api/notifications/stats/ results are cached per user; any write to
+# the user's notifications drops the entry
+NOTIFICATION_STATS_CACHE_TIMEOUT = int(os.getenv('NOTIFICATION_STATS_CACHE_TIMEOUT', '5'))
+
+
+# Email
+# Notification emails are sent by `manage.py send_notification_emails`, never
+# in the request path. Use the console or file backend locally and SMTP in
+# production.
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = os.getenv('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.getenv('EMAIL_PORT', '25'))
+EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'False') == 'True'
+EMAIL_FILE_PATH = os.getenv('EMAIL_FILE_PATH', os.path.join(BASE_DIR, 'sent_emails'))
+EMAIL_SUBJECT_PREFIX = '[InvAI] '
+DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'InvAI <notifications@localhost>')
+
+# Base URL for links in notification emails
+FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://localhost:8080')
+
+# Seconds a new notification email waits so that bursts go out as one digest
+NOTIFICATION_EMAIL_DIGEST_DELAY = int(os.getenv('NOTIFICATION_EMAIL_DIGEST_DELAY', '60'))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
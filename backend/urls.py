@@ -43,7 +43,8 @@ def api_root(request):
             'notifications': {
                 'list': '/api/notifications/',
                 'preferences': '/api/notifications/preferences/',
-            }
+            },
+            'forecasts': '/api/forecasts/',
         }
     })
 
@@ -54,6 +55,7 @@ urlpatterns = [
     path('api/', include('inventory.urls')),
     path('api/ai-insights/', include('ai_insights.urls')),
     path('api/notifications/', include('notifications.urls')),
+    path('api/forecasts/', include('forecasting.urls')),
 ]
 
 # Serve media files in development
@@ -91,6 +91,11 @@ export default function NotificationItem({
               !notification.is_read ? 'text-foreground' : 'text-muted-foreground'
             )}>
               {notification.title}
+              {notification.occurrences > 1 && (
+                <span className="ml-1 text-xs font-normal text-muted-foreground">
+                  ×{notification.occurrences}
+                </span>
+              )}
             </h4>
 
             {!notification.is_read && (
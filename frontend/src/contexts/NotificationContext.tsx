@@ -1,5 +1,5 @@
 import React, { createContext, useContext, useReducer, useCallback, useEffect } from 'react';
-import NotificationService, { type Notification, type NotificationPreference } from '../services/notificationService';
+import NotificationService, { type Notification, type NotificationChanges, type NotificationPreference } from '../services/notificationService';
 import { toast } from 'sonner';
 
 interface NotificationState {
@@ -19,10 +19,12 @@ type NotificationAction =
   | { type: 'SET_PREFERENCES'; payload: NotificationPreference }
   | { type: 'ADD_NOTIFICATION'; payload: Notification }
   | { type: 'UPDATE_NOTIFICATION'; payload: Notification }
+  | { type: 'REPLACE_NOTIFICATION'; payload: Notification }
   | { type: 'REMOVE_NOTIFICATION'; payload: number }
   | { type: 'MARK_AS_READ'; payload: number }
   | { type: 'MARK_AS_UNREAD'; payload: number }
   | { type: 'MARK_ALL_READ' }
+  | { type: 'APPLY_CHANGES'; payload: NotificationChanges }
   | { type: 'SET_LAST_FETCHED'; payload: Date };
 
 const initialState: NotificationState = {
@@ -58,6 +60,9 @@ function notificationReducer(state: NotificationState, action: NotificationActio
       return { ...state, preferences: action.payload };
 
     case 'ADD_NOTIFICATION':
+      if (state.notifications.some(n => n.id === action.payload.id)) {
+        return state;
+      }
       return {
         ...state,
         notifications: [action.payload, ...state.notifications],
@@ -72,6 +77,16 @@ function notificationReducer(state: NotificationState, action: NotificationActio
         ),
       };
 
+    case 'REPLACE_NOTIFICATION':
+      // An edit pushed by the server (e.g. a coalesced repeat); items not
+      // loaded yet are added. unread_count events keep the count in step.
+      return {
+        ...state,
+        notifications: state.notifications.some(n => n.id === action.payload.id)
+          ? state.notifications.map(n => (n.id === action.payload.id ? action.payload : n))
+          : [action.payload, ...state.notifications],
+      };
+
     case 'REMOVE_NOTIFICATION': {
       const removedNotification = state.notifications.find(n => n.id === action.payload);
       return {
@@ -108,6 +123,25 @@ function notificationReducer(state: NotificationState, action: NotificationActio
         unreadCount: 0,
       };
 
+    case 'APPLY_CHANGES': {
+      const { reset, notifications: changed, deleted } = action.payload;
+      const changedIds = new Set(changed.map(n => n.id));
+      const deletedIds = new Set(deleted);
+      const kept = reset
+        ? []
+        : state.notifications.filter(n => !changedIds.has(n.id) && !deletedIds.has(n.id));
+      const notifications = [...changed, ...kept].sort(
+        (a, b) => new Date(b.created_at).getTime() - new Date(a.created_at).getTime()
+      );
+      return {
+        ...state,
+        notifications,
+        unreadCount: notifications.filter(n => !n.is_read).length,
+        isLoading: false,
+        error: null,
+      };
+    }
+
     case 'SET_LAST_FETCHED':
       return { ...state, lastFetched: action.payload };
 
@@ -306,24 +340,72 @@ export function NotificationProvider({ children }: { children: React.ReactNode }
     ]);
   }, [fetchNotifications, fetchUnreadCount, fetchPreferences]);
 
-  // Auto-fetch notifications on mount and set up polling
+  // Auto-fetch notifications on mount and subscribe to the live stream
   useEffect(() => {
     console.log('🔔 Notification system initialized');
     fetchNotifications();
     fetchPreferences();
 
-    // Set up aggressive polling for real-time updates (every 5 seconds)
-    const interval = setInterval(() => {
-      console.log('🔄 Polling for new notifications...');
-      fetchNotifications(true);
-      fetchUnreadCount();
-    }, 5000);
+    // Polls for deltas only; used without SSE support or when the server has no stream
+    let interval: ReturnType<typeof setInterval> | null = null;
+    const startPolling = () => {
+      let cursor = '0';
+      let etag: string | null = null;
+      interval = setInterval(async () => {
+        try {
+          const result = await NotificationService.getChanges(cursor, etag);
+          etag = result.etag;
+          if (result.changes) {
+            cursor = result.changes.cursor;
+            dispatch({ type: 'APPLY_CHANGES', payload: result.changes });
+          }
+        } catch (error) {
+          console.error('Error polling notification changes:', error);
+        }
+      }, 30000);
+    };
+
+    if (typeof EventSource === 'undefined') {
+      startPolling();
+      return () => {
+        if (interval) clearInterval(interval);
+      };
+    }
+
+    const stream = NotificationService.openStream();
+
+    stream.addEventListener('notification', (event) => {
+      const notification: Notification = JSON.parse((event as MessageEvent).data);
+      dispatch({ type: 'ADD_NOTIFICATION', payload: notification });
+    });
+
+    stream.addEventListener('notification_updated', (event) => {
+      const notification: Notification = JSON.parse((event as MessageEvent).data);
+      dispatch({ type: 'REPLACE_NOTIFICATION', payload: notification });
+    });
+
+    stream.addEventListener('unread_count', (event) => {
+      const { unread_count } = JSON.parse((event as MessageEvent).data);
+      dispatch({ type: 'SET_UNREAD_COUNT', payload: unread_count });
+    });
+
+    stream.onerror = () => {
+      if (stream.readyState === EventSource.CLOSED) {
+        // The server refused the stream (e.g. 501 when not served over ASGI); EventSource won't retry
+        console.warn('⚠️ Notification stream unavailable, polling for changes instead');
+        if (!interval) startPolling();
+        return;
+      }
+      console.warn('⚠️ Notification stream interrupted, reconnecting...');
+    };
 
     return () => {
       console.log('🔕 Notification system cleanup');
-      clearInterval(interval);
+      stream.close();
+      if (interval) clearInterval(interval);
     };
-  }, [fetchNotifications, fetchUnreadCount, fetchPreferences]);
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, []);
 
   const contextValue: NotificationContextType = {
     ...state,
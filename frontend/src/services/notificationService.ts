@@ -12,6 +12,7 @@ interface Notification {
   action_text?: string;
   expires_at?: string;
   is_expired: boolean;
+  occurrences: number;
 }
 
 interface NotificationPreference {
@@ -37,6 +38,13 @@ interface NotificationStats {
   by_type: Record<string, number>;
 }
 
+interface NotificationChanges {
+  cursor: string;
+  reset: boolean;
+  notifications: Notification[];
+  deleted: number[];
+}
+
 interface BulkActionRequest {
   notification_ids: number[];
   action: 'mark_read' | 'mark_unread' | 'delete';
@@ -118,12 +126,41 @@ class NotificationService {
     return this.request<Notification[]>(endpoint);
   }
 
+  // Get notifications changed since a cursor returned by a previous call ('0' for everything).
+  // Resolves to null when the server answers 304 for the given ETag.
+  async getChanges(
+    since: string,
+    etag?: string | null
+  ): Promise<{ changes: NotificationChanges | null; etag: string | null }> {
+    const response = await fetch(`${BASE_URL}/?since=${encodeURIComponent(since)}`, {
+      headers: {
+        ...this.getAuthHeaders(),
+        ...(etag ? { 'If-None-Match': etag } : {}),
+      },
+      credentials: 'include',
+    });
+
+    if (response.status === 304) {
+      return { changes: null, etag: etag ?? null };
+    }
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    return { changes: await response.json(), etag: response.headers.get('ETag') };
+  }
+
   // Get unread notifications count
   async getUnreadCount(): Promise<number> {
     const response = await this.request<{ unread_count: number }>('/unread_count/');
     return response.unread_count;
   }
 
+  // Open a Server-Sent Events stream of new notifications and unread count changes.
+  // The browser reconnects automatically and resumes from the last event id.
+  openStream(): EventSource {
+    return new EventSource(`${BASE_URL}/stream/`, { withCredentials: true });
+  }
+
   // Get notification statistics
   async getStats(): Promise<NotificationStats> {
     return this.request<NotificationStats>('/stats/');
@@ -262,4 +299,5 @@ export type {
   NotificationPreference,
   NotificationStats,
   BulkActionRequest,
+  NotificationChanges,
 };
\ No newline at end of file